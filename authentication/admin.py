@@ -1,16 +1,21 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from backend_app.admin_tools import CachedValuesFilter, ChangelistPerformanceMixin
+from backend_app.search import terms
 from .models import User
+from .utils.search import normalize_query, search_users
 from django import forms
 from django.utils.html import format_html
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ChangelistPerformanceMixin, BaseUserAdmin):
     ordering = ['-date_joined']
     list_display = ['id', 'full_name', 'email', 'phone_number', 'country', 'city', 'can_create_packing_list', 'is_active', 'is_staff', 'user_status']
-    list_filter = ('is_staff', 'is_active', 'is_superuser', 'can_create_packing_list', 'country', 'date_joined')
-    search_fields = ('phone_number', 'email', 'full_name', 'country', 'city')
+    list_filter = (
+        'is_staff', 'is_active', 'is_superuser', 'can_create_packing_list', ('country', CachedValuesFilter), 'date_joined'
+    )
+    search_fields = ('phone_number', 'email', 'full_name')
     list_editable = ('can_create_packing_list',)
     list_per_page = 25
     date_hierarchy = 'date_joined'
@@ -49,6 +54,13 @@ class UserAdmin(BaseUserAdmin):
     
     readonly_fields = ('date_joined', 'last_login')
     
+    def get_search_results(self, request, queryset, search_term):
+        """Email, name and phone through the trigram indexes"""
+        if not terms(normalize_query(search_term)):
+            # Nothing long enough for the indexes (e.g. "KX"): the stock search_fields lookup
+            return super().get_search_results(request, queryset, search_term)
+        return search_users(queryset, search_term), False
+
     def user_status(self, obj):
         """Display colored status badge"""
         if obj.is_superuser:
@@ -0,0 +1,72 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from authentication.models import User
+from authentication.utils.images import normalize_file, store_image
+
+
+HASHED_NAME_RE = r'^profile_pictures/[0-9a-f]{64}\.jpg$'
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encode existing profile pictures (EXIF stripped, bounded resolution, "
+        "content-hashed names) using a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+        parser.add_argument('--delete-originals', action='store_true',
+                            help='Delete the original files once no user references them')
+        parser.add_argument('--dry-run', action='store_true', help='Only list what would be processed')
+
+    def handle(self, *args, **options):
+        # name -> [user ids]; users sharing a file are processed once
+        pending = {}
+        users = (
+            User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .exclude(profile_picture__regex=HASHED_NAME_RE)
+            .values_list('id', 'profile_picture')
+        )
+        for user_id, name in users.iterator():
+            pending.setdefault(name, []).append(user_id)
+
+        missing = [name for name in pending if not default_storage.exists(name)]
+        for name in missing:
+            self.stderr.write(f'Missing file: {name}')
+            del pending[name]
+
+        if options['dry_run'] or not pending:
+            self.stdout.write(f'{len(pending)} profile picture(s) to normalize, {len(missing)} missing.')
+            return
+
+        names = list(pending)
+        paths = [default_storage.path(name) for name in names]
+
+        started = time.perf_counter()
+        before = after = done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for name, path, (data, error) in zip(names, paths, pool.map(normalize_file, paths, chunksize=8)):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+
+                new_name = store_image(data)
+                User.objects.filter(id__in=pending[name]).update(profile_picture=new_name)
+                before += os.path.getsize(path)
+                after += len(data)
+                done += 1
+
+                if options['delete_originals'] and not User.objects.filter(profile_picture=name).exists():
+                    default_storage.delete(name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Normalized {done} profile picture(s), {failed} failed, {len(missing)} missing, '
+            f'in {time.perf_counter() - started:.1f}s with {options["workers"]} worker(s): '
+            f'{before / 1048576:.1f} MB -> {after / 1048576:.1f} MB.'
+        ))
@@ -0,0 +1,20 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from backend_app.search import TrigramIndex
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('authentication', '0002_user_can_create_packing_list'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        TrigramIndex('user', 'user_email_trgm', 'email'),
+        TrigramIndex('user', 'user_full_name_trgm', 'full_name'),
+        TrigramIndex('user', 'user_phone_number_trgm', 'phone_number'),
+    ]
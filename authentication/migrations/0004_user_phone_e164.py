@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 07:53
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from authentication.utils.phones import normalize_phone
+
+
+def backfill_phone_e164(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    users = User.objects.exclude(phone_number__isnull=True).exclude(phone_number='').order_by('pk').only('pk', 'phone_number')
+    last = None
+    while True:
+        batch = list((users.filter(pk__gt=last) if last else users)[:2000])
+        if not batch:
+            return
+        for user in batch:
+            user.phone_e164 = normalize_phone(user.phone_number)
+        User.objects.bulk_update(batch, ['phone_e164'])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0003_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Phone number in E.164 form, kept in sync on save, for lookups', max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
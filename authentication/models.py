@@ -1,10 +1,13 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import RegexValidator
 from django.utils import timezone
 import uuid
 from phonenumber_field.modelfields import PhoneNumberField
 
+from .utils.phones import normalize_phone
+
 
 class CustomUserManager(BaseUserManager):
     """Custom user manager for email-based authentication"""
@@ -47,6 +50,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     )
     full_name = models.CharField(max_length=255, verbose_name='Full Name')
     phone_number = PhoneNumberField(blank=True,max_length=17,null=True,verbose_name='Phone Number')
+    phone_e164 = models.CharField(
+        max_length=16,
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+        help_text='Phone number in E.164 form, kept in sync on save, for lookups'
+    )
     
     # Profile fields
     profile_picture = models.ImageField(upload_to='profile_pictures/',blank=True,null=True,verbose_name='Profile Picture')
@@ -79,9 +90,22 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         ordering = ['-date_joined']
+        indexes = [
+            # Case-insensitive email lookups (customer resolution, manifest imports)
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            # Admin changelist order (newest first) and its date hierarchy
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_idx'),
+        ]
     
     def __str__(self):
         return self.full_name
+
+    def save(self, *args, **kwargs):
+        self.phone_e164 = normalize_phone(self.phone_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_e164'}
+        super().save(*args, **kwargs)
     
     def get_full_name(self):
         return self.full_name
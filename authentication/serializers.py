@@ -4,6 +4,8 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from .models import LoginHistory
+from backend_app import thumbnails
+from .utils.images import InvalidImage, process_profile_picture, validate_image
 import re
 
 User = get_user_model()
@@ -169,16 +171,21 @@ class UserLoginSerializer(serializers.Serializer):
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user profile"""
+    profile_picture_thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = [
             'id', 'email', 'full_name', 'phone_number',
-            'profile_picture', 'city', 'country',
+            'profile_picture', 'profile_picture_thumbnail', 'city', 'country',
          'is_verified', 'date_joined', 'can_create_packing_list'
         ]
         read_only_fields = ['id', 'email', 'is_verified', 'date_joined', 'can_create_packing_list']
 
+    def get_profile_picture_thumbnail(self, obj):
+        """256px avatar; None until it has been generated"""
+        return thumbnails.thumbnail_url('profile_pictures', obj.profile_picture, self.context.get('request'))
+
 
 class UserProfileUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating user profile"""
@@ -196,6 +203,28 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Full name must be at least 3 characters long.")
         return value.strip()
 
+    def validate_profile_picture(self, value):
+        """Check size, format and resolution from the image header"""
+        if value:
+            try:
+                validate_image(value)
+            except InvalidImage as e:
+                raise serializers.ValidationError(str(e))
+        return value
+
+    def update(self, instance, validated_data):
+        # New pictures are normalized in the background (see utils/images.py);
+        # profile_picture keeps its old value until the processed file is written
+        picture = validated_data.get('profile_picture')
+        self.profile_picture_processing = bool(picture)
+        if picture:
+            del validated_data['profile_picture']
+
+        instance = super().update(instance, validated_data)
+        if picture:
+            process_profile_picture(instance, picture)
+        return instance
+
 
 class ChangePasswordSerializer(serializers.Serializer):
     """Serializer for changing password"""
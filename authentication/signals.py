@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from backend_app import thumbnails
+from .models import User
+
+
+# Sent with ``user`` once that user has proven they own their email address
+email_verified = Signal()
+
+
+@receiver(post_save, sender=User)
+def generate_profile_picture_thumbnail(sender, instance, **kwargs):
+    """Resize a new profile picture once it is committed; no-op when already cached"""
+    if instance.profile_picture:
+        transaction.on_commit(lambda: thumbnails.schedule('profile_pictures', instance.profile_picture))
@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.conf import settings
 import logging
 import threading
@@ -42,4 +42,33 @@ def send_password_reset_email(email, reset_link):
     </div>
     """
     # Send email in a separate thread to avoid blocking the request
-    EmailThread(subject, html_content, [email]).start()
\ No newline at end of file
+    EmailThread(subject, html_content, [email]).start()
+
+
+def send_html_batch(messages, batch_size=100):
+    """
+    Send many HTML emails, reusing one SMTP connection per ``batch_size``
+    messages instead of connecting for each. ``messages`` is a list of
+    (subject, html_content, recipient_list) tuples. Returns the number sent;
+    a failed batch is logged and skipped.
+    """
+    sent = 0
+    for start in range(0, len(messages), batch_size):
+        batch = messages[start:start + batch_size]
+        connection = get_connection(fail_silently=False)
+        emails = []
+        for subject, html_content, recipient_list in batch:
+            email = EmailMultiAlternatives(
+                subject=subject,
+                body='',  # Plain text message (optional fallback)
+                from_email=settings.EMAIL_HOST_USER,
+                to=recipient_list,
+                connection=connection,
+            )
+            email.attach_alternative(html_content, 'text/html')
+            emails.append(email)
+        try:
+            sent += connection.send_messages(emails) or 0
+        except Exception as e:
+            logger.error(f"Failed to send {len(batch)} email(s) starting with {batch[0][2]}: {str(e)}")
+    return sent
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps, UnidentifiedImageError
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF', 'BMP', 'MPO'}
+HASHED_NAME_PREFIX = 'profile_pictures/'
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def validate_image(file):
+    """
+    Check an uploaded image from its header only, without decoding the pixels.
+    Raises InvalidImage with a user-facing message.
+    """
+    if file.size > settings.PROFILE_PICTURE_MAX_UPLOAD_SIZE:
+        raise InvalidImage(
+            f"Image is too large (max {settings.PROFILE_PICTURE_MAX_UPLOAD_SIZE // (1024 * 1024)}MB)."
+        )
+
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+            width, height = image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise InvalidImage("Upload a valid image (JPEG, PNG or WebP).")
+    finally:
+        file.seek(0)
+
+    if image_format not in ALLOWED_FORMATS:
+        raise InvalidImage("Upload a valid image (JPEG, PNG or WebP).")
+    if width * height > settings.PROFILE_PICTURE_MAX_PIXELS:
+        raise InvalidImage("Image resolution is too large.")
+
+
+def normalize_image(path):
+    """
+    Decode the image at ``path``, apply and drop its EXIF orientation, bound
+    it to PROFILE_PICTURE_MAX_DIMENSION and re-encode it as JPEG. The output
+    carries no metadata (GPS, camera serials). Returns the JPEG bytes.
+    """
+    max_dimension = settings.PROFILE_PICTURE_MAX_DIMENSION
+
+    with Image.open(path) as original:
+        # JPEG draft mode decodes at 1/2..1/8 scale, far cheaper than full size
+        original.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    else:
+        image = image.convert('RGB')
+
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(
+        output, 'JPEG',
+        quality=settings.PROFILE_PICTURE_JPEG_QUALITY,
+        optimize=True,
+        progressive=True
+    )
+    return output.getvalue()
+
+
+def normalize_file(path):
+    """Process-pool worker around normalize_image: returns (bytes, None) or (None, error)"""
+    try:
+        return normalize_image(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def store_image(data):
+    """Save JPEG bytes under a name derived from their SHA-256 and return the name"""
+    name = f'{HASHED_NAME_PREFIX}{hashlib.sha256(data).hexdigest()}.jpg'
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(data))
+
+
+def stage_upload(file):
+    """Copy an uploaded file to a private temporary file, so it outlives the request"""
+    fd, path = tempfile.mkstemp(suffix='.upload', dir=settings.FILE_UPLOAD_TEMP_DIR)
+    with os.fdopen(fd, 'wb') as staged:
+        for chunk in file.chunks():
+            staged.write(chunk)
+    return path
+
+
+class ProfilePictureThread(threading.Thread):
+    def __init__(self, user_id, staged_path):
+        self.user_id = user_id
+        self.staged_path = staged_path
+        threading.Thread.__init__(self)
+
+    def run(self):
+        from ..models import User
+
+        try:
+            name = store_image(normalize_image(self.staged_path))
+            user = User.objects.get(pk=self.user_id)
+            user.profile_picture = name
+            # Only this column, so profile edits made meanwhile are kept
+            user.save(update_fields=['profile_picture'])
+        except Exception as e:
+            logger.error(f"Failed to process profile picture for user {self.user_id}: {str(e)}")
+        finally:
+            os.remove(self.staged_path)
+            connection.close()
+
+
+def process_profile_picture(user, file):
+    """
+    Normalize a validated upload in the background and point the user's
+    profile_picture at the result once it's written.
+    """
+    ProfilePictureThread(user.pk, stage_upload(file)).start()
@@ -0,0 +1,21 @@
+from django.conf import settings
+import phonenumbers
+
+# Numbers written without a country code ("0712 345 678") are read as Tanzanian
+DEFAULT_REGION = getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None) or 'TZ'
+
+
+def normalize_phone(value, region=DEFAULT_REGION):
+    """
+    E.164 form of a phone number ("+255712345678"), or None when ``value``
+    is empty or not a valid number. Accepts PhoneNumber objects and free text.
+    """
+    if not value:
+        return None
+    try:
+        number = phonenumbers.parse(str(value), region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
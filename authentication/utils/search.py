@@ -0,0 +1,27 @@
+import phonenumbers
+
+from backend_app.search import matching
+from .phones import normalize_phone
+
+USER_FIELDS = ['email', 'full_name', 'phone_number']
+
+
+def normalize_query(query):
+    """
+    A query that is a phone number, however it was typed ("0712 345 678",
+    "+255 712..."), becomes its national digits, which every stored form of
+    the number contains.
+    """
+    query = (query or '').strip()
+    phone = normalize_phone(query)
+    if phone:
+        return str(phonenumbers.parse(phone).national_number)
+    return query
+
+
+def search_users(queryset, query):
+    """Users whose email, name or phone contain every term of ``query`` (see backend_app/search.py)"""
+    condition = matching(USER_FIELDS, normalize_query(query))
+    if condition is None:
+        return queryset.none()
+    return queryset.filter(condition)
@@ -21,6 +21,7 @@ from .serializers import (
     ChangePasswordSerializer, PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer, LoginHistorySerializer
 )
+from .signals import email_verified
 
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
@@ -216,7 +217,8 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return Response({
             'success': True,
             'message': 'Profile updated successfully',
-            'user': UserSerializer(instance).data
+            'user': UserSerializer(instance).data,
+            'profile_picture_processing': getattr(serializer, 'profile_picture_processing', False)
         })
 
 
@@ -386,6 +388,7 @@ class EmailVerificationView(APIView):
             # Mark token as used
             verification.is_used = True
             verification.save()
+            email_verified.send(sender=User, user=user)
             
             return Response({
                 'success': True,
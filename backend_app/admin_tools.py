@@ -0,0 +1,251 @@
+"""
+Changelist tuning for the admin's big tables (shipments, invoices, users,
+packing lists).
+
+A stock changelist page runs, besides the 25 rows it shows:
+
+- ``COUNT(*)`` of the filtered rows for the paginator, and another of the
+  whole table for "N total" (``show_full_result_count``);
+- for ``date_hierarchy``, ``MIN``/``MAX`` of the date column and a
+  ``DISTINCT`` truncation over every row to list the years (months, days).
+
+``ChangelistPerformanceMixin`` drops the second count, and on PostgreSQL
+answers the unfiltered count from the planner's estimate (``pg_class.
+reltuples``, kept up to date by autovacuum) once the table is past
+``ADMIN_ESTIMATED_COUNT_THRESHOLD`` rows; filtered pages still count exactly.
+The date-hierarchy queries are cached in Django's cache for
+``ADMIN_DATE_HIERARCHY_CACHE_SECONDS``, keyed by their SQL, so a new year or
+month can take that long to show up in the drill-down. The admins set
+``list_select_related`` for the foreign keys their columns display.
+
+The sidebar filters over a column's values (``CachedValuesFilter``) or a
+foreign key (``CachedRelatedFilter``) otherwise run a DISTINCT over the
+table on every render. These take their choices, each with its row count,
+from the cache instead: one GROUP BY per version of the data. The version
+is a token per model in Django's cache, replaced by ``invalidate_facets``
+when the model or the related one is written (shipping/signals.py);
+``ADMIN_FACET_CACHE_SECONDS`` bounds how stale bulk updates, which send no
+signals, can leave them. Counts are over the whole table, not the rows the
+other filters leave.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.contrib.admin.filters import AllValuesFieldListFilter, RelatedFieldListFilter
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Count, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+
+
+def estimated_count(queryset):
+    """
+    The planner's row estimate of ``queryset``'s table when the queryset is
+    the whole table on PostgreSQL, otherwise None
+    """
+    connection = connections[queryset.db]
+    query = queryset.query
+    if connection.vendor != 'postgresql' or query.has_filters() or query.is_sliced or query.distinct:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    # -1 until the table has been vacuumed or analyzed once
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts unfiltered large tables from the planner's estimate"""
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class CachedDateQuerySet(QuerySet):
+    """
+    A changelist queryset whose date-hierarchy queries (``aggregate`` of the
+    date range, ``dates``/``datetimes``) are answered from the cache
+    """
+
+    def _cached(self, method, *args, **kwargs):
+        compute = getattr(super(), method)
+        try:
+            sql, params = self.query.sql_with_params()
+        except EmptyResultSet:
+            return compute(*args, **kwargs)
+        digest = hashlib.md5(
+            f'{sql}|{params}|{method}|{args}|{kwargs}|{timezone.get_current_timezone_name()}'.encode()
+        ).hexdigest()
+        key = f'admin:date_hierarchy:{self.model._meta.label_lower}:{digest}'
+        result = cache.get(key)
+        if result is None:
+            result = compute(*args, **kwargs)
+            if method != 'aggregate':
+                result = list(result)
+            cache.set(key, result, settings.ADMIN_DATE_HIERARCHY_CACHE_SECONDS)
+        return result
+
+    def aggregate(self, *args, **kwargs):
+        return self._cached('aggregate', *args, **kwargs)
+
+    def dates(self, *args, **kwargs):
+        return self._cached('dates', *args, **kwargs)
+
+    def datetimes(self, *args, **kwargs):
+        return self._cached('datetimes', *args, **kwargs)
+
+
+class CachedDateHierarchyChangeList(ChangeList):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the date_hierarchy template tag reads cl.queryset after this;
+        # admin actions get their own queryset from cl.get_queryset()
+        if self.date_hierarchy:
+            queryset = self.queryset
+            self.queryset = CachedDateQuerySet(
+                model=queryset.model, query=queryset.query.chain(), using=queryset._db, hints=queryset._hints
+            )
+
+
+class ChangelistPerformanceMixin:
+    """For ModelAdmins of large tables; put it before admin.ModelAdmin"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return CachedDateHierarchyChangeList
+
+
+# ============ Cached filter facets ============
+def _facet_version_key(model):
+    return f'admin:facets:version:{model._meta.label_lower}'
+
+
+def facet_version(*models):
+    """Current data version of ``models``, as one string"""
+    keys = [_facet_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if versions.get(key) is None:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return ':'.join(versions[key] for key in keys)
+
+
+def invalidate_facets(model):
+    """Recount the filters that depend on ``model`` on their next render"""
+    cache.set(_facet_version_key(model), uuid.uuid4().hex, timeout=None)
+
+
+class CachedFacetsMixin:
+    def cached_facets(self, compute, *models):
+        """``compute()``, cached until one of ``models`` changes"""
+        key = f'admin:facets:{self.model._meta.label_lower}:{self.field_path}:{facet_version(*models)}'
+        facets = cache.get(key)
+        if facets is None:
+            facets = compute()
+            cache.set(key, facets, settings.ADMIN_FACET_CACHE_SECONDS)
+        return facets
+
+
+class CachedValuesFilter(CachedFacetsMixin, AllValuesFieldListFilter):
+    """Every value of the column, with its row count; ``(field, CachedValuesFilter)`` in list_filter"""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.model = model
+        super().__init__(field, request, params, model, model_admin, field_path)
+        # [(value, rows)], by value
+        self.facets = self.cached_facets(
+            lambda: list(
+                model._default_manager.order_by(field_path).values_list(field_path).annotate(rows=Count('pk'))
+            ),
+            model
+        )
+        self.lookup_choices = [value for value, rows in self.facets]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None and self.lookup_val_isnull is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': _('All'),
+        }
+        empty_rows = None
+        for value, rows in self.facets:
+            if value is None:
+                empty_rows = rows
+                continue
+            value = str(value)
+            yield {
+                'selected': self.lookup_val is not None and value in self.lookup_val,
+                'query_string': changelist.get_query_string({self.lookup_kwarg: value}, [self.lookup_kwarg_isnull]),
+                'display': f'{value} ({rows})',
+            }
+        if empty_rows is not None:
+            yield {
+                'selected': bool(self.lookup_val_isnull),
+                'query_string': changelist.get_query_string({self.lookup_kwarg_isnull: 'True'}, [self.lookup_kwarg]),
+                'display': f'{self.empty_value_display} ({empty_rows})',
+            }
+
+
+class CachedRelatedFilter(CachedFacetsMixin, RelatedFieldListFilter):
+    """
+    The related objects that rows point to, with their row counts;
+    ``(field, CachedRelatedFilter)`` in list_filter. Unlike the stock filter,
+    objects no row points to are left out.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.model = model
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        related = field.remote_field.model
+
+        def compute():
+            rows = dict(self.model._default_manager.order_by().values_list(self.field_path).annotate(rows=Count('pk')))
+            labels = related._default_manager.filter(pk__in=[pk for pk in rows if pk is not None])
+            choices = sorted(
+                ((obj.pk, str(obj), rows[obj.pk]) for obj in labels), key=lambda choice: choice[1].lower()
+            )
+            return choices, rows.get(None, 0)
+
+        # [(pk, label, rows)] by label, and the rows without one
+        self.facets, self.empty_rows = self.cached_facets(compute, self.model, related)
+        return [(pk, label) for pk, label, rows in self.facets]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None and not self.lookup_val_isnull,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': _('All'),
+        }
+        for pk, label, rows in self.facets:
+            yield {
+                'selected': self.lookup_val is not None and str(pk) in self.lookup_val,
+                'query_string': changelist.get_query_string({self.lookup_kwarg: pk}, [self.lookup_kwarg_isnull]),
+                'display': f'{label} ({rows})',
+            }
+        if self.include_empty_choice:
+            yield {
+                'selected': bool(self.lookup_val_isnull),
+                'query_string': changelist.get_query_string({self.lookup_kwarg_isnull: 'True'}, [self.lookup_kwarg]),
+                'display': f'{self.empty_value_display} ({self.empty_rows})',
+            }
@@ -0,0 +1,65 @@
+"""Small helpers shared by the benchmark management commands."""
+
+import statistics
+import time
+
+from django.db import close_old_connections
+
+
+class QueryCounter:
+    """execute_wrapper that only counts, unlike CaptureQueriesContext which also formats every SQL string"""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms):
+    """Return count/mean/p50/p95/p99/max for a list of latencies in milliseconds"""
+    values = sorted(latencies_ms)
+    return {
+        'count': len(values),
+        'mean': statistics.fmean(values) if values else 0.0,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': values[-1] if values else 0.0,
+    }
+
+
+def time_requests(client, path, iterations, **extra):
+    """
+    GET ``path`` ``iterations`` times through the Django test client and return
+    the latencies in milliseconds.
+
+    The test client deliberately keeps the database connection open between
+    requests, so close_old_connections() is called after each one the way the
+    real WSGI/ASGI handlers do on request_finished. That makes CONN_MAX_AGE and
+    pooling behave as they do in production.
+    """
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.get(path, **extra)
+        close_old_connections()
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'GET {path} returned {response.status_code}')
+    return latencies
+
+
+SUMMARY_HEADER = f"{'':<36}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+
+
+def format_summary(label, summary):
+    return (f"{label:<36}{summary['count']:>6}{summary['mean']:>10.2f}{summary['p50']:>10.2f}"
+            f"{summary['p95']:>10.2f}{summary['p99']:>10.2f}{summary['max']:>10.2f}")
@@ -0,0 +1,63 @@
+"""
+Tabular exports that scale with the number of rows.
+
+CSV is streamed: each row is encoded and sent as soon as the database
+cursor yields it. XLSX (a zip archive) can't be sent before it's complete,
+so it is built with openpyxl's write-only workbook, which keeps memory flat,
+into a temporary file that is then streamed from disk.
+"""
+
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output"""
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    writer = csv.writer(Echo())
+    # BOM so Excel opens the file as UTF-8
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(file, header, rows):
+    writer = csv.writer(file)
+    writer.writerow(header)
+    writer.writerows(rows)
+
+
+def write_xlsx(file, header, rows, title='Sheet'):
+    """Write a single-sheet workbook to a path or binary file object"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(file)
+
+
+def csv_response(filename, header, rows):
+    response = StreamingHttpResponse(iter_csv(header, rows), content_type=CSV_CONTENT_TYPE)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def xlsx_response(filename, header, rows, title='Sheet'):
+    file = tempfile.TemporaryFile()
+    write_xlsx(file, header, rows, title)
+    file.seek(0)
+    return FileResponse(file, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
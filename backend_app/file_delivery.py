@@ -0,0 +1,169 @@
+"""
+File responses for media, honouring settings.MEDIA_DELIVERY:
+
+- 'django':     the worker streams the file itself. Full responses go through
+                FileResponse (gunicorn turns that into sendfile); single byte
+                ranges are answered with 206 Partial Content.
+- 'x-accel':    an empty response with X-Accel-Redirect pointing at nginx's
+                internal MEDIA_ACCEL_REDIRECT_PREFIX location. nginx does the
+                transfer, including ranges.
+- 'x-sendfile': the same with an X-Sendfile header carrying the absolute path
+                (Apache mod_xsendfile, lighttpd).
+
+Access checks happen in the calling view before serve_file() is reached, so
+offloading never bypasses them. Conditional requests (If-None-Match,
+If-Modified-Since, If-Range) are answered here in every mode, so repeat
+downloads turn into 304s before any file bytes are touched.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range: bytes=...`` header.
+
+    Returns ``(start, end)`` with an inclusive end, None when the header is
+    absent, invalid or not something we serve partially (multiple ranges,
+    other units), or False when the range can't be satisfied. Per RFC 9110 an
+    invalid range is ignored (full 200 response) and an unsatisfiable one is
+    answered with 416.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes, of which an empty file has none
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        # Not a valid range (e.g. bytes=5-3): ignored
+        return None
+    if start >= size:
+        return False
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+def if_range_passes(request, etag, last_modified):
+    """
+    If-Range: only honour Range when the client's validator still matches.
+    ETags are compared strongly; a date must equal Last-Modified exactly.
+    """
+    header = request.META.get('HTTP_IF_RANGE')
+    if not header:
+        return True
+    if header.startswith(('"', 'W/"')):
+        return etag is not None and not header.startswith('W/') and header in parse_etags(etag)
+    return parse_http_date_safe(header) == last_modified
+
+
+def file_range_iterator(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, name, storage=None, *, as_attachment=False, filename=None,
+               content_type=None, cache_control=None, etag=None, last_modified=None):
+    """
+    Return a response delivering the stored file ``name``.
+
+    ``etag`` is a quoted strong entity tag and ``last_modified`` a datetime;
+    when omitted, Last-Modified comes from the file's mtime and no ETag is sent.
+    """
+    storage = storage or default_storage
+
+    try:
+        path = storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+    if not os.path.isfile(path):
+        raise Http404('File not found')
+
+    stat = os.stat(path)
+    last_modified = int(last_modified.timestamp() if last_modified else stat.st_mtime)
+
+    validators = {'Last-Modified': http_date(last_modified)}
+    if etag:
+        validators['ETag'] = etag
+    if cache_control:
+        validators['Cache-Control'] = cache_control
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for header, value in validators.items():
+            not_modified[header] = value
+        return not_modified
+
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    disposition = None
+    if as_attachment or filename:
+        disposition = content_disposition_header(as_attachment, filename or os.path.basename(path))
+
+    if settings.MEDIA_DELIVERY in ('x-accel', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_DELIVERY == 'x-accel':
+            relative = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(relative)
+        else:
+            response['X-Sendfile'] = path
+    else:
+        byte_range = None
+        if if_range_passes(request, etag, last_modified):
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                file_range_iterator(path, start, length),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+
+        response['Accept-Ranges'] = 'bytes'
+
+    for header, value in validators.items():
+        response[header] = value
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return response
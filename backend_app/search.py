@@ -0,0 +1,93 @@
+"""
+Substring search that stays indexed on large tables.
+
+A query is split into terms; a row matches when every term is contained
+(case-insensitively) in at least one of the searched columns. Django renders
+each test as ``UPPER(col::text) LIKE UPPER('%term%')``, and on PostgreSQL
+every searched column carries a trigram GIN index on exactly that
+expression (``TrigramIndex`` migrations), so the OR of columns becomes a
+BitmapOr of index scans instead of a sequential scan. Terms shorter than
+three characters have no trigrams and are ignored.
+
+Other databases (SQLite in development) skip the indexes and scan, which is
+fine at their sizes.
+"""
+
+from django.db import router
+from django.db.migrations.operations.base import Operation
+from django.db.models import Q
+
+
+MIN_TERM_LENGTH = 3
+
+
+def terms(query):
+    """Distinct searchable terms of ``query``, in order"""
+    return list(dict.fromkeys(
+        term for term in (query or '').split() if len(term) >= MIN_TERM_LENGTH
+    ))
+
+
+def matching(fields, query):
+    """
+    Q matching rows where every term of ``query`` is in one of ``fields``, or
+    None when the query has no searchable term
+    """
+    condition = None
+    for term in terms(query):
+        term_condition = Q()
+        for field in fields:
+            term_condition |= Q(**{f'{field}__icontains': term})
+        condition = term_condition if condition is None else condition & term_condition
+    return condition
+
+
+class TrigramIndex(Operation):
+    """
+    Migration operation creating a trigram GIN index on ``UPPER(column)`` -
+    the expression icontains filters on - on PostgreSQL, and nothing
+    elsewhere. Built CONCURRENTLY, so the migration must set ``atomic = False``
+    and the pg_trgm extension must exist (TrigramExtension).
+    """
+    reversible = True
+    reduces_to_sql = True
+
+    def __init__(self, model_name, name, column):
+        self.model_name = model_name
+        self.name = name
+        self.column = column
+
+    def deconstruct(self):
+        return self.__class__.__name__, [], {
+            'model_name': self.model_name, 'name': self.name, 'column': self.column
+        }
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def _applies(self, app_label, schema_editor):
+        return (
+            schema_editor.connection.vendor == 'postgresql'
+            and router.allow_migrate(schema_editor.connection.alias, app_label)
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._applies(app_label, schema_editor):
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(self.name)} ON {quote(model._meta.db_table)} '
+            f'USING gin ((UPPER({quote(self.column)}::text)) gin_trgm_ops)'
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if self._applies(app_label, schema_editor):
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(self.name)}')
+
+    def describe(self):
+        return f'Create trigram index {self.name} on {self.model_name}.{self.column} (PostgreSQL only)'
+
+    @property
+    def migration_name_fragment(self):
+        return self.name.lower()
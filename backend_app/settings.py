@@ -135,6 +135,15 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend_app.wsgi.application'
+ASGI_APPLICATION = 'backend_app.asgi.application'
+
+# Deployment mode, read by gunicorn.conf.py as well:
+# 'wsgi' = sync gunicorn workers, 'asgi' = gunicorn with uvicorn workers.
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+# Under ASGI, route the hot read endpoints to their async-ORM versions
+# (notifications/async_views.py, shipping/async_views.py).
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', str(SERVER_MODE == 'asgi')).lower() in ('true', '1', 'yes')
 
 AUTH_USER_MODEL = 'authentication.User'
 
@@ -155,9 +164,44 @@ DATABASES = {
          'PASSWORD': os.environ.get('DB_PASSWORD', 'kAluu@2025Express'),
         'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
          'PORT': os.environ.get('DB_PORT', '5432'),
+         # Drop a reused connection that went stale instead of failing the request
+         'CONN_HEALTH_CHECKS': True,
      }
  }
 
+# Connection management, selected with DB_CONN_MODE:
+#   persistent - reuse each worker's connection for DB_CONN_MAX_AGE seconds (default under WSGI)
+#   pool       - psycopg 3 connection pool per worker process (DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE,
+#                default under ASGI)
+#   pgbouncer  - persistent connections to pgbouncer running in transaction pooling mode
+#   none       - open and close a connection on every request
+# Connections belong to a thread, and under ASGI database calls run in changing
+# executor threads, so persistent connections pile up instead of being reused.
+DB_CONN_MODE = os.environ.get('DB_CONN_MODE', 'pool' if SERVER_MODE == 'asgi' else 'persistent').lower()
+
+if DB_CONN_MODE == 'pool':
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # pooled connections are returned, not kept
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '4')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),
+            'check': ConnectionPool.check_connection,
+        },
+    }
+elif DB_CONN_MODE == 'pgbouncer':
+    # Transaction pooling hands each transaction a different server connection,
+    # so named cursors can't outlive it. Prepared statements are already off.
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DB_CONN_MODE == 'none':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
 #DATABASES = {
   #          'default': {
  #               'ENGINE': 'django.db.backends.postgresql',
@@ -169,6 +213,25 @@ DATABASES = {
          #   }
      #      }
 
+# Cache, shared by all workers so invalidations (e.g. the rate matrix in
+# shipping/rates.py) reach every process: Redis when REDIS_URL is set,
+# otherwise a file cache on local disk.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -219,9 +282,34 @@ STORAGES = {
     },
 }
 
+# WhiteNoise serves everything under STATIC_URL, with Range support. Files
+# carrying a manifest hash in their name get a far-future immutable
+# Cache-Control, so collectstatic output can be cached by clients forever.
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# How media files are handed to clients (backend_app/file_delivery.py):
+#   django     - streamed by the worker, with Range support (development)
+#   x-accel    - X-Accel-Redirect to nginx's internal MEDIA_ACCEL_REDIRECT_PREFIX location
+#   x-sendfile - X-Sendfile header for Apache mod_xsendfile / lighttpd
+MEDIA_DELIVERY = os.environ.get('MEDIA_DELIVERY', 'django').lower()
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Media paths that are only served to authenticated users
+PROTECTED_MEDIA_PREFIXES = ['packing_lists/', 'thumbnails/packing_lists/']
+
+# Preview thumbnails (backend_app/thumbnails.py)
+THUMBNAIL_FORMAT = os.environ.get('THUMBNAIL_FORMAT', 'WEBP').upper()  # WEBP or JPEG
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+THUMBNAIL_CACHE_MAX_SIZE = int(os.environ.get('THUMBNAIL_CACHE_MAX_MB', 1024)) * 1024 * 1024
+
+# Admin changelists of large tables (backend_app/admin_tools.py)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000))
+ADMIN_DATE_HIERARCHY_CACHE_SECONDS = int(os.environ.get('ADMIN_DATE_HIERARCHY_CACHE_SECONDS', 600))
+ADMIN_FACET_CACHE_SECONDS = int(os.environ.get('ADMIN_FACET_CACHE_SECONDS', 3600))
+
 
 #  File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
@@ -230,6 +318,16 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 # Allowed file extensions
 ALLOWED_PDF_EXTENSIONS = ['.pdf']
 
+# Profile pictures are re-encoded to JPEG within these bounds (authentication/utils/images.py)
+PROFILE_PICTURE_MAX_UPLOAD_SIZE = 15 * 1024 * 1024  # 15MB
+PROFILE_PICTURE_MAX_PIXELS = 50_000_000
+PROFILE_PICTURE_MAX_DIMENSION = 1024
+PROFILE_PICTURE_JPEG_QUALITY = 85
+
+# Chunked packing-list uploads (shipping/uploads.py) bypass the limits above
+PACKING_LIST_UPLOAD_MAX_SIZE = 200 * 1024 * 1024  # 200MB per file
+PACKING_LIST_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB per request
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+from django.test.client import RequestFactory
+from django.utils.http import http_date
+
+from backend_app.file_delivery import parse_range, serve_file
+
+
+CONTENT = bytes(range(100))
+ETAG = '"v1"'
+MODIFIED = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        cases = [
+            (None, 100, None),
+            ('bytes=0-9', 100, (0, 9)),
+            ('bytes=90-', 100, (90, 99)),
+            ('bytes=90-500', 100, (90, 99)),
+            ('bytes=-10', 100, (90, 99)),
+            ('bytes=-500', 100, (0, 99)),
+            ('bytes=100-', 100, False),
+            ('bytes=-0', 100, False),
+            ('bytes=-500', 0, False),
+            ('bytes=0-', 0, False),
+            # Invalid, so ignored: served in full
+            ('bytes=5-3', 100, None),
+            ('bytes=0-1,5-6', 100, None),
+            ('items=0-1', 100, None),
+            ('bytes=-', 100, None),
+        ]
+        for header, size, expected in cases:
+            with self.subTest(header=header, size=size):
+                self.assertEqual(parse_range(header, size), expected)
+
+
+@override_settings(MEDIA_DELIVERY='django')
+class ServeFileTests(SimpleTestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.storage = FileSystemStorage(location=location)
+        self.storage.save('file.bin', ContentFile(CONTENT))
+        self.storage.save('empty.bin', ContentFile(b''))
+
+    def get(self, name='file.bin', **headers):
+        request = RequestFactory().get('/media/file.bin', **headers)
+        return serve_file(request, name, self.storage, etag=ETAG, last_modified=MODIFIED)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual((response.status_code, self.body(response)), (200, CONTENT))
+        self.assertEqual((response['ETag'], response['Accept-Ranges']), (ETAG, 'bytes'))
+
+    def test_range(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual((response.status_code, self.body(response)), (206, CONTENT[10:20]))
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_unsatisfiable_range(self):
+        response = self.get(HTTP_RANGE='bytes=200-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */100'))
+
+    def test_suffix_range_of_empty_file(self):
+        response = self.get('empty.bin', HTTP_RANGE='bytes=-500')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */0'))
+
+    def test_invalid_range_is_ignored(self):
+        response = self.get(HTTP_RANGE='bytes=5-3')
+        self.assertEqual((response.status_code, self.body(response)), (200, CONTENT))
+
+    def test_if_range(self):
+        for if_range, status in (
+            (ETAG, 206),
+            ('"v0"', 200),
+            ('W/"v1"', 200),
+            (http_date(MODIFIED.timestamp()), 206),
+            (http_date(MODIFIED.timestamp() - 60), 200),
+        ):
+            with self.subTest(if_range=if_range):
+                response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=if_range)
+                self.assertEqual(response.status_code, status)
+
+    def test_conditional_requests(self):
+        for headers, status in (
+            ({'HTTP_IF_NONE_MATCH': ETAG}, 304),
+            ({'HTTP_IF_NONE_MATCH': '"v0"'}, 200),
+            ({'HTTP_IF_MODIFIED_SINCE': http_date(MODIFIED.timestamp())}, 304),
+            ({'HTTP_IF_MODIFIED_SINCE': http_date(MODIFIED.timestamp() - 60)}, 200),
+            ({'HTTP_IF_MATCH': '"v0"'}, 412),
+        ):
+            with self.subTest(headers=headers):
+                response = self.get(**headers)
+                self.assertEqual(response.status_code, status)
+                if status == 304:
+                    self.assertEqual(response['ETag'], ETAG)
+
+    @override_settings(MEDIA_DELIVERY='x-accel', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_offloaded_to_nginx(self):
+        response = self.get(HTTP_RANGE='bytes=0-9')
+        self.assertEqual((response.status_code, response.content), (200, b''))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/file.bin')
@@ -0,0 +1,200 @@
+"""
+Preview derivatives: first-page thumbnails of packing-list PDFs and resized
+profile pictures.
+
+Derivatives are generated in a small thread pool when the source is saved
+(see the post_save handlers in shipping/signals.py and
+authentication/signals.py) and written to MEDIA_ROOT/thumbnails/<kind>/,
+named after the source file. Serializers only return a thumbnail URL once
+the file exists; a missing one is scheduled and clients fall back to a
+placeholder meanwhile.
+
+The directory is a cache bounded by THUMBNAIL_CACHE_MAX_SIZE. Each file's
+mtime is its last-used time (serve_media touches it on every hit) and
+``prune`` evicts the least recently used files; an evicted thumbnail is
+simply generated again the next time it's listed.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'thumbnails/'
+
+# kind -> (bounding box, crop to fill it)
+SPECS = {
+    'packing_lists': ((480, 680), False),
+    'profile_pictures': ((256, 256), True),
+}
+
+PRUNE_EVERY = 100
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+# PDFium is not thread-safe; PDF renders are serialized, image resizes run in parallel
+_pdfium_lock = threading.Lock()
+_generated = 0
+
+
+def thumbnail_name(kind, source_name):
+    key = hashlib.sha256(source_name.encode()).hexdigest()[:32]
+    extension = 'webp' if settings.THUMBNAIL_FORMAT == 'WEBP' else 'jpg'
+    return f'{CACHE_PREFIX}{kind}/{key[:2]}/{key}.{extension}'
+
+
+def render(kind, source_path):
+    """Return a PIL image of the preview for the file at ``source_path``"""
+    from PIL import Image, ImageOps
+
+    box, crop = SPECS[kind]
+
+    if source_path.lower().endswith('.pdf'):
+        import pypdfium2
+
+        with _pdfium_lock:
+            pdf = pypdfium2.PdfDocument(source_path)
+            try:
+                page = pdf[0]
+                # Render straight at thumbnail resolution instead of downscaling a full page
+                scale = min(box[0] / page.get_width(), box[1] / page.get_height())
+                image = page.render(scale=scale).to_pil()
+                page.close()
+            finally:
+                pdf.close()
+    else:
+        with Image.open(source_path) as original:
+            # Decode at a reduced size where the format allows it (JPEG draft mode)
+            original.draft('RGB', (box[0] * 2, box[1] * 2))
+            image = ImageOps.exif_transpose(original)
+            image.load()
+
+    image = image.convert('RGB')
+    if crop:
+        return ImageOps.fit(image, box, Image.Resampling.LANCZOS)
+    image.thumbnail(box, Image.Resampling.LANCZOS)
+    return image
+
+
+def generate(kind, source):
+    """Create the thumbnail for FieldFile ``source`` unless it exists; returns its name or None"""
+    name = thumbnail_name(kind, source.name)
+    path = default_storage.path(name)
+    if os.path.exists(path):
+        return name
+
+    try:
+        image = render(kind, source.path)
+    except Exception:
+        # Corrupt or unsupported uploads just don't get a preview
+        logger.warning('Could not generate %s thumbnail for %s', kind, source.name, exc_info=True)
+        return None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    image.save(tmp_path, settings.THUMBNAIL_FORMAT, quality=settings.THUMBNAIL_QUALITY)
+    os.replace(tmp_path, path)
+    return name
+
+
+def _run(kind, source, name):
+    global _generated
+    try:
+        generate(kind, source)
+    finally:
+        with _lock:
+            _pending.discard(name)
+            _generated += 1
+            prune_now = _generated % PRUNE_EVERY == 0
+    if prune_now:
+        prune(settings.THUMBNAIL_CACHE_MAX_SIZE)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def schedule(kind, source):
+    """Queue thumbnail generation for FieldFile ``source`` if it isn't cached yet"""
+    if not source:
+        return
+    name = thumbnail_name(kind, source.name)
+    if default_storage.exists(name):
+        return
+    executor = get_executor()
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    executor.submit(_run, kind, source, name)
+
+
+def thumbnail_url(kind, source, request=None):
+    """URL of the cached thumbnail, or None (and generation queued) when it isn't ready"""
+    if not source:
+        return None
+    name = thumbnail_name(kind, source.name)
+    if not default_storage.exists(name):
+        schedule(kind, source)
+        return None
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def touch(name):
+    """Mark a cached thumbnail as recently used"""
+    try:
+        os.utime(default_storage.path(name))
+    except OSError:
+        pass
+
+
+def prune(max_size, dry_run=False):
+    """
+    Evict least recently used thumbnails until the cache is under 90% of
+    ``max_size`` bytes. Returns ``(count, bytes)`` removed.
+    """
+    root = default_storage.path(CACHE_PREFIX)
+    entries = []
+    total = 0
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    if total <= max_size:
+        return 0, 0
+
+    target = max_size * 0.9
+    count = removed = 0
+    for _, size, path in sorted(entries):
+        if total - removed <= target:
+            break
+        if not dry_run:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        count += 1
+        removed += size
+    return count, removed
@@ -16,11 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
+from . import views
 
 
 urlpatterns = [
+    path('health/', views.health_check, name='health-check'),
     path('admin/', admin.site.urls),
     path('api/auth/', include('authentication.urls')),
     path('api/shipping/', include('shipping.urls')),
@@ -28,9 +28,11 @@ urlpatterns = [
 ]
 
 from django.urls import re_path
-from django.views.static import serve
 
+# Static files are served by WhiteNoise (see MIDDLEWARE); media goes through
+# serve_media so protected files keep their access check and can be offloaded
+# to the web server (MEDIA_DELIVERY).
 urlpatterns += [
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
-    re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
-] 
+    re_path(r'^media/(?P<path>.*)$', views.serve_media, name='media'),
+]
+
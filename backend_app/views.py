@@ -0,0 +1,69 @@
+import logging
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+
+from . import thumbnails
+from .file_delivery import serve_file
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASHED_RE = re.compile(r'(^|/)[0-9a-f]{64}\.\w+$')
+
+
+@require_GET
+def health_check(request):
+    """Liveness/readiness probe: checks the database connection and reports pool usage"""
+    data = {'status': 'ok', 'database': 'ok', 'db_conn_mode': settings.DB_CONN_MODE}
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        # The probe is public: the error (host, user, database name) goes to the log only
+        logger.exception('Health check could not reach the database')
+        data.update(status='error', database='unavailable')
+        return JsonResponse(data, status=503)
+
+    pool = getattr(connection, 'pool', None)
+    if pool is not None:
+        stats = pool.get_stats()
+        data['pool'] = {
+            key: stats.get(key, 0)
+            for key in ('pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting')
+        }
+
+    return JsonResponse(data)
+
+
+@api_view(['GET', 'HEAD'])
+@permission_classes([AllowAny])
+def serve_media(request, path):
+    """
+    Deliver files under MEDIA_URL through backend_app.file_delivery.
+
+    Paths under PROTECTED_MEDIA_PREFIXES (packing-list PDFs) need an
+    authenticated user, the same rule the packing-list API applies to reads.
+    Content-hashed names are cached by clients for a year.
+    """
+    protected = path.startswith(tuple(settings.PROTECTED_MEDIA_PREFIXES))
+    if protected and not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+
+    if path.startswith(thumbnails.CACHE_PREFIX):
+        thumbnails.touch(path)
+
+    if CONTENT_HASHED_RE.search(path):
+        # Named after a SHA-256 of the content: the bytes behind the URL never change
+        cache_control = f"{'private' if protected else 'public'}, max-age=31536000, immutable"
+    else:
+        cache_control = 'private, no-cache' if protected else None
+
+    return serve_file(request, path, cache_control=cache_control)
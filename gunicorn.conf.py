@@ -0,0 +1,33 @@
+# Gunicorn configuration
+#
+# SERVER_MODE=wsgi (default): sync workers on backend_app.wsgi
+# SERVER_MODE=asgi: uvicorn workers on backend_app.asgi, with the async read
+#                   views enabled (see ASYNC_READ_VIEWS in settings.py)
+
+import os
+
+server_mode = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '3'))
+timeout = 120
+limit_request_field_size = 16384
+limit_request_fields = 100
+
+if server_mode == 'asgi':
+    wsgi_app = 'backend_app.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'backend_app.wsgi:application'
+    worker_class = 'sync'
+
+
+def post_worker_init(worker):
+    """Build the pricing rate matrix before the worker takes requests"""
+    from shipping.rates import get_rate_matrix
+
+    try:
+        get_rate_matrix()
+    except Exception as e:
+        # Database not reachable yet; the matrix is built on first use instead
+        worker.log.warning('Rate matrix not preloaded: %s', e)
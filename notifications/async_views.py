@@ -0,0 +1,25 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from authentication.async_auth import async_jwt_required
+from .models import Notification
+from .serializers import NotificationSerializer
+
+
+# Async versions of the hot read endpoints, routed instead of the DRF views
+# when the app runs under ASGI (see ASYNC_READ_VIEWS in settings).
+
+@require_GET
+@async_jwt_required
+async def notification_list(request):
+    """Get all notifications for the authenticated user"""
+    notifications = [n async for n in Notification.objects.filter(user=request.user)]
+    return JsonResponse(NotificationSerializer(notifications, many=True).data, safe=False)
+
+
+@require_GET
+@async_jwt_required
+async def unread_count(request):
+    """Get count of unread notifications"""
+    count = await Notification.objects.filter(user=request.user, is_read=False).acount()
+    return JsonResponse({'unread_count': count})
@@ -1,8 +1,7 @@
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from shipping.models import Shipment
-from .models import Notification
-from .utils import send_push_notification
+from .utils import send_push_notification, shipment_route_notification, shipment_status_notification
 
 
 @receiver(pre_save, sender=Shipment)
@@ -16,54 +15,33 @@ def notify_shipment_changes(sender, instance, **kwargs):
         
         # Notify on status change
         if old_instance.status != instance.status:
-            title = f"Shipment Status Updated"
-            message = f"Your shipment {instance.tracking_code} is now {instance.get_status_display()}"
-            
-            notification = Notification.objects.create(
-                user=instance.customer,
-                notification_type='shipment_status',
-                title=title,
-                message=message,
-                data={
-                    'shipment_id': instance.id,
-                    'tracking_code': instance.tracking_code,
-                    'status': instance.status,
-                    'status_display': instance.get_status_display()
-                }
+            notification = shipment_status_notification(
+                instance.customer_id, instance.id, instance.tracking_code,
+                instance.status, instance.get_status_display()
             )
+            notification.save()
             
             # Send push notification
             send_push_notification(
                 user=instance.customer,
-                title=title,
-                message=message,
+                title=notification.title,
+                message=notification.message,
                 data=notification.data
             )
         
         # Notify on route stage change
         if old_instance.current_route_stage != instance.current_route_stage:
-            title = f"📍 Shipment Location Updated"
-            message = f"Your shipment {instance.tracking_code} has arrived at {instance.get_current_route_stage_display()}"
-            
-            notification = Notification.objects.create(
-                user=instance.customer,
-                notification_type='shipment_route',
-                title=title,
-                message=message,
-                data={
-                    'shipment_id': instance.id,
-                    'tracking_code': instance.tracking_code,
-                    'route_stage': instance.current_route_stage,
-                    'route_stage_display': instance.get_current_route_stage_display(),
-                    'progress': instance.route_progress
-                }
+            notification = shipment_route_notification(
+                instance.customer_id, instance.id, instance.tracking_code,
+                instance.current_route_stage, instance.get_current_route_stage_display(), instance.route_progress
             )
+            notification.save()
             
             # Send push notification
             send_push_notification(
                 user=instance.customer,
-                title=title,
-                message=message,
+                title=notification.title,
+                message=notification.message,
                 data=notification.data
             )
             
@@ -1,13 +1,21 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+if settings.ASYNC_READ_VIEWS:
+    notification_list_view = async_views.notification_list
+    unread_count_view = async_views.unread_count
+else:
+    notification_list_view = views.NotificationListView.as_view()
+    unread_count_view = views.unread_count
 
 urlpatterns = [
     # Device registration
     path('register-device/', views.RegisterDeviceView.as_view(), name='register-device'),
     
     # Notifications
-    path('', views.NotificationListView.as_view(), name='notification-list'),
+    path('', notification_list_view, name='notification-list'),
     path('<int:notification_id>/mark-read/', views.mark_notification_read, name='mark-notification-read'),
     path('mark-all-read/', views.mark_all_notifications_read, name='mark-all-notifications-read'),
-    path('unread-count/', views.unread_count, name='unread-count'),
+    path('unread-count/', unread_count_view, name='unread-count'),
 ]
@@ -1,4 +1,7 @@
 import logging
+import threading
+
+from django.db import connection
 
 logger = logging.getLogger(__name__)
 
@@ -21,3 +24,68 @@ def send_bulk_notification(users, title, message, data=None):
     """Send notification to multiple users"""
     for user in users:
         send_push_notification(user, title, message, data)
+
+
+def send_push_notifications(notifications):
+    """Push already-saved notifications, loading their users in one query"""
+    from django.contrib.auth import get_user_model
+
+    users = get_user_model().objects.in_bulk({notification.user_id for notification in notifications})
+    for notification in notifications:
+        user = users.get(notification.user_id)
+        if user is not None:
+            send_push_notification(user=user, title=notification.title, message=notification.message,
+                                   data=notification.data)
+
+
+class PushNotificationThread(threading.Thread):
+    """Fan out a batch of pushes without holding up the request or transaction that created them"""
+    def __init__(self, notifications):
+        self.notifications = notifications
+        threading.Thread.__init__(self)
+
+    def run(self):
+        try:
+            send_push_notifications(self.notifications)
+        except Exception as e:
+            logger.error(f"Failed to send {len(self.notifications)} push notification(s): {str(e)}")
+        finally:
+            connection.close()
+
+
+# ============ Shipment notifications ============
+def shipment_status_notification(user_id, shipment_id, tracking_code, status, status_display):
+    """Unsaved Notification for a shipment status change"""
+    from .models import Notification
+
+    return Notification(
+        user_id=user_id,
+        notification_type='shipment_status',
+        title="Shipment Status Updated",
+        message=f"Your shipment {tracking_code} is now {status_display}",
+        data={
+            'shipment_id': shipment_id,
+            'tracking_code': tracking_code,
+            'status': status,
+            'status_display': status_display
+        }
+    )
+
+
+def shipment_route_notification(user_id, shipment_id, tracking_code, route_stage, route_stage_display, progress):
+    """Unsaved Notification for a shipment arriving at a new route stage"""
+    from .models import Notification
+
+    return Notification(
+        user_id=user_id,
+        notification_type='shipment_route',
+        title="📍 Shipment Location Updated",
+        message=f"Your shipment {tracking_code} has arrived at {route_stage_display}",
+        data={
+            'shipment_id': shipment_id,
+            'tracking_code': tracking_code,
+            'route_stage': route_stage,
+            'route_stage_display': route_stage_display,
+            'progress': progress
+        }
+    )
@@ -0,0 +1,122 @@
+"""
+Side-by-side HTTP load test for the WSGI and ASGI deployment modes.
+
+Start both modes on the same box, e.g.
+
+    SERVER_MODE=wsgi GUNICORN_BIND=127.0.0.1:8000 gunicorn -c gunicorn.conf.py
+    SERVER_MODE=asgi GUNICORN_BIND=127.0.0.1:8001 gunicorn -c gunicorn.conf.py
+
+then run
+
+    python scripts/loadtest.py \\
+        --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001 \\
+        --token <access_token> --concurrency 50 --duration 30
+
+Each target is hit in turn (never concurrently, so they don't compete for CPU)
+with the same request mix, and throughput plus tail latency are printed.
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+
+
+DEFAULT_PATHS = [
+    '/api/notifications/unread-count/',
+    '/api/notifications/',
+    '/api/shipping/config/',
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_target(base_url, paths, headers, concurrency, duration, warmup):
+    latencies = []
+    errors = 0
+    path_cycle = itertools.cycle(paths)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        # Warm up connections, DB pools and caches
+        warm_deadline = time.perf_counter() + warmup
+        while time.perf_counter() < warm_deadline:
+            await client.get(next(path_cycle))
+
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(next(path_cycle))
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'mean': statistics.fmean(latencies) if latencies else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1] if latencies else 0.0,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                        help='Server to test, may be given several times')
+    parser.add_argument('--path', action='append', dest='paths', metavar='PATH',
+                        help='Request path, may be given several times (default: hot read endpoints)')
+    parser.add_argument('--token', help='JWT access token sent as "Authorization: Bearer <token>"')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per target')
+    parser.add_argument('--warmup', type=float, default=3, help='Warm-up seconds per target')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    paths = args.paths or DEFAULT_PATHS
+
+    results = []
+    for target in args.target:
+        name, _, url = target.partition('=')
+        if not url:
+            url = name
+        print(f'-> {name}: {url} ({args.concurrency} concurrent, {args.duration:.0f}s)')
+        stats = asyncio.run(run_target(url, paths, headers, args.concurrency, args.duration, args.warmup))
+        results.append((name, stats))
+
+    print()
+    print(f"{'target':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'mean ms':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in results:
+        print(f"{name:<12}{s['requests']:>10}{s['errors']:>8}{s['rps']:>10.1f}{s['mean']:>10.1f}"
+              f"{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,18 @@ from django.urls import path
 from django.http import JsonResponse
 from django.utils.html import format_html
 from django.db.models import Count, Sum
-from .models import PackingList, ServiceTier, WeightHandling, Invoice, Shipment, Payment
+from authentication.utils.search import normalize_query
+from backend_app.admin_tools import CachedRelatedFilter, ChangelistPerformanceMixin
+from backend_app.search import terms
+from .models import (
+    PackingList, ServiceTier, WeightHandling, Invoice, Shipment, ShipmentEvent, Payment, RevenueDaily, TransitLegStat,
+    Consolidation
+)
+from .events import acting_as
+from .search import search_shipments
+from .transitions import advance_to_next_stage, apply_bulk_transition, next_stage
+from . import pricing
+from .rates import get_rate_matrix
 
 
 # ============ Payment Inline ============
@@ -17,25 +28,47 @@ class PaymentInline(admin.TabularInline):
 
 
 # ============ Service Tier & Weight Handling Admin ============
+class RepriceActionsMixin:
+    """Preview / re-price the unpaid invoices using the selected rates"""
+    reprice_filter = None
+
+    actions = ['preview_repricing', 'reprice_open_invoices']
+
+    def repricing_invoices(self, queryset):
+        return Invoice.objects.filter(**{f'{self.reprice_filter}__in': queryset})
+
+    def preview_repricing(self, request, queryset):
+        for line in pricing.format_preview(pricing.preview(self.repricing_invoices(queryset))):
+            self.message_user(request, line)
+    preview_repricing.short_description = 'Preview re-pricing of unpaid invoices'
+
+    def reprice_open_invoices(self, request, queryset):
+        updated = pricing.reprice(self.repricing_invoices(queryset))
+        self.message_user(request, f'{updated} unpaid invoice(s) re-priced.')
+    reprice_open_invoices.short_description = 'Re-price unpaid invoices'
+
+
 @admin.register(ServiceTier)
-class ServiceTierAdmin(admin.ModelAdmin):
+class ServiceTierAdmin(RepriceActionsMixin, admin.ModelAdmin):
     list_display = ("name", "price_per_kg_usd", "description")
     search_fields = ("name",)
     list_editable = ("price_per_kg_usd",)
     list_per_page = 20
+    reprice_filter = 'service_tier'
 
 
 @admin.register(WeightHandling)
-class WeightHandlingAdmin(admin.ModelAdmin):
+class WeightHandlingAdmin(RepriceActionsMixin, admin.ModelAdmin):
     list_display = ("name", "rate_tsh_per_kg", "description")
     search_fields = ("name",)
     list_editable = ("rate_tsh_per_kg",)
     list_per_page = 20
+    reprice_filter = 'weight_handling'
 
 
 # ============ Invoice Admin ============
 @admin.register(Invoice)
-class InvoiceAdmin(admin.ModelAdmin):
+class InvoiceAdmin(ChangelistPerformanceMixin, admin.ModelAdmin):
     list_display = (
         "invoice_number", 
         "user_name", 
@@ -49,7 +82,13 @@ class InvoiceAdmin(admin.ModelAdmin):
         "created_at"
     )
     search_fields = ("invoice_number", "user__email", "user__full_name", "description")
-    list_filter = ("payment_status", "created_at", "service_tier", "weight_handling")
+    list_filter = (
+        "payment_status",
+        "created_at",
+        ("service_tier", CachedRelatedFilter),
+        ("weight_handling", CachedRelatedFilter)
+    )
+    list_select_related = ("user", "service_tier")
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
     list_per_page = 25
@@ -110,7 +149,7 @@ class InvoiceAdmin(admin.ModelAdmin):
         )
     payment_status_badge.short_description = 'Status'
     
-    actions = ['mark_as_paid', 'mark_as_unpaid']
+    actions = ['mark_as_paid', 'mark_as_unpaid', 'preview_repricing', 'reprice_selected']
     
     def mark_as_paid(self, request, queryset):
         updated = queryset.update(payment_status='paid')
@@ -121,6 +160,16 @@ class InvoiceAdmin(admin.ModelAdmin):
         updated = queryset.update(payment_status='unpaid')
         self.message_user(request, f'{updated} invoice(s) marked as unpaid.')
     mark_as_unpaid.short_description = 'Mark as Unpaid'
+
+    def preview_repricing(self, request, queryset):
+        for line in pricing.format_preview(pricing.preview(queryset)):
+            self.message_user(request, line)
+    preview_repricing.short_description = 'Preview re-pricing at current rates'
+
+    def reprice_selected(self, request, queryset):
+        updated = pricing.reprice(queryset)
+        self.message_user(request, f'{updated} unpaid invoice(s) re-priced at current rates.')
+    reprice_selected.short_description = 'Re-price at current rates (unpaid only)'
     
     def get_urls(self):
         urls = super().get_urls()
@@ -139,26 +188,134 @@ class InvoiceAdmin(admin.ModelAdmin):
             'handling_rate': 0,
         }
         
-        try:
-            if service_tier_id:
-                service_tier = ServiceTier.objects.get(pk=service_tier_id)
-                data['service_price'] = float(service_tier.price_per_kg_usd)
-        except ServiceTier.DoesNotExist:
-            pass
+        # Served from the cached rate matrix instead of two queries per keystroke
+        matrix = get_rate_matrix()
+        
+        if service_tier_id and service_tier_id.isdigit() and int(service_tier_id) in matrix.tiers:
+            data['service_price'] = float(matrix.tiers[int(service_tier_id)][1])
         
-        try:
-            if weight_handling_id:
-                weight_handling = WeightHandling.objects.get(pk=weight_handling_id)
-                data['handling_rate'] = float(weight_handling.rate_tsh_per_kg)
-        except WeightHandling.DoesNotExist:
-            pass
+        if weight_handling_id and weight_handling_id.isdigit() and int(weight_handling_id) in matrix.handlings:
+            data['handling_rate'] = float(matrix.handlings[int(weight_handling_id)][1])
         
         return JsonResponse(data)
 
 
+# ============ Revenue Rollup Admin ============
+@admin.register(RevenueDaily)
+class RevenueDailyAdmin(admin.ModelAdmin):
+    """Read-only: rows are maintained from invoice and payment writes"""
+    list_display = (
+        'date', 'service_tier', 'payment_method',
+        'invoice_count', 'invoiced_amount', 'outstanding_credit',
+        'payment_count', 'paid_amount'
+    )
+    list_filter = ('service_tier', 'payment_method')
+    list_select_related = ('service_tier',)
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# ============ Consolidation Admin ============
+class ConsolidationShipmentInline(admin.TabularInline):
+    model = Shipment
+    fields = ('tracking_code', 'customer', 'weight', 'status', 'current_route_stage')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = True
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Consolidation)
+class ConsolidationAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'description', 'shipment_count', 'status', 'current_route_stage', 'packing_list', 'created_at')
+    list_filter = ('status', 'current_route_stage')
+    search_fields = ('reference', 'description')
+    readonly_fields = ('status', 'current_route_stage', 'created_by', 'created_at', 'updated_at')
+    raw_id_fields = ('packing_list',)
+    inlines = [ConsolidationShipmentInline]
+    actions = ['mark_intransit', 'mark_delivered', 'move_to_next_stage']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(shipment_count=Count('shipments'))
+
+    def shipment_count(self, obj):
+        return obj.shipment_count
+    shipment_count.short_description = 'Shipments'
+    shipment_count.admin_order_field = 'shipment_count'
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+    def transition(self, request, queryset, label, **target):
+        updated = 0
+        for consolidation in queryset:
+            updated += consolidation.apply_transition(actor=request.user, **target)
+        self.message_user(request, f'{queryset.count()} consolidation(s) {label}: {updated} shipment(s) updated.')
+
+    def mark_intransit(self, request, queryset):
+        self.transition(request, queryset, 'marked as in transit', status='intransit')
+    mark_intransit.short_description = 'Mark as In Transit (with all shipments)'
+
+    def mark_delivered(self, request, queryset):
+        self.transition(request, queryset, 'marked as delivered', status='delivered')
+    mark_delivered.short_description = 'Mark as Delivered (with all shipments)'
+
+    def move_to_next_stage(self, request, queryset):
+        updated = 0
+        for consolidation in queryset:
+            stage = next_stage(consolidation.current_route_stage)
+            if stage:
+                updated += consolidation.apply_transition(route_stage=stage, actor=request.user)
+        self.message_user(request, f'{updated} shipment(s) moved to next stage.')
+    move_to_next_stage.short_description = 'Move to Next Stage (with all shipments)'
+
+
+# ============ Transit Statistics Admin ============
+@admin.register(TransitLegStat)
+class TransitLegStatAdmin(admin.ModelAdmin):
+    """Read-only: refreshed by the refresh_transit_stats command"""
+    list_display = ('milestone', 'next_milestone', 'sample_count', 'median_hours', 'mean_hours', 'p90_hours', 'computed_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # ============ Shipment Admin ============
+class ShipmentEventInline(admin.TabularInline):
+    """Read-only: the history is append-only"""
+    model = ShipmentEvent
+    fields = ('at', 'route_stage', 'status', 'actor')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    ordering = ('-at', '-id')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Shipment)
-class ShipmentAdmin(admin.ModelAdmin):
+class ShipmentAdmin(ChangelistPerformanceMixin, admin.ModelAdmin):
+    inlines = [ShipmentEventInline]
     list_display = (
         'tracking_code',
         'customer_display',
@@ -185,16 +342,19 @@ class ShipmentAdmin(admin.ModelAdmin):
         'registered_date', 
         'last_updated', 
         'actual_delivery_date',
+        'eta_predicted',
         'route_progress_display',
         'is_delivered'
     )
+    raw_id_fields = ('consolidation',)
+    list_select_related = ('customer',)
     date_hierarchy = 'registered_date'
     ordering = ('-registered_date',)
     list_per_page = 25
     
     fieldsets = (
         ('Tracking Information', {
-            'fields': ('tracking_code', 'status', 'current_route_stage', 'route_progress_display', 'is_delivered')
+            'fields': ('tracking_code', 'consolidation', 'status', 'current_route_stage', 'route_progress_display', 'is_delivered')
         }),
         ('Customer Details', {
             'fields': ('customer', 'customer_name', 'customer_email', 'customer_phone')
@@ -203,7 +363,7 @@ class ShipmentAdmin(admin.ModelAdmin):
             'fields': ('origin', 'destination', 'weight', 'description')
         }),
         ('Delivery Information', {
-            'fields': ('registered_date', 'last_updated', 'estimated_delivery', 'actual_delivery_date')
+            'fields': ('registered_date', 'last_updated', 'estimated_delivery', 'eta_predicted', 'actual_delivery_date')
         }),
         ('Admin Notes', {
             'fields': ('admin_notes',),
@@ -211,6 +371,13 @@ class ShipmentAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        """The search_fields, through the trigram indexes instead of a join and six-way ILIKE"""
+        if not terms(normalize_query(search_term)):
+            # Nothing long enough for the indexes (e.g. "KX"): the stock search_fields lookup
+            return super().get_search_results(request, queryset, search_term)
+        return search_shipments(queryset, search_term), False
+
     def customer_display(self, obj):
         """Display customer name or 'N/A' if not set"""
         if obj.customer:
@@ -258,33 +425,26 @@ class ShipmentAdmin(admin.ModelAdmin):
     
     actions = ['mark_intransit', 'mark_delivered', 'update_to_next_stage']
     
+    def save_model(self, request, obj, form, change):
+        if 'estimated_delivery' in form.changed_data:
+            # Set by hand: no longer overwritten by the predictions
+            obj.eta_predicted = False
+        with acting_as(request.user):
+            super().save_model(request, obj, form, change)
+
     def mark_intransit(self, request, queryset):
-        updated = queryset.update(status='intransit')
+        updated = len(apply_bulk_transition(queryset, status='intransit', actor=request.user))
         self.message_user(request, f'{updated} shipment(s) marked as in transit.')
     mark_intransit.short_description = 'Mark as In Transit'
     
     def mark_delivered(self, request, queryset):
-        from django.utils import timezone
-        for shipment in queryset:
-            shipment.status = 'delivered'
-            shipment.actual_delivery_date = timezone.now()
-            shipment.save()
-        self.message_user(request, f'{queryset.count()} shipment(s) marked as delivered.')
+        updated = len(apply_bulk_transition(queryset, status='delivered', actor=request.user))
+        self.message_user(request, f'{updated} shipment(s) marked as delivered.')
     mark_delivered.short_description = 'Mark as Delivered'
     
     def update_to_next_stage(self, request, queryset):
         """Move shipments to next route stage"""
-        stage_order = ['china', 'ethiopia', 'zanzibar', 'dar_es_salaam']
-        updated = 0
-        for shipment in queryset:
-            try:
-                current_index = stage_order.index(shipment.current_route_stage)
-                if current_index < len(stage_order) - 1:
-                    shipment.current_route_stage = stage_order[current_index + 1]
-                    shipment.save()
-                    updated += 1
-            except ValueError:
-                continue
+        updated = len(advance_to_next_stage(queryset, actor=request.user))
         self.message_user(request, f'{updated} shipment(s) moved to next stage.')
     update_to_next_stage.short_description = 'Move to Next Stage'
 
@@ -292,11 +452,15 @@ class ShipmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(PackingList)
-class PackingListAdmin(admin.ModelAdmin):
-    list_display = [ 'unique_id', 'date', 'created_by_name', 'total_cartons', 'total_weight', 'created_at']
-    list_filter = ['date', 'created_by']
+class PackingListAdmin(ChangelistPerformanceMixin, admin.ModelAdmin):
+    list_display = [ 'unique_id', 'date', 'created_by_name', 'total_cartons', 'total_weight', 'extraction_status', 'created_at']
+    list_filter = ['date', ('created_by', CachedRelatedFilter), 'extraction_status']
+    list_select_related = ['created_by']
     search_fields = ['created_by__full_name', 'created_by__email']
-    readonly_fields = ['unique_id', 'created_at', 'updated_at']
+    readonly_fields = [
+        'unique_id', 'created_at', 'updated_at',
+        'extraction_status', 'extracted_total_cartons', 'extracted_total_weight', 'extraction_error', 'extracted_at'
+    ]
     
     fieldsets = (
         ('Basic Information', {
@@ -305,6 +469,13 @@ class PackingListAdmin(admin.ModelAdmin):
         ('Packing Details', {
             'fields': ('total_cartons', 'total_weight', 'pdf_file')
         }),
+        ('Extracted from PDF', {
+            'fields': (
+                'extraction_status', 'extracted_total_cartons', 'extracted_total_weight',
+                'extraction_error', 'extracted_at'
+            ),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
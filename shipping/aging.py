@@ -0,0 +1,115 @@
+"""
+Accounts-receivable aging: outstanding credit per customer, split by how
+long ago each open invoice was raised.
+
+The whole report is one grouped query over open invoices (served by the
+``(payment_status, created_at)`` index), with one conditional SUM per age
+bucket, so its cost doesn't depend on the number of customers. Rows are
+streamed from the database cursor, which lets the CSV/XLSX exports
+(backend_app/exports.py) handle any number of customers in constant memory.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, Min, Q, Sum
+from django.utils import timezone
+
+from .models import Invoice
+
+
+OPEN_STATUSES = ('unpaid', 'partially_paid')
+
+# (key, label, youngest age in days, oldest age in days or None)
+BUCKETS = (
+    ('days_0_30', '0-30 days', 0, 30),
+    ('days_31_60', '31-60 days', 31, 60),
+    ('days_61_90', '61-90 days', 61, 90),
+    ('days_over_90', '90+ days', 91, None),
+)
+
+COLUMNS = (
+    ('customer_email', 'Customer email'),
+    ('customer_name', 'Customer name'),
+    ('customer_phone', 'Phone'),
+    ('invoices', 'Open invoices'),
+    ('oldest_invoice', 'Oldest invoice'),
+) + tuple((key, label) for key, label, _, _ in BUCKETS) + (
+    ('total', 'Total outstanding'),
+)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _bucket_sums(as_of):
+    """One conditional SUM of credit per bucket; an invoice's age is as_of minus its creation date"""
+    sums = {}
+    for key, _, youngest, oldest in BUCKETS:
+        condition = Q(created_at__lt=_start_of(as_of - timedelta(days=youngest - 1)))
+        if oldest is not None:
+            condition &= Q(created_at__gte=_start_of(as_of - timedelta(days=oldest)))
+        sums[key] = Sum('credit_amount', filter=condition, default=0)
+    return sums
+
+
+def open_invoices(as_of):
+    """Invoices with credit outstanding, raised on or before ``as_of``"""
+    return Invoice.objects.filter(
+        payment_status__in=OPEN_STATUSES,
+        created_at__lt=_start_of(as_of + timedelta(days=1)),
+        credit_amount__gt=0,
+    )
+
+
+def aging_rows(as_of=None, min_total=None):
+    """
+    Queryset of one dict per customer with outstanding credit: customer
+    fields, ``invoices``, ``oldest_invoice``, one amount per bucket key and
+    ``total``, largest balance first. Iterate it with ``.iterator()`` to stream.
+    """
+    as_of = as_of or timezone.localdate()
+    rows = (
+        open_invoices(as_of)
+        .values(
+            'user',
+            customer_email=F('user__email'),
+            customer_name=F('user__full_name'),
+            customer_phone=F('user__phone_number'),
+        )
+        .annotate(
+            invoices=Count('pk'),
+            oldest_invoice=Min('created_at'),
+            total=Sum('credit_amount'),
+            **_bucket_sums(as_of),
+        )
+        .order_by('-total', 'customer_email')
+    )
+    if min_total is not None:
+        rows = rows.filter(total__gte=min_total)
+    return rows
+
+
+def aging_totals(as_of=None):
+    """Bucket and overall totals across all customers"""
+    as_of = as_of or timezone.localdate()
+    return open_invoices(as_of).aggregate(
+        customers=Count('user', distinct=True),
+        invoices=Count('pk'),
+        total=Sum('credit_amount', default=0),
+        **_bucket_sums(as_of),
+    )
+
+
+def export_rows(rows):
+    """Yield plain value tuples in COLUMNS order, for the CSV/XLSX writers"""
+    for row in rows:
+        values = []
+        for key, _ in COLUMNS:
+            value = row[key]
+            if key == 'oldest_invoice':
+                value = timezone.localdate(value).isoformat()
+            elif key == 'customer_phone':
+                value = str(value) if value else ''
+            values.append(value)
+        yield values
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ShippingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shipping'
+
+    def ready(self):
+        import shipping.signals  # Import signals when app is ready
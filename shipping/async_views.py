@@ -0,0 +1,38 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.encoders import JSONEncoder
+
+from authentication.async_auth import async_jwt_required
+from .models import ServiceTier, WeightHandling, Shipment
+from .serializers import ServiceTierSerializer, WeightHandlingSerializer, ShipmentSerializer
+
+
+# Async versions of the hot read endpoints, routed instead of the DRF views
+# when the app runs under ASGI (see ASYNC_READ_VIEWS in settings).
+
+@require_GET
+async def get_shipping_config(request):
+    """Get service tiers and weight handling options"""
+    tiers = [t async for t in ServiceTier.objects.all()]
+    handling = [h async for h in WeightHandling.objects.all()]
+
+    return JsonResponse({
+        "service_tiers": ServiceTierSerializer(tiers, many=True).data,
+        "weight_handling": WeightHandlingSerializer(handling, many=True).data
+    }, encoder=JSONEncoder)
+
+
+@require_GET
+@async_jwt_required
+async def get_shipment_by_tracking(request, tracking_code):
+    """Retrieve a specific shipment by tracking code"""
+    # select_related so the serializer's customer.full_name needs no sync query
+    queryset = Shipment.objects.select_related('customer').filter(tracking_code=tracking_code)
+    if not request.user.is_staff:
+        queryset = queryset.filter(customer=request.user)
+
+    shipment = await queryset.afirst()
+    if shipment is None:
+        return JsonResponse({'detail': 'No Shipment matches the given query.'}, status=404)
+
+    return JsonResponse(ShipmentSerializer(shipment).data)
@@ -0,0 +1,27 @@
+"""
+Who is changing shipments, for the ShipmentEvent log.
+
+Views and admin code wrap their writes in ``acting_as(request.user)``;
+Shipment.save and ShipmentEvent.record pick the user up from here, so the
+actor reaches the event log without threading it through serializers and
+model methods. Outside such a block (commands, shell) events have no actor.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_actor = ContextVar('shipment_event_actor', default=None)
+
+
+def current_actor():
+    return _actor.get()
+
+
+@contextmanager
+def acting_as(user):
+    token = _actor.set(user if user is not None and user.is_authenticated else None)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
@@ -0,0 +1,153 @@
+"""
+Carton-line extraction from packing-list PDFs.
+
+Packing lists are tables of one line per consignment::
+
+    [NO] [CODE] CLIENT NAME [CONTACT] DESCRIPTION WEIGHT
+
+A carton code (``G001C``) starts a new carton; lines without one belong to
+the carton above them. ``parse_pdf`` is a pure function of the file path so
+it can run in a process pool (see the extract_packing_lists command); only
+``save_extraction`` touches the database, in the parent process.
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+
+CARTON_CODE_RE = re.compile(r'^[A-Z]\d{3}[A-Z]$')
+WEIGHT_RE = re.compile(r'^\d+(?:\.\d+)?$')
+PHONE_RE = re.compile(r'(?:\+?255|0)\d{8,9}')
+# "Date: 16 DEC 2025", "CTN : 28", "Phone: +255 ..." - labels, not table rows
+LABEL_RE = re.compile(r'^[A-Za-z][A-Za-z .]*\s?:')
+
+
+class ExtractionError(Exception):
+    """Raised when a PDF can't be read or contains no carton lines"""
+
+
+def is_table_header(line):
+    upper = line.upper()
+    return 'CODE' in upper and 'WEIGHT' in upper
+
+
+def parse_line(line):
+    """
+    Parse one table row into ``(carton_code, details, contact, weight)``,
+    or None when the line isn't a carton row.
+    """
+    tokens = line.split()
+    if len(tokens) < 2 or LABEL_RE.match(line) or not WEIGHT_RE.match(tokens[-1]):
+        return None
+
+    weight = Decimal(tokens.pop())
+    if tokens and tokens[0].isdigit():
+        # Row number column
+        tokens.pop(0)
+
+    code = ''
+    if tokens and CARTON_CODE_RE.match(tokens[0]):
+        code = tokens.pop(0)
+    if not tokens:
+        return None
+
+    details = ' '.join(tokens)
+    phone = PHONE_RE.search(details)
+    return code, details, phone.group(0) if phone else '', weight
+
+
+def parse_text(pages):
+    """Extract carton lines from the text of each page"""
+    lines = []
+    in_table = False
+    current_code = ''
+
+    for text in pages:
+        for raw in text.splitlines():
+            line = raw.strip()
+            if not line:
+                continue
+            if is_table_header(line):
+                in_table = True
+                continue
+            if not in_table:
+                continue
+            if line.upper().startswith('CONTACT INFORMATION'):
+                in_table = False
+                continue
+
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            code, details, contact, weight = parsed
+            if code:
+                current_code = code
+            lines.append({
+                'position': len(lines) + 1,
+                'carton_code': current_code,
+                'details': details[:255],
+                'contact': contact,
+                'weight': weight,
+            })
+
+    return lines
+
+
+def parse_pdf(path):
+    """
+    Read the PDF at ``path`` and return its carton lines and totals.
+    Runs in worker processes, so it must not touch the database.
+    """
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+
+    try:
+        reader = PdfReader(path)
+        pages = [page.extract_text() or '' for page in reader.pages]
+    except (PdfReadError, OSError, ValueError, InvalidOperation) as e:
+        raise ExtractionError(f'Could not read PDF: {e}')
+
+    lines = parse_text(pages)
+    if not lines:
+        raise ExtractionError('No carton lines found')
+
+    return {
+        'lines': lines,
+        'total_cartons': len({line['carton_code'] for line in lines if line['carton_code']}),
+        'total_weight': sum((line['weight'] for line in lines), Decimal('0')),
+    }
+
+
+def save_extraction(packing_list, result=None, error=None):
+    """Store the result of parse_pdf (or its error) on ``packing_list``"""
+    from .models import PackingList, PackingListLine
+
+    with transaction.atomic():
+        PackingListLine.objects.filter(packing_list=packing_list).delete()
+
+        if error is None:
+            PackingListLine.objects.bulk_create(
+                PackingListLine(packing_list=packing_list, **line) for line in result['lines']
+            )
+            fields = {
+                'extraction_status': 'extracted',
+                'extracted_total_cartons': result['total_cartons'],
+                'extracted_total_weight': result['total_weight'],
+                'extraction_error': '',
+            }
+        else:
+            fields = {
+                'extraction_status': 'failed',
+                'extracted_total_cartons': None,
+                'extracted_total_weight': None,
+                'extraction_error': str(error)[:255],
+            }
+
+        fields['extracted_at'] = timezone.now()
+        # update() keeps updated_at, and with it the download ETag, unchanged
+        PackingList.objects.filter(pk=packing_list.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(packing_list, name, value)
@@ -0,0 +1,304 @@
+"""
+Bulk shipment import from CSV or XLSX manifests.
+
+Rows are read lazily (csv.reader over the upload, openpyxl's read-only
+workbook) and handled in chunks of CHUNK_SIZE, so memory stays flat however
+long the manifest is. Per chunk:
+
+- every row is validated with ShipmentImportRowSerializer, no queries;
+- existing tracking codes are looked up with one ``IN`` query;
+- customers are resolved by verified email with one query (phones are not
+  verified, so they are never used; see shipping/linking.py);
+- new shipments are written with one bulk INSERT (plus one for their
+  initial ShipmentEvents), in the same transaction as the lookup.
+
+Tracking codes already in the database are skipped, or with
+``on_conflict='update'`` have the fields the manifest has columns for
+overwritten by a second INSERT (``ON CONFLICT (tracking_code) DO UPDATE``);
+the others keep their values. A code inserted by someone else between the
+lookup and the INSERT fails the chunk, which is then written again. Rows that
+fail are reported by row number and never stop the import.
+"""
+
+import csv
+import io
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+
+from authentication.utils.phones import normalize_phone
+from .models import Shipment, ShipmentEvent
+from .serializers import ShipmentImportRowSerializer
+
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+REQUIRED_COLUMNS = ['tracking_code', 'origin', 'destination', 'weight']
+IMPORT_FIELDS = [
+    'customer_name', 'customer_email', 'customer_phone', 'origin', 'destination',
+    'weight', 'description', 'estimated_delivery', 'admin_notes',
+]
+# Other spellings accepted in the header row
+COLUMN_ALIASES = {
+    'tracking': 'tracking_code',
+    'tracking_number': 'tracking_code',
+    'email': 'customer_email',
+    'phone': 'customer_phone',
+    'phone_number': 'customer_phone',
+    'name': 'customer_name',
+    'customer': 'customer_name',
+    'weight_kg': 'weight',
+    'weight_(kg)': 'weight',
+    'notes': 'admin_notes',
+}
+
+
+class ManifestError(Exception):
+    """Raised when a file can't be imported at all (unreadable, missing columns)"""
+
+
+def _column(name):
+    name = str(name or '').strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _header(values):
+    columns = [_column(value) for value in values]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ManifestError(f"Missing column(s): {', '.join(missing)}")
+    return columns
+
+
+def _records(columns, rows, first_row=2):
+    """(row number, dict) for every non-blank row; unknown columns are dropped"""
+    for number, values in enumerate(rows, start=first_row):
+        record = {}
+        for column, value in zip(columns, values):
+            if column not in REQUIRED_COLUMNS and column not in IMPORT_FIELDS:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == '':
+                continue
+            record[column] = value
+        if record:
+            yield number, record
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            raise ManifestError('The file is empty')
+        columns = _header(header)
+        yield columns
+        yield from _records(columns, reader)
+    except UnicodeDecodeError:
+        raise ManifestError('CSV files must be UTF-8 encoded')
+    finally:
+        # Leave the underlying upload open for its owner to close
+        text.detach()
+
+
+def _cell(value):
+    # Spreadsheet numbers are floats and dates are datetimes
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def read_xlsx(file):
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ManifestError('Not a readable .xlsx workbook')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ManifestError('The workbook is empty')
+        columns = _header(header)
+        yield columns
+        yield from _records(columns, (map(_cell, row) for row in rows))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, name):
+    """
+    The header's column names, then (row number, dict) for each row of a .csv
+    or .xlsx manifest, read lazily
+    """
+    if name.lower().endswith('.xlsx'):
+        return read_xlsx(file)
+    return read_csv(file)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def resolve_customers(emails):
+    """
+    Customer ids by lowercased email, in one query. Only verified accounts
+    count, and an email shared by several accounts resolves to nobody.
+    """
+    if not emails:
+        return {}
+    users = (
+        get_user_model().objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=emails)
+        .values_list('id', 'email_lower', 'is_verified')
+    )
+    by_email = {}
+    for user_id, email, is_verified in users:
+        by_email[email] = None if email in by_email or not is_verified else user_id
+    return by_email
+
+
+class Importer:
+    def __init__(self, on_conflict='skip', dry_run=False, actor=None, chunk_size=CHUNK_SIZE):
+        if on_conflict not in ('skip', 'update'):
+            raise ValueError(f'Unknown on_conflict mode: {on_conflict}')
+        self.on_conflict = on_conflict
+        self.dry_run = dry_run
+        self.actor = actor
+        self.chunk_size = chunk_size
+        self.validator = ShipmentImportRowSerializer()
+        self.seen = {}  # tracking code -> first row number
+        self.columns = []
+        self.report = {
+            'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'failed': 0, 'linked': 0,
+            'dry_run': dry_run, 'errors': [],
+        }
+
+    def error(self, row, tracking_code, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'row': row, 'tracking_code': tracking_code, 'errors': errors})
+
+    def validate(self, chunk):
+        valid = []
+        for number, record in chunk:
+            self.report['rows'] += 1
+            tracking_code = str(record.get('tracking_code', ''))
+            try:
+                data = self.validator.run_validation(record)
+            except serializers.ValidationError as e:
+                self.error(number, tracking_code, {
+                    field: [str(message) for message in messages] for field, messages in e.detail.items()
+                })
+                continue
+            first = self.seen.setdefault(data['tracking_code'], number)
+            if first != number:
+                self.error(number, data['tracking_code'],
+                           {'tracking_code': [f'Duplicate of row {first} in this file.']})
+                continue
+            phone = normalize_phone(data.get('customer_phone'))
+            if phone:
+                data['customer_phone'] = phone
+            valid.append((data, phone))
+        return valid
+
+    def build(self, rows):
+        """
+        Unsaved shipments with customers resolved from ``(data, E.164 phone)``
+        rows, and {tracking code: customer id} of the existing ones
+        """
+        existing = dict(
+            Shipment.objects.filter(tracking_code__in=[row['tracking_code'] for row, _ in rows])
+            .values_list('tracking_code', 'customer_id')
+        )
+        emails = {row['customer_email'].lower() for row, _ in rows if row.get('customer_email')}
+        by_email = resolve_customers(emails)
+
+        shipments = []
+        for row, phone in rows:
+            customer_id = (
+                by_email.get((row.get('customer_email') or '').lower())
+                # Updating a row never unlinks a customer the manifest doesn't name
+                or existing.get(row['tracking_code'])
+            )
+            shipments.append(Shipment(customer_id=customer_id, customer_phone_e164=phone, **row))
+        return shipments, existing
+
+    def update_fields(self):
+        """What an existing shipment takes from the manifest: only the columns it has"""
+        fields = [field for field in IMPORT_FIELDS if field in self.columns]
+        if 'customer_phone' in self.columns:
+            fields.append('customer_phone_e164')
+        if 'estimated_delivery' in self.columns:
+            # A date from the manifest counts as set by hand: refresh_transit_stats keeps it
+            fields.append('eta_predicted')
+        return fields + ['customer', 'last_updated']
+
+    def write(self, rows):
+        with transaction.atomic():
+            # Existing codes are looked up in the transaction that writes, and new shipments go in with a
+            # plain INSERT: a code another import added since makes it fail (run() then looks again) rather
+            # than be upserted and counted as created
+            shipments, existing = self.build(rows)
+            new = [shipment for shipment in shipments if shipment.tracking_code not in existing]
+            old = [shipment for shipment in shipments if shipment.tracking_code in existing]
+            if self.on_conflict == 'skip':
+                shipments = new
+            if not self.dry_run:
+                Shipment.objects.bulk_create(new)
+                if old and self.on_conflict == 'update':
+                    Shipment.objects.bulk_create(
+                        old,
+                        update_conflicts=True,
+                        unique_fields=['tracking_code'],
+                        update_fields=self.update_fields(),
+                    )
+                ShipmentEvent.record(new, actor=self.actor)
+
+        self.report['created'] += len(new)
+        self.report['linked'] += sum(1 for shipment in shipments if shipment.customer_id)
+        if self.on_conflict == 'update':
+            self.report['updated'] += len(old)
+        else:
+            self.report['skipped'] += len(old)
+
+    def run(self, rows):
+        """Import ``rows`` as returned by read_rows: the header's columns, then the records"""
+        rows = iter(rows)
+        self.columns = next(rows, [])
+        for chunk in _chunks(rows, self.chunk_size):
+            valid = self.validate(chunk)
+            if not valid:
+                continue
+            try:
+                self.write(valid)
+            except IntegrityError:
+                # Another import inserted some of these codes since we looked; look again
+                self.write(valid)
+        return self.report
+
+
+def import_shipments(file, name, on_conflict='skip', dry_run=False, actor=None, chunk_size=CHUNK_SIZE):
+    """
+    Import a .csv or .xlsx manifest. Returns a report: counts of rows,
+    created, updated, skipped (existing codes), failed and linked (customer
+    resolved) shipments, and the first MAX_REPORTED_ERRORS row errors.
+    Raises ManifestError if the file can't be read at all.
+    """
+    importer = Importer(on_conflict=on_conflict, dry_run=dry_run, actor=actor, chunk_size=chunk_size)
+    return importer.run(read_rows(file, name))
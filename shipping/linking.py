@@ -0,0 +1,154 @@
+"""
+Customer resolution and orphan shipments.
+
+An orphan is a shipment with no customer account, only the customer_email /
+customer_phone staff typed in. Lookups go through the indexed normalized
+forms - User.phone_e164, Shipment.customer_phone_e164 and LOWER(email) on
+both tables - never a scan of the free-text columns.
+
+Orphans are only ever linked automatically to an account whose email has
+been verified, and by that email: anyone can register with any phone number
+(it is never verified), and an unverified email proves nothing either. They
+are linked when a customer verifies their email (``LinkOrphansThread``, from
+shipping/signals.py) and in bulk by ``link_all`` (the link_orphan_shipments
+command, e.g. nightly cron), which matches a whole batch of orphans to users
+in one UPDATE with a correlated subquery. An email that more than one account
+has (in any case) is never used. Linking by phone is left to staff
+(/api/shipping/customers/resolve/). Only orphans are ever touched, so
+re-running is harmless.
+"""
+
+import logging
+import threading
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from .models import Shipment
+
+
+logger = logging.getLogger(__name__)
+BATCH_SIZE = 1000
+
+
+def normalize_email(email):
+    return (email or '').strip().lower() or None
+
+
+def resolve_customers(phone=None, email=None):
+    """Users with the E.164 ``phone`` or the ``email`` (any case)"""
+    condition = Q()
+    if phone:
+        condition |= Q(phone_e164=phone)
+    if email:
+        condition |= Exact(Lower('email'), normalize_email(email))
+    if not condition:
+        return get_user_model().objects.none()
+    return get_user_model().objects.filter(condition)
+
+
+def orphans(phone=None, email=None):
+    """Shipments without a customer whose E.164 phone or email (any case) match"""
+    condition = Q()
+    if phone:
+        condition |= Q(customer_phone_e164=phone)
+    if email:
+        condition |= Exact(Lower('customer_email'), normalize_email(email))
+    if not condition:
+        return Shipment.objects.none()
+    return Shipment.objects.filter(condition, customer__isnull=True)
+
+
+def link_orphans(user):
+    """
+    Attach the orphans with ``user``'s email to ``user`` in one UPDATE once
+    that email is verified; returns how many. An email another account also
+    has (in another case) is not used.
+    """
+    if not user.is_verified or not user.email:
+        return 0
+    if get_user_model().objects.filter(Exact(Lower('email'), normalize_email(user.email))).exclude(pk=user.pk).exists():
+        return 0
+    return orphans(email=user.email).update(customer=user, last_updated=timezone.now())
+
+
+def email_match():
+    """
+    Subquery of the id of the one verified user whose email is the outer
+    shipment's customer_email (any case); empty when none is, or when any
+    other account has the same email
+    """
+    # LOWER() on both sides, so the user side is a user_email_lower_idx lookup
+    User = get_user_model()
+    users = User.objects.filter(Exact(Lower('email'), Lower(OuterRef('customer_email'))), is_verified=True)
+    others = User.objects.filter(Exact(Lower('email'), Lower(OuterRef('email')))).exclude(pk=OuterRef('pk'))
+    return users.exclude(Exists(others)).values('pk')[:1]
+
+
+def link_batch(ids, dry_run=False):
+    """
+    Link the orphans among shipment ``ids`` by email. Returns (shipments
+    linked, Counter of customer ids).
+    """
+    batch = Shipment.objects.filter(pk__in=ids, customer__isnull=True)
+    customers = Counter(
+        batch.annotate(match=Subquery(email_match())).filter(match__isnull=False).values_list('match', flat=True)
+    )
+    if not dry_run and customers:
+        batch.filter(Exists(email_match())).update(customer=Subquery(email_match()), last_updated=timezone.now())
+    return customers.total(), customers
+
+
+def link_all(dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Link every orphan whose email a verified customer account has, in
+    batches of ``batch_size`` shipments. Returns a report: orphans scanned,
+    shipments linked, distinct customers and the customers with the most
+    newly linked shipments.
+    """
+    orphans = (
+        Shipment.objects.filter(customer__isnull=True)
+        .exclude(customer_email='')
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    report = {'orphans': 0, 'linked': 0, 'dry_run': dry_run}
+    customers = Counter()
+    last = 0
+    while True:
+        ids = list(orphans.filter(pk__gt=last)[:batch_size])
+        if not ids:
+            break
+        linked, linked_customers = link_batch(ids, dry_run)
+        report['orphans'] += len(ids)
+        report['linked'] += linked
+        customers.update(linked_customers)
+        last = ids[-1]
+
+    report['customers'] = len(customers)
+    top = dict(customers.most_common(20))
+    emails = dict(get_user_model().objects.filter(pk__in=top).values_list('pk', 'email'))
+    report['top_customers'] = [(emails.get(pk), count) for pk, count in top.items()]
+    return report
+
+
+class LinkOrphansThread(threading.Thread):
+    """Link a customer's orphan shipments without holding up email verification"""
+    def __init__(self, user):
+        self.user = user
+        threading.Thread.__init__(self)
+
+    def run(self):
+        try:
+            linked = link_orphans(self.user)
+            if linked:
+                logger.info(f"Linked {linked} shipment(s) to {self.user.email}")
+        except Exception as e:
+            logger.error(f"Failed to link shipments to {self.user.email}: {str(e)}")
+        finally:
+            connection.close()
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from backend_app import exports
+from shipping import aging
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the accounts-receivable aging report (outstanding credit per customer by invoice age) "
+        "as CSV or XLSX, e.g. from a nightly cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Report date (YYYY-MM-DD, default today)')
+        parser.add_argument('--min-total', type=float, help='Only customers owing at least this much')
+        parser.add_argument('--output', '-o',
+                            help='File to write; .xlsx for a workbook, anything else is CSV (default: CSV on stdout)')
+
+    def handle(self, *args, **options):
+        as_of = timezone.localdate()
+        if options['as_of']:
+            as_of = parse_date(options['as_of'])
+            if as_of is None:
+                raise CommandError('--as-of must be a date (YYYY-MM-DD)')
+
+        header = [label for _, label in aging.COLUMNS]
+        rows = aging.export_rows(aging.aging_rows(as_of, options['min_total']).iterator(chunk_size=2000))
+        output = options['output']
+
+        if not output:
+            exports.write_csv(sys.stdout, header, rows)
+            return
+        if output.lower().endswith('.xlsx'):
+            exports.write_xlsx(output, header, rows, title=f'Aging {as_of.isoformat()}')
+        else:
+            with open(output, 'w', newline='', encoding='utf-8') as file:
+                exports.write_csv(file, header, rows)
+
+        totals = aging.aging_totals(as_of)
+        self.stdout.write(self.style.SUCCESS(
+            f"Aging as of {as_of}: {totals['customers']} customer(s), "
+            f"TSH {totals['total']:,.2f} outstanding. Written to {output}"
+        ))
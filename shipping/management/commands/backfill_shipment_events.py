@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notifications.models import Notification
+from shipping.models import Shipment, ShipmentEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruct the ShipmentEvent history of shipments that have none, from their "
+        "registration date and the status/route notifications sent to the customer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Report without writing')
+
+    def replay(self, shipment, notifications):
+        """Events for one shipment: registration, each notified change, then the current state"""
+        stage, status = 'china', 'pending'
+        events = [ShipmentEvent(shipment=shipment, route_stage=stage, status=status, at=shipment.registered_date)]
+        for notification in notifications:
+            data = notification.data or {}
+            if notification.notification_type == 'shipment_status' and data.get('status'):
+                status = data['status']
+            elif notification.notification_type == 'shipment_route' and data.get('route_stage'):
+                stage = data['route_stage']
+            else:
+                continue
+            events.append(ShipmentEvent(shipment=shipment, route_stage=stage, status=status, at=notification.sent_at))
+
+        if (stage, status) != (shipment.current_route_stage, shipment.status):
+            # Changes made without a notification (no customer, bulk updates)
+            at = shipment.actual_delivery_date if shipment.status == 'delivered' and shipment.actual_delivery_date \
+                else shipment.last_updated
+            events.append(ShipmentEvent(
+                shipment=shipment,
+                route_stage=shipment.current_route_stage,
+                status=shipment.status,
+                at=max(at, events[-1].at)
+            ))
+        return events
+
+    def handle(self, *args, **options):
+        shipments = (
+            Shipment.objects.filter(events__isnull=True)
+            .only('id', 'registered_date', 'last_updated', 'actual_delivery_date', 'status', 'current_route_stage')
+            .order_by('id')
+        )
+        batch_size = options['batch_size']
+        last_id = 0
+        total_shipments = total_events = 0
+
+        while True:
+            batch = list(shipments.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            by_shipment = {shipment.id: [] for shipment in batch}
+            notifications = (
+                Notification.objects.filter(
+                    notification_type__in=['shipment_status', 'shipment_route'],
+                    data__shipment_id__in=list(by_shipment)
+                )
+                .only('notification_type', 'data', 'sent_at')
+                .order_by('sent_at', 'id')
+            )
+            for notification in notifications:
+                by_shipment[notification.data['shipment_id']].append(notification)
+
+            events = []
+            for shipment in batch:
+                events += self.replay(shipment, by_shipment[shipment.id])
+            if not options['dry_run']:
+                with transaction.atomic():
+                    ShipmentEvent.objects.bulk_create(events, batch_size=1000)
+            total_shipments += len(batch)
+            total_events += len(events)
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {total_events} event(s) for {total_shipments} shipment(s).'
+        ))
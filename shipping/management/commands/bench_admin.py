@@ -0,0 +1,202 @@
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from backend_app.admin_tools import CachedFacetsMixin
+from backend_app.benchmark import SUMMARY_HEADER, QueryCounter, format_summary, summarize
+from shipping.models import Invoice, PackingList, ServiceTier, Shipment, WeightHandling
+
+
+COUNTRIES = ['Tanzania', 'Kenya', 'Uganda', 'China', 'Ethiopia']
+# Synthetic rows are spread over this many days before today
+SPREAD_DAYS = 3 * 365
+
+
+@contextmanager
+def settable(model, field_name):
+    """Let bulk_create keep the dates we give an auto_now_add field"""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+@contextmanager
+def stock_changelist(model_admin):
+    """Undo the admin_tools tuning on one ModelAdmin instance"""
+    model_admin.list_filter = [
+        spec[0] if isinstance(spec, tuple) and issubclass(spec[1], CachedFacetsMixin) else spec
+        for spec in model_admin.list_filter
+    ]
+    model_admin.paginator = Paginator
+    model_admin.show_full_result_count = True
+    model_admin.list_select_related = False
+    model_admin.get_changelist = lambda request, **kwargs: ChangeList
+    try:
+        yield
+    finally:
+        for name in ('list_filter', 'paginator', 'show_full_result_count', 'list_select_related', 'get_changelist'):
+            del model_admin.__dict__[name]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the queries and latency of the Shipment, Invoice, User and Packing List admin changelists, "
+        "stock versus tuned (backend_app/admin_tools.py). Synthetic data, rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000, help='Rows added to each of the four tables')
+        parser.add_argument('--customers', type=int, default=5000,
+                            help='Of the added users, how many own the shipments and invoices')
+        parser.add_argument('--repeat', type=int, default=10, help='Renders per page and mode')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        run = uuid.uuid4().hex[:8]
+
+        # A private cache, so the tuned runs start cold and nothing outlives the rollback
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}), \
+                transaction.atomic():
+            started = time.perf_counter()
+            superuser = self.populate(run, rows, options['customers'])
+            self.stdout.write(f'{rows} rows per table in {time.perf_counter() - started:.0f} s')
+
+            year = str(timezone.now().year)
+            pages = [
+                ('shipments', Shipment, {}),
+                ('shipments, status', Shipment, {'status__exact': 'intransit'}),
+                ('shipments, this year', Shipment, {'registered_date__year': year}),
+                ('invoices', Invoice, {}),
+                ('invoices, unpaid', Invoice, {'payment_status__exact': 'unpaid'}),
+                ('invoices, this year', Invoice, {'created_at__year': year}),
+                ('users', get_user_model(), {}),
+                ('users, country', get_user_model(), {'country__exact': 'Kenya'}),
+                ('packing lists', PackingList, {}),
+            ]
+            factory = RequestFactory()
+            for mode in ('stock', 'tuned'):
+                self.stdout.write(f'\n{mode}')
+                self.stdout.write(f'{SUMMARY_HEADER}{"queries":>10}')
+                for label, model, params in pages:
+                    model_admin = admin.site._registry[model]
+                    path = f'/admin/{model._meta.app_label}/{model._meta.model_name}/'
+                    if mode == 'stock':
+                        with stock_changelist(model_admin):
+                            latencies, queries = self.render(factory, model_admin, path, params, superuser, options)
+                    else:
+                        latencies, queries = self.render(factory, model_admin, path, params, superuser, options)
+                    self.stdout.write(f'{format_summary(label, summarize(latencies))}{queries:>10}')
+
+            transaction.set_rollback(True)
+
+    def render(self, factory, model_admin, path, params, user, options):
+        latencies = []
+        for _ in range(options['repeat']):
+            request = factory.get(path, params)
+            request.user = user
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                response = model_admin.changelist_view(request)
+                response.render()
+                latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {path} {params} returned {response.status_code}')
+        return latencies, queries.count
+
+    def populate(self, run, rows, customer_count):
+        User = get_user_model()
+        now = timezone.now()
+
+        def moment(n):
+            return now - timedelta(days=n % SPREAD_DAYS, seconds=n % 86400)
+
+        superuser = User.objects.create(
+            email=f'bench-{run}-admin@example.com', full_name='Bench Admin', password='!',
+            is_staff=True, is_superuser=True
+        )
+        users = User.objects.bulk_create([
+            User(
+                email=f'bench-{run}-{n}@example.com',
+                full_name=f'Bench Customer {n}',
+                password='!',
+                country=COUNTRIES[n % len(COUNTRIES)],
+                date_joined=moment(n)
+            )
+            for n in range(rows)
+        ], batch_size=2000)
+        customers = users[:max(1, customer_count)]
+
+        with settable(Shipment, 'registered_date'):
+            Shipment.objects.bulk_create([
+                Shipment(
+                    tracking_code=f'BENCH-{run}-{n}',
+                    customer=customers[n % len(customers)] if n % 10 else None,
+                    customer_name=f'Bench Customer {n}',
+                    origin='Guangzhou',
+                    destination='Dar es Salaam',
+                    weight=Decimal('10.00'),
+                    status=Shipment.STATUS_CHOICES[n % 3][0],
+                    current_route_stage=Shipment.ROUTE_STAGES[n % 4][0],
+                    registered_date=moment(n)
+                )
+                for n in range(rows)
+            ], batch_size=2000)
+
+        tiers = [
+            ServiceTier.objects.create(name=f'Bench tier {n}', price_per_kg_usd=Decimal('8.00')) for n in range(3)
+        ]
+        handlings = [
+            WeightHandling.objects.create(name=f'Bench handling {n}', rate_tsh_per_kg=Decimal('500.00'))
+            for n in range(2)
+        ]
+        with settable(Invoice, 'created_at'):
+            Invoice.objects.bulk_create([
+                Invoice(
+                    invoice_number=f'BENCH-{run}-{n}',
+                    user=customers[n % len(customers)],
+                    description='Bench invoice',
+                    packages='1 carton',
+                    weight_kg=Decimal('10.00'),
+                    service_tier=tiers[n % len(tiers)],
+                    weight_handling=handlings[n % len(handlings)],
+                    total_amount=Decimal('100000.00'),
+                    credit_amount=Decimal('100000.00'),
+                    payment_status=('paid', 'unpaid', 'partially_paid')[n % 3],
+                    created_at=moment(n)
+                )
+                for n in range(rows)
+            ], batch_size=2000)
+
+        with settable(PackingList, 'created_at'):
+            PackingList.objects.bulk_create([
+                PackingList(
+                    date=moment(n).date(),
+                    created_by=superuser,
+                    pdf_file=f'packing_lists/bench/{run}-{n}.pdf',
+                    created_at=moment(n)
+                )
+                for n in range(rows)
+            ], batch_size=2000)
+
+        if connection.vendor == 'postgresql':
+            # Fresh planner statistics (and reltuples) for the rows above; rolled back with them
+            with connection.cursor() as cursor:
+                for model in (User, Shipment, Invoice, PackingList):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        return superuser
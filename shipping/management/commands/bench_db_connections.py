@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend_app.benchmark import SUMMARY_HEADER, format_summary, summarize, time_requests
+
+
+ENDPOINTS = [
+    ('invoice list', '/api/shipping/invoices/'),
+    ('shipment list', '/api/shipping/shipments/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark request latency of the invoice and shipment list endpoints with a new "
+        "database connection per request versus the configured DB_CONN_MODE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+        parser.add_argument('--email', help='User to authenticate as (default: first staff user)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['email']:
+            user = User.objects.filter(email=options['email']).first()
+        else:
+            user = User.objects.filter(is_staff=True, is_active=True).first()
+        if user is None:
+            raise CommandError('No user to authenticate as; pass --email')
+
+        token = str(RefreshToken.for_user(user).access_token)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        iterations = options['requests']
+
+        db_settings = connection.settings_dict
+        configured_max_age = db_settings['CONN_MAX_AGE']
+        modes = []
+        if connection.vendor == 'postgresql' and connection.pool is not None:
+            # The pool can't be switched off in-process, so there is no baseline run.
+            self.stdout.write(self.style.WARNING('Pool mode: only the configured mode is measured.'))
+        else:
+            modes.append(('new connection per request', 0))
+        modes.append((f'{settings.DB_CONN_MODE} (CONN_MAX_AGE={configured_max_age})', configured_max_age))
+
+        self.stdout.write(f'{iterations} requests per endpoint as {user.email}')
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                for mode_label, max_age in modes:
+                    connection.close()
+                    db_settings['CONN_MAX_AGE'] = max_age
+                    self.stdout.write(f'\n{mode_label}')
+                    self.stdout.write(SUMMARY_HEADER)
+                    for label, path in ENDPOINTS:
+                        time_requests(client, path, 5)  # warm up
+                        summary = summarize(time_requests(client, path, iterations))
+                        self.stdout.write(format_summary(label, summary))
+        finally:
+            connection.close()
+            db_settings['CONN_MAX_AGE'] = configured_max_age
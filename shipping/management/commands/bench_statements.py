@@ -0,0 +1,98 @@
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from authentication.utils.email import send_html_batch
+from shipping import statements
+from shipping.models import Invoice, Payment
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark statement generation on synthetic customers: loading, rendering serially and "
+        "in a process pool, and batched sending to the in-memory email backend. "
+        "The synthetic data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=2000)
+        parser.add_argument('--invoices', type=int, default=5, help='Invoices per customer')
+        parser.add_argument('--payments', type=int, default=3, help='Payments per customer')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Render processes')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def create_data(self, customers, invoices_per_customer, payments_per_customer):
+        User = get_user_model()
+        run = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create([
+            User(email=f'bench-{run}-{n}@example.com', full_name=f'Bench Customer {n}', password='!')
+            for n in range(customers)
+        ], batch_size=1000)
+        invoices = Invoice.objects.bulk_create([
+            Invoice(
+                invoice_number=f'BENCH-{run}-{n}-{i}',
+                user=user,
+                description='Synthetic shipment',
+                packages='1',
+                weight_kg=Decimal('12.50'),
+                total_amount=Decimal('406250.00'),
+                credit_amount=Decimal('406250.00'),
+            )
+            for n, user in enumerate(users)
+            for i in range(invoices_per_customer)
+        ], batch_size=1000)
+        Payment.objects.bulk_create([
+            Payment(invoice=invoice, amount=Decimal('50000.00'), payment_method='mobile', reference_number=f'REF{i}')
+            for invoice in invoices[::max(1, invoices_per_customer)]
+            for i in range(payments_per_customer)
+        ], batch_size=1000)
+        return [user.pk for user in users]
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(f'{label:<40}{elapsed:>8.2f}s{count / elapsed if elapsed else 0:>10.0f}/s')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write(
+                f"Creating {options['customers']} customers x {options['invoices']} invoices, "
+                f"{options['payments']} payments..."
+            )
+            user_ids = self.create_data(options['customers'], options['invoices'], options['payments'])
+            today = timezone.localdate()
+            period_start, period_end = statements.month_bounds(today.year, today.month)
+
+            started = time.perf_counter()
+            chunks = list(statements.iter_statements(period_start, period_end, options['chunk_size'], user_ids))
+            loaded = [statement for chunk in chunks for statement in chunk]
+            self.report('load (chunked)', len(loaded), time.perf_counter() - started)
+
+            started = time.perf_counter()
+            pages = [statements.render_statement(statement) for statement in loaded]
+            self.report('render, 1 process', len(pages), time.perf_counter() - started)
+
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                # Start the workers outside the measurement
+                list(pool.map(statements.render_statement, loaded[:options['workers']]))
+                started = time.perf_counter()
+                chunksize = max(1, len(loaded) // (options['workers'] * 4))
+                pages = list(pool.map(statements.render_statement, loaded, chunksize=chunksize))
+                self.report(f"render, {options['workers']} processes", len(pages), time.perf_counter() - started)
+
+            messages = [
+                (statements.statement_subject(statement), html_content, [statement['customer']['email']])
+                for statement, html_content in zip(loaded, pages)
+            ]
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                started = time.perf_counter()
+                sent = send_html_batch(messages)
+                self.report('send (locmem backend, batches of 100)', sent, time.perf_counter() - started)
+
+            transaction.set_rollback(True)
@@ -0,0 +1,73 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from backend_app.benchmark import QueryCounter
+from shipping.models import Consolidation, Shipment, ShipmentEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark moving a consolidation's shipments to the next stage: the set-based transition "
+        "versus saving shipments one by one. Synthetic data, rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shipments', type=int, default=5000)
+        parser.add_argument('--customers', type=int, default=500, help='Distinct customers to notify')
+        parser.add_argument('--baseline', type=int, default=200,
+                            help='Shipments saved one by one for the per-save baseline (extrapolated)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        run = uuid.uuid4().hex[:8]
+
+        with transaction.atomic():
+            customers = User.objects.bulk_create([
+                User(email=f'bench-{run}-{n}@example.com', full_name=f'Bench Customer {n}', password='!')
+                for n in range(options['customers'])
+            ], batch_size=1000)
+            consolidation = Consolidation.objects.create(reference=f'BENCH-{run}')
+            Shipment.objects.bulk_create([
+                Shipment(
+                    tracking_code=f'BENCH-{run}-{n}',
+                    customer=customers[n % len(customers)],
+                    origin='Guangzhou',
+                    destination='Dar es Salaam',
+                    weight=Decimal('10.00'),
+                    consolidation=consolidation if n >= options['baseline'] else None
+                )
+                for n in range(options['shipments'] + options['baseline'])
+            ], batch_size=1000)
+
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                updated = consolidation.apply_transition(route_stage='ethiopia', status='intransit')
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Set-based: {updated} shipment(s) in {elapsed * 1000:.0f} ms, {queries.count} queries, '
+                f'{ShipmentEvent.objects.filter(shipment__consolidation=consolidation).count()} event(s)'
+            )
+
+            baseline = list(Shipment.objects.filter(tracking_code__startswith=f'BENCH-{run}-', consolidation=None))
+            if baseline:
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    started = time.perf_counter()
+                    for shipment in baseline:
+                        shipment.current_route_stage = 'ethiopia'
+                        shipment.status = 'intransit'
+                        shipment.save()
+                    elapsed = time.perf_counter() - started
+                per_shipment = elapsed / len(baseline)
+                self.stdout.write(
+                    f'Per-save:  {len(baseline)} shipment(s) in {elapsed * 1000:.0f} ms, {queries.count} queries '
+                    f'-> about {per_shipment * options["shipments"]:.1f} s for {options["shipments"]}'
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,78 @@
+import os
+import shutil
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from shipping.models import PackingList
+from shipping.storage import CAS_PREFIX, file_sha256, packing_list_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move packing-list PDFs stored before content addressing into the "
+        "deduplicated store and report the disk space reclaimed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report, change nothing')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = packing_list_storage
+
+        legacy_names = (
+            PackingList.objects.exclude(pdf_file='')
+            .exclude(pdf_file__startswith=CAS_PREFIX)
+            .values_list('pdf_file', flat=True)
+            .distinct()
+        )
+
+        # blob name -> [(legacy name, size)]
+        groups = defaultdict(list)
+        missing = 0
+        scanned_bytes = 0
+        for name in legacy_names.iterator():
+            path = storage.path(name)
+            if not os.path.isfile(path):
+                missing += 1
+                self.stderr.write(f'Missing file: {name}')
+                continue
+            size = os.path.getsize(path)
+            scanned_bytes += size
+            groups[storage.blob_name(file_sha256(path))].append((name, size))
+
+        files = sum(len(members) for members in groups.values())
+        reclaimed = 0
+        for blob, members in groups.items():
+            blob_path = storage.path(blob)
+            blob_exists = storage.exists(blob)
+            # Every legacy copy goes away; one survives as the blob unless it already exists
+            reclaimed += sum(size for _, size in members) - (0 if blob_exists else members[0][1])
+            if dry_run:
+                continue
+
+            if not blob_exists:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                source = storage.path(members[0][0])
+                try:
+                    os.link(source, blob_path)
+                except OSError:
+                    shutil.copyfile(source, blob_path)
+
+            # Repoint rows before removing anything, so a crash leaves every row readable
+            legacy = [name for name, _ in members]
+            PackingList.objects.filter(pdf_file__in=legacy).update(pdf_file=blob)
+            for name in legacy:
+                os.remove(storage.path(name))
+
+        verb = 'Would reclaim' if dry_run else 'Reclaimed'
+        self.stdout.write(
+            f'Legacy files: {files} ({scanned_bytes / 1048576:.1f} MB), '
+            f'distinct contents: {len(groups)}, missing: {missing}'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {reclaimed / 1048576:.1f} MB '
+            f'({reclaimed / scanned_bytes:.0%} of packing-list storage).' if scanned_bytes else
+            f'{verb} 0.0 MB.'
+        ))
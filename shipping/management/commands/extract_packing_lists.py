@@ -0,0 +1,160 @@
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from shipping.extraction import ExtractionError, parse_pdf, save_extraction
+from shipping.models import PackingList
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract carton lines and totals from packing-list PDFs in a process pool. "
+        "Run from cron, or with --watch as a long-running worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+        parser.add_argument('--all', action='store_true', help='Re-extract every packing list, not only pending ones')
+        parser.add_argument('--ids', type=int, nargs='+', help='Re-extract these packing list ids')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep running, polling for pending packing lists at this interval')
+
+    def get_batch(self, batch_size):
+        packing_lists = (
+            PackingList.objects.exclude(pdf_file='')
+            .filter(extraction_status='pending')
+            .only('id', 'pdf_file')
+            .order_by('id')
+        )
+        return list(packing_lists[:batch_size])
+
+    def by_file(self, packing_lists):
+        """Identical PDFs share one stored file; each file is parsed once for all of them"""
+        by_file = defaultdict(list)
+        for packing_list in packing_lists:
+            by_file[packing_list.pdf_file.name].append(packing_list)
+        return by_file
+
+    def outcome(self, name, future):
+        """(result, error) of parsing file ``name``; a BrokenProcessPool is left to the caller"""
+        try:
+            return future.result(), None
+        except BrokenProcessPool:
+            raise
+        except (ExtractionError, OSError) as e:
+            return None, e
+        except Exception as e:
+            # A parser bug or a resource limit
+            logger.exception('Extracting packing list file %s failed', name)
+            return None, f'{type(e).__name__}: {e}'
+
+    def store(self, name, members, result, error):
+        """Save the outcome of file ``name`` on its packing lists; returns (extracted, failed)"""
+        for packing_list in members:
+            save_extraction(packing_list, result, error)
+        if error is None:
+            return len(members), 0
+        self.stderr.write(f'{name}: {error}')
+        return 0, len(members)
+
+    def extract(self, pool, packing_lists):
+        """
+        Parse ``packing_lists`` in ``pool`` and store the results. Errors are
+        recorded on the packing lists they concern and never stop the run.
+
+        A worker that dies (segfault, OOM kill) breaks the whole pool, and
+        every file still in it fails with BrokenProcessPool, whichever one
+        caused it. Those packing lists are left pending and returned, so that
+        ``isolate`` can find the culprit. Returns (extracted, failed, stalled).
+        """
+        by_file = self.by_file(packing_lists)
+        futures = {
+            pool.submit(parse_pdf, members[0].pdf_file.path): name
+            for name, members in by_file.items()
+        }
+
+        extracted = failed = 0
+        stalled = []
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result, error = self.outcome(name, future)
+            except BrokenProcessPool:
+                stalled += by_file[name]
+                continue
+            done, errors = self.store(name, by_file[name], result, error)
+            extracted += done
+            failed += errors
+        return extracted, failed, stalled
+
+    def isolate(self, packing_lists):
+        """
+        Extract the packing lists of a broken pool again, one file at a time
+        in a single worker: a file that kills it is the only one failed.
+        Returns (extracted, failed).
+        """
+        extracted = failed = 0
+        pool = ProcessPoolExecutor(max_workers=1)
+        try:
+            for name, members in self.by_file(packing_lists).items():
+                future = pool.submit(parse_pdf, members[0].pdf_file.path)
+                try:
+                    result, error = self.outcome(name, future)
+                except BrokenProcessPool:
+                    logger.error('Packing list file %s killed the extraction worker', name)
+                    result, error = None, 'The extraction worker died reading this file'
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(max_workers=1)
+                done, errors = self.store(name, members, result, error)
+                extracted += done
+                failed += errors
+        finally:
+            pool.shutdown()
+        return extracted, failed
+
+    def handle(self, *args, **options):
+        if options['all'] or options['ids']:
+            # Batches are picked by status, so re-extraction starts by resetting it
+            targets = PackingList.objects.exclude(pdf_file='')
+            if options['ids']:
+                targets = targets.filter(id__in=options['ids'])
+            targets.update(extraction_status='pending')
+
+        pool = ProcessPoolExecutor(max_workers=options['workers'])
+        try:
+            while True:
+                started = time.perf_counter()
+                total_extracted = total_failed = 0
+                while batch := self.get_batch(options['batch_size']):
+                    extracted, failed, stalled = self.extract(pool, batch)
+                    if stalled:
+                        # A dead worker takes the whole pool with it; carry on with a new one
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = ProcessPoolExecutor(max_workers=options['workers'])
+                        extracted_alone, failed_alone = self.isolate(stalled)
+                        extracted += extracted_alone
+                        failed += failed_alone
+                    total_extracted += extracted
+                    total_failed += failed
+
+                if total_extracted or total_failed or not options['watch']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Extracted {total_extracted} packing list(s), {total_failed} failed '
+                        f'in {time.perf_counter() - started:.1f}s with {options["workers"]} worker(s).'
+                    ))
+                if not options['watch']:
+                    break
+                close_old_connections()
+                time.sleep(options['watch'])
+        finally:
+            pool.shutdown()
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipping.storage import packing_list_storage, reference_counts
+
+
+class Command(BaseCommand):
+    help = "Delete packing-list PDF blobs that no packing list references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep unreferenced blobs written more recently than this')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        referenced = set(reference_counts())
+        older_than = time.time() - options['grace_hours'] * 3600
+
+        count, reclaimed = packing_list_storage.sweep(referenced, older_than, dry_run=options['dry_run'])
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {count} unreferenced blob(s), {reclaimed / 1048576:.1f} MB; '
+            f'{len(referenced)} blob(s) in use.'
+        ))
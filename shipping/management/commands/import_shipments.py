@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from backend_app import exports
+from shipping import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Create shipments from a CSV or XLSX manifest, linking customers by verified email. "
+        "Rows that fail are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.csv or .xlsx manifest')
+        parser.add_argument('--on-conflict', choices=['skip', 'update'], default='skip',
+                            help='What to do with tracking codes that already exist (default: skip)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without saving')
+        parser.add_argument('--chunk-size', type=int, default=imports.CHUNK_SIZE)
+        parser.add_argument('--actor', help='Email of the staff user recorded on the shipment events')
+        parser.add_argument('--errors', help='Write the row errors to this CSV file')
+
+    def handle(self, *args, **options):
+        actor = None
+        if options['actor']:
+            actor = get_user_model().objects.filter(email=options['actor']).first()
+            if actor is None:
+                raise CommandError(f"No user with email {options['actor']}")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                report = imports.import_shipments(
+                    file,
+                    options['path'],
+                    on_conflict=options['on_conflict'],
+                    dry_run=options['dry_run'],
+                    actor=actor,
+                    chunk_size=options['chunk_size'],
+                )
+        except (OSError, imports.ManifestError) as e:
+            raise CommandError(str(e))
+
+        if options['errors'] and report['errors']:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as file:
+                exports.write_csv(file, ['Row', 'Tracking code', 'Field', 'Error'], (
+                    [error['row'], error['tracking_code'], field, message]
+                    for error in report['errors']
+                    for field, messages in error['errors'].items()
+                    for message in messages
+                ))
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report['rows']} row(s): {report['created']} created, {report['updated']} updated, "
+            f"{report['skipped']} skipped (existing), {report['failed']} failed, "
+            f"{report['linked']} linked to a customer"
+        ))
+        if report['failed'] and not options['errors']:
+            for error in report['errors'][:20]:
+                self.stdout.write(f"  row {error['row']} ({error['tracking_code']}): {error['errors']}")
+            if report['failed'] > 20:
+                self.stdout.write(f"  ... {report['failed'] - 20} more; use --errors to write them all")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shipping import linking
+
+
+class Command(BaseCommand):
+    help = (
+        "Link shipments without a customer to the verified account with the same email "
+        "(e.g. nightly cron). Safe to re-run: only unlinked shipments are touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the matches without linking')
+        parser.add_argument('--batch-size', type=int, default=linking.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        report = linking.link_all(dry_run=options['dry_run'], batch_size=options['batch_size'])
+
+        verb = 'would be linked' if options['dry_run'] else 'linked'
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['orphans']} shipment(s) without a customer scanned; {report['linked']} {verb} "
+            f"to {report['customers']} customer(s)"
+        ))
+        for email, count in report['top_customers']:
+            self.stdout.write(f"  {email}: {count}")
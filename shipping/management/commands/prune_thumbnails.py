@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend_app import thumbnails
+
+
+class Command(BaseCommand):
+    help = "Evict least recently used preview thumbnails until the cache fits THUMBNAIL_CACHE_MAX_SIZE."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-mb', type=int, help='Cache size limit (default: THUMBNAIL_CACHE_MAX_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be evicted')
+
+    def handle(self, *args, **options):
+        max_size = options['max_mb'] * 1024 * 1024 if options['max_mb'] is not None else settings.THUMBNAIL_CACHE_MAX_SIZE
+        count, removed = thumbnails.prune(max_size, dry_run=options['dry_run'])
+
+        verb = 'Would evict' if options['dry_run'] else 'Evicted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {count} thumbnail(s), {removed / 1048576:.1f} MB.'))
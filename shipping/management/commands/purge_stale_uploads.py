@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shipping.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked packing-list uploads that were abandoned before being finalized."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48, help='Idle time before an upload is abandoned')
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(hours=options['hours'])
+        count = purge_stale_uploads(older_than)
+        self.stdout.write(self.style.SUCCESS(f'{count} stale upload(s) deleted.'))
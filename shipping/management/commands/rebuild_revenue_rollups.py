@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from shipping import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily revenue rollup from invoices and payments. "
+        "Run once after deploying it, and after bulk edits made outside the models."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First day to rebuild (YYYY-MM-DD); default all history')
+        parser.add_argument('--date-to', help='Last day to rebuild (YYYY-MM-DD); default all history')
+
+    def handle(self, *args, **options):
+        dates = {}
+        for option in ('date_from', 'date_to'):
+            value = options[option]
+            if value:
+                dates[option] = parse_date(value)
+                if dates[option] is None:
+                    raise CommandError(f"--{option.replace('_', '-')} must be a date (YYYY-MM-DD)")
+
+        written = rollups.rebuild(dates.get('date_from'), dates.get('date_to'))
+        self.stdout.write(self.style.SUCCESS(f'{written} rollup row(s) written.'))
@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shipping import transit
+from shipping.models import ShipmentEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute per-stage transit time statistics from the shipment history and fill in "
+        "predicted delivery dates for shipments in transit. Run from cron (e.g. hourly)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Only learn from legs started in the last N days')
+        parser.add_argument('--min-samples', type=int, default=5, help='Minimum legs per stage to use it')
+        parser.add_argument('--dry-run', action='store_true', help='Report without saving')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        since = timezone.now() - timedelta(days=options['days'])
+        events = ShipmentEvent.objects.filter(shipment__registered_date__gte=since)
+
+        stats = transit.compute_leg_stats(events, options['min_samples'])
+        for row in stats:
+            self.stdout.write(
+                f"{row['milestone']:>14} -> {row['next_milestone']:<14} {row['sample_count']:>6} legs  "
+                f"median {row['median_hours']:>7.1f}h  mean {row['mean_hours']:>7.1f}h  p90 {row['p90_hours']:>7.1f}h"
+            )
+        if not stats:
+            self.stdout.write(self.style.WARNING('Not enough history to compute transit statistics.'))
+            return
+
+        if not options['dry_run']:
+            transit.save_leg_stats(stats)
+        changed = transit.predict_etas(stats, dry_run=options['dry_run'])
+
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} the estimated delivery of {changed} shipment(s) in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from shipping import pricing
+from shipping.models import Invoice
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-price open invoices at the current service tier and weight handling rates. "
+        "Shows the impact per tier; pass --apply to write it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help='Update the invoices (default: preview only)')
+        parser.add_argument('--include-partially-paid', action='store_true',
+                            help='Also re-price partially paid invoices')
+        parser.add_argument('--tier', type=int, action='append', help='Only invoices of this service tier id')
+        parser.add_argument('--handling', type=int, action='append', help='Only invoices of this weight handling id')
+        parser.add_argument('--batch-size', type=int, help='Update in batches of this many rows')
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.all()
+        if options['tier']:
+            invoices = invoices.filter(service_tier__in=options['tier'])
+        if options['handling']:
+            invoices = invoices.filter(weight_handling__in=options['handling'])
+
+        statuses = pricing.OPEN_STATUSES
+        if options['include_partially_paid']:
+            statuses += ('partially_paid',)
+
+        rows = pricing.preview(invoices, statuses)
+        if not rows:
+            self.stdout.write('All open invoices already match the current rates.')
+            return
+        for line in pricing.format_preview(rows):
+            self.stdout.write(line)
+
+        if not options['apply']:
+            self.stdout.write('Preview only; run again with --apply to update.')
+            return
+
+        updated = pricing.reprice(invoices, statuses, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{updated} invoice(s) re-priced.'))
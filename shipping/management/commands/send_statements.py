@@ -0,0 +1,82 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.utils.email import send_html_batch
+from shipping import statements
+
+
+class Command(BaseCommand):
+    help = (
+        "Email every customer their statement for a month (default: last month). Customers are "
+        "loaded in chunks, statements are rendered in a process pool and sent in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Statement month as YYYY-MM (default: previous month)')
+        parser.add_argument('--email', action='append', help='Only this customer (repeatable)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Render processes; 1 renders in this process (see bench_statements)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Customers loaded per query batch')
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails sent per SMTP connection')
+        parser.add_argument('--output-dir', help='Also write each statement as an HTML file here')
+        parser.add_argument('--dry-run', action='store_true', help='Render without sending')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            match = re.fullmatch(r'(\d{4})-(\d{2})', options['month'])
+            if not match or not 1 <= int(match.group(2)) <= 12:
+                raise CommandError('--month must be YYYY-MM')
+            year, month = int(match.group(1)), int(match.group(2))
+        else:
+            year, month = statements.previous_month()
+        period_start, period_end = statements.month_bounds(year, month)
+
+        user_ids = None
+        if options['email']:
+            from authentication.models import User
+            user_ids = list(User.objects.filter(email__in=options['email']).values_list('pk', flat=True))
+
+        output_dir = options['output_dir']
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        rendered = 0
+        sends = []
+        # Rendering of the next chunk overlaps with sending the previous one
+        workers = options['workers']
+        with ThreadPoolExecutor(max_workers=1) as sender:
+            pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+            for chunk in statements.iter_statements(period_start, period_end, options['chunk_size'], user_ids):
+                if pool:
+                    chunksize = max(1, len(chunk) // (workers * 4))
+                    pages = list(pool.map(statements.render_statement, chunk, chunksize=chunksize))
+                else:
+                    pages = [statements.render_statement(statement) for statement in chunk]
+                rendered += len(pages)
+
+                if output_dir:
+                    for statement, html_content in zip(chunk, pages):
+                        filename = f"{period_start:%Y-%m}_{statement['customer']['email']}.html"
+                        with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as file:
+                            file.write(html_content)
+
+                if not options['dry_run']:
+                    messages = [
+                        (statements.statement_subject(statement), html_content, [statement['customer']['email']])
+                        for statement, html_content in zip(chunk, pages)
+                    ]
+                    sends.append(sender.submit(send_html_batch, messages, options['batch_size']))
+            if pool:
+                pool.shutdown()
+
+        sent = sum(future.result() for future in sends)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{period_start:%B %Y}: rendered {rendered} statement(s), sent {sent} '
+            f'in {elapsed:.1f}s ({rendered / elapsed if elapsed else 0:.0f}/s) with {workers} worker(s).'
+        ))
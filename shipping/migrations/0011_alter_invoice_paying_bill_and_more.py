@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-19 07:15
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0010_payment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='paying_bill',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Paid'),
+        ),
+        migrations.AlterField(
+            model_name='shipment',
+            name='customer_email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='shipment',
+            name='customer_phone',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.CreateModel(
+            name='PackingListUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('total_size', models.PositiveBigIntegerField(help_text='Size in bytes')),
+                ('checksum', models.CharField(help_text='SHA-256 hex digest, verified on finalize', max_length=64)),
+                ('received_bytes', models.PositiveBigIntegerField(default=0)),
+                ('temp_file', models.CharField(help_text='Storage path of the partial file', max_length=500)),
+                ('date', models.DateField(default=django.utils.timezone.now)),
+                ('total_cartons', models.IntegerField(default=0)),
+                ('total_weight', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('completed', 'Completed')], default='uploading', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='packing_list_uploads', to=settings.AUTH_USER_MODEL)),
+                ('packing_list', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='shipping.packinglist')),
+            ],
+            options={
+                'verbose_name': 'Packing List Upload',
+                'verbose_name_plural': 'Packing List Uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 07:17
+
+import shipping.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0011_alter_invoice_paying_bill_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='packinglist',
+            name='pdf_file',
+            field=models.FileField(max_length=500, storage=shipping.storage.get_packing_list_storage, upload_to='packing_lists/%Y/%m/'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0 on 2026-10-19 07:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0012_alter_packinglist_pdf_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packinglist',
+            name='extracted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='packinglist',
+            name='extracted_total_cartons',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='packinglist',
+            name='extracted_total_weight',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='packinglist',
+            name='extraction_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='packinglist',
+            name='extraction_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('extracted', 'Extracted'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PackingListLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('carton_code', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('details', models.CharField(help_text='Client name and description as printed', max_length=255)),
+                ('contact', models.CharField(blank=True, max_length=20)),
+                ('weight', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('packing_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='shipping.packinglist')),
+            ],
+            options={
+                'verbose_name': 'Packing List Line',
+                'verbose_name_plural': 'Packing List Lines',
+                'ordering': ['packing_list', 'position'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0013_packinglist_extracted_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='servicetier',
+            name='price_per_kg_usd',
+            field=models.DecimalField(decimal_places=4, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='weighthandling',
+            name='rate_tsh_per_kg',
+            field=models.DecimalField(decimal_places=4, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 07:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0014_alter_servicetier_price_per_kg_usd_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_method', models.CharField(blank=True, choices=[('cash', 'Cash'), ('bank', 'Bank Transfer'), ('mobile', 'Mobile Money')], max_length=20)),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('invoiced_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('outstanding_credit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('service_tier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='shipping.servicetier')),
+            ],
+            options={
+                'verbose_name': 'Daily Revenue',
+                'verbose_name_plural': 'Daily Revenue',
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'service_tier', 'payment_method'), name='unique_revenue_daily_bucket', nulls_distinct=False)],
+            },
+        ),
+    ]
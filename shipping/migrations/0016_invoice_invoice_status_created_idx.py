@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 07:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0015_revenuedaily'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['payment_status', 'created_at'], name='invoice_status_created_idx'),
+        ),
+    ]
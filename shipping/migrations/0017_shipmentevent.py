@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 07:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0016_invoice_invoice_status_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShipmentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route_stage', models.CharField(choices=[('china', 'China'), ('ethiopia', 'Ethiopia'), ('zanzibar', 'Zanzibar'), ('dar_es_salaam', 'Dar es Salaam')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('intransit', 'In Transit'), ('delivered', 'Delivered')], max_length=20)),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('shipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='shipping.shipment')),
+            ],
+            options={
+                'verbose_name': 'Shipment Event',
+                'verbose_name_plural': 'Shipment Events',
+                'ordering': ['shipment', 'at', 'id'],
+                'indexes': [models.Index(fields=['shipment', 'at'], name='shipment_event_timeline_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0017_shipmentevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransitLegStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('milestone', models.CharField(choices=[('china', 'China'), ('ethiopia', 'Ethiopia'), ('zanzibar', 'Zanzibar'), ('dar_es_salaam', 'Dar es Salaam')], max_length=20, unique=True)),
+                ('next_milestone', models.CharField(max_length=20)),
+                ('sample_count', models.PositiveIntegerField()),
+                ('mean_hours', models.FloatField()),
+                ('median_hours', models.FloatField()),
+                ('p90_hours', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Transit Leg Statistic',
+                'verbose_name_plural': 'Transit Leg Statistics',
+            },
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='eta_predicted',
+            field=models.BooleanField(default=False, help_text='Estimated delivery was filled from transit statistics (refreshed automatically)'),
+        ),
+    ]
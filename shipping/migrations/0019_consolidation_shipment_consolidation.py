@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 07:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0018_transitlegstat_shipment_eta_predicted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Consolidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(help_text='Manifest or flight reference', max_length=50, unique=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('intransit', 'In Transit'), ('delivered', 'Delivered')], default='pending', max_length=20)),
+                ('current_route_stage', models.CharField(choices=[('china', 'China'), ('ethiopia', 'Ethiopia'), ('zanzibar', 'Zanzibar'), ('dar_es_salaam', 'Dar es Salaam')], default='china', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='consolidations', to=settings.AUTH_USER_MODEL)),
+                ('packing_list', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='consolidations', to='shipping.packinglist')),
+            ],
+            options={
+                'verbose_name': 'Consolidation',
+                'verbose_name_plural': 'Consolidations',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='consolidation',
+            field=models.ForeignKey(blank=True, help_text='Manifest this shipment travels on', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shipments', to='shipping.consolidation'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from backend_app.search import TrigramIndex
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('shipping', '0019_consolidation_shipment_consolidation'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        TrigramIndex('shipment', 'shipment_tracking_code_trgm', 'tracking_code'),
+        TrigramIndex('shipment', 'shipment_customer_name_trgm', 'customer_name'),
+        TrigramIndex('shipment', 'shipment_customer_email_trgm', 'customer_email'),
+        TrigramIndex('shipment', 'shipment_customer_phone_trgm', 'customer_phone'),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-19 07:53
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+from authentication.utils.phones import normalize_phone
+
+
+def backfill_phone_e164(apps, schema_editor):
+    Shipment = apps.get_model('shipping', 'Shipment')
+    shipments = (
+        Shipment.objects.exclude(customer_phone__isnull=True).exclude(customer_phone='')
+        .order_by('pk').only('pk', 'customer_phone')
+    )
+    last = 0
+    while True:
+        batch = list(shipments.filter(pk__gt=last)[:2000])
+        if not batch:
+            return
+        for shipment in batch:
+            shipment.customer_phone_e164 = normalize_phone(shipment.customer_phone)
+        Shipment.objects.bulk_update(batch, ['customer_phone_e164'])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0020_shipment_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='customer_phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='customer_phone in E.164 form, kept in sync on save, for lookups', max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(django.db.models.functions.text.Lower('customer_email'), name='shipment_email_lower_idx'),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from backend_app.search import TrigramIndex
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('shipping', '0021_shipment_customer_phone_e164'),
+    ]
+
+    operations = [
+        TrigramIndex('shipment', 'shipment_phone_e164_trgm', 'customer_phone_e164'),
+    ]
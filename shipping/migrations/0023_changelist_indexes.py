@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-19 07:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0022_shipment_phone_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['created_at', 'id'], name='invoice_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packinglist',
+            index=models.Index(fields=['created_at', 'id'], name='packing_list_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['registered_date', 'id'], name='shipment_registered_idx'),
+        ),
+    ]
@@ -1,14 +1,20 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.conf import settings
 import uuid
 from decimal import Decimal
 
+from authentication.utils.phones import normalize_phone
+from .events import current_actor
+from .rates import get_rate_matrix
+from .storage import get_packing_list_storage
+
 
 class ServiceTier(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
-    price_per_kg_usd = models.FloatField()  # Admin sets this
+    price_per_kg_usd = models.DecimalField(max_digits=12, decimal_places=4)  # Admin sets this
 
     def __str__(self):
         return self.name
@@ -17,7 +23,7 @@ class ServiceTier(models.Model):
 class WeightHandling(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
-    rate_tsh_per_kg = models.FloatField()  # Admin sets this
+    rate_tsh_per_kg = models.DecimalField(max_digits=12, decimal_places=4)  # Admin sets this
 
     def __str__(self):
         return self.name
@@ -68,6 +74,14 @@ class Invoice(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Open invoices by age: the aging report and the revenue rollup
+            models.Index(fields=['payment_status', 'created_at'], name='invoice_status_created_idx'),
+            # Admin changelist order (newest first) and its date hierarchy
+            models.Index(fields=['created_at', 'id'], name='invoice_created_idx'),
+        ]
+
     def update_payment_totals(self):
         """Recalculate total paid and credit amount based on related payments"""
         total_paid = self.payments.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
@@ -94,17 +108,30 @@ class Invoice(models.Model):
                 number = 1
             self.invoice_number = f"INV-{number:04d}"
 
-        # CALCULATION — backend only
-        if self.service_tier and self.weight_handling:
-            service_price = Decimal(self.service_tier.price_per_kg_usd)
-            handling_price = Decimal(self.weight_handling.rate_tsh_per_kg)
-            self.total_amount = self.weight_kg * service_price * handling_price
+        # CALCULATION — backend only, from the cached rate matrix (no rate queries)
+        if self.service_tier_id and self.weight_handling_id:
+            matrix = get_rate_matrix()
+            if matrix.rate(self.service_tier_id, self.weight_handling_id) is None:
+                # Tier or handling created since the matrix was built
+                matrix = get_rate_matrix(refresh=True)
+            total = matrix.total(self.weight_kg, self.service_tier_id, self.weight_handling_id)
+            if total is not None:
+                self.total_amount = total
         
         # If this is an existing instance, we might want to ensure totals are correct
         # But usually update_payment_totals is called when payments change
         self.credit_amount = self.total_amount - Decimal(self.paying_bill)
 
         super().save(*args, **kwargs)
+        self._stored_service_tier_id = self.service_tier_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Tier as stored, so the revenue rollup can tell a tier change without a query
+        if 'service_tier_id' in instance.__dict__:
+            instance._stored_service_tier_id = instance.service_tier_id
+        return instance
 
     def __str__(self):
         return self.invoice_number
@@ -134,8 +161,17 @@ class Payment(models.Model):
     def __str__(self):
         return f"{self.invoice.invoice_number} - {self.amount}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Date as stored, so the revenue rollup can tell a date change without a query
+        if 'date' in instance.__dict__:
+            instance._stored_date = instance.date
+        return instance
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
+        self._stored_date = self.date
         # Update invoice totals after saving payment
         self.invoice.update_payment_totals()
     
@@ -146,6 +182,47 @@ class Payment(models.Model):
         invoice.update_payment_totals()
 
 
+class RevenueDaily(models.Model):
+    """
+    Daily revenue rollup for dashboards, kept up to date from Invoice and
+    Payment writes (shipping/rollups.py). Invoice rows (blank payment_method)
+    carry what was invoiced that day; payment rows what was received that day
+    per payment method.
+    """
+    date = models.DateField()
+    service_tier = models.ForeignKey(
+        ServiceTier,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='revenue_rollups'
+    )
+    payment_method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHODS, blank=True)
+
+    invoice_count = models.PositiveIntegerField(default=0)
+    invoiced_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    outstanding_credit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Daily Revenue'
+        verbose_name_plural = 'Daily Revenue'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'service_tier', 'payment_method'],
+                name='unique_revenue_daily_bucket',
+                nulls_distinct=False
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.service_tier or 'No tier'} {self.payment_method or 'invoiced'}"
+
+
 
 
 class Shipment(models.Model):
@@ -168,6 +245,14 @@ class Shipment(models.Model):
     customer_name = models.CharField(max_length=255, blank=True, null=True)
     customer_email = models.EmailField(blank=True)
     customer_phone = models.CharField(max_length=20,null=True,blank=True)
+    customer_phone_e164 = models.CharField(
+        max_length=16,
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+        help_text="customer_phone in E.164 form, kept in sync on save, for lookups"
+    )
     
     # Shipment Details
     origin = models.CharField(max_length=255)
@@ -183,15 +268,33 @@ class Shipment(models.Model):
     registered_date = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
     estimated_delivery = models.DateField(blank=True, null=True)
+    eta_predicted = models.BooleanField(
+        default=False,
+        help_text="Estimated delivery was filled from transit statistics (refreshed automatically)"
+    )
     actual_delivery_date = models.DateTimeField(blank=True, null=True)
     
     # Admin Notes
     admin_notes = models.TextField(blank=True, null=True)
+
+    consolidation = models.ForeignKey(
+        'Consolidation',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='shipments',
+        help_text="Manifest this shipment travels on"
+    )
     
     class Meta:
         ordering = ['-registered_date']
         verbose_name = 'Shipment'
         verbose_name_plural = 'Shipments'
+        indexes = [
+            models.Index(Lower('customer_email'), name='shipment_email_lower_idx'),
+            # Admin changelist order (newest first) and its date hierarchy
+            models.Index(fields=['registered_date', 'id'], name='shipment_registered_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tracking_code} - {self.status}"
@@ -225,9 +328,144 @@ class Shipment(models.Model):
     @property
     def is_delivered(self):
         return self.status == 'delivered'
-    
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stage and status as stored, to tell whether a save changes them
+        instance._recorded_state = (
+            instance.__dict__.get('current_route_stage'),
+            instance.__dict__.get('status')
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.customer_phone_e164 = normalize_phone(self.customer_phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'customer_phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'customer_phone_e164'}
+        super().save(*args, **kwargs)
+        state = (self.current_route_stage, self.status)
+        if state != getattr(self, '_recorded_state', None):
+            ShipmentEvent.record([self])
+            self._recorded_state = state
+
+
+class ShipmentEvent(models.Model):
+    """
+    Append-only history of a shipment's route stage and status: one row each
+    time either changes (Shipment.save, admin actions), with who changed it.
+    """
+    shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name='events')
+    route_stage = models.CharField(choices=Shipment.ROUTE_STAGES, max_length=20)
+    status = models.CharField(choices=Shipment.STATUS_CHOICES, max_length=20)
+    at = models.DateTimeField(default=timezone.now)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        ordering = ['shipment', 'at', 'id']
+        indexes = [
+            models.Index(fields=['shipment', 'at'], name='shipment_event_timeline_idx'),
+        ]
+        verbose_name = 'Shipment Event'
+        verbose_name_plural = 'Shipment Events'
+
+    def __str__(self):
+        return f"{self.shipment_id} {self.route_stage}/{self.status} at {self.at:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def record(cls, shipments, at=None, actor=None):
+        """Append the current stage and status of each shipment, in one INSERT"""
+        at = at or timezone.now()
+        actor = actor or current_actor()
+        return cls.objects.bulk_create([
+            cls(
+                shipment=shipment,
+                route_stage=shipment.current_route_stage,
+                status=shipment.status,
+                at=at,
+                actor=actor
+            )
+            for shipment in shipments
+        ])
+
+
+
+
+
+class Consolidation(models.Model):
+    """
+    A manifest of shipments travelling together (one flight or truck).
+    Moving the manifest to a stage moves all its shipments at once
+    (shipping/transitions.py).
+    """
+    reference = models.CharField(max_length=50, unique=True, help_text="Manifest or flight reference")
+    description = models.CharField(max_length=255, blank=True)
+    packing_list = models.ForeignKey(
+        'PackingList',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='consolidations'
+    )
+    status = models.CharField(choices=Shipment.STATUS_CHOICES, max_length=20, default='pending')
+    current_route_stage = models.CharField(choices=Shipment.ROUTE_STAGES, max_length=20, default='china')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='consolidations'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Consolidation'
+        verbose_name_plural = 'Consolidations'
+
+    def __str__(self):
+        return self.reference
+
+    def apply_transition(self, route_stage=None, status=None, actor=None):
+        """Move the manifest and every shipment on it; returns the number of shipments changed"""
+        from .transitions import apply_bulk_transition
+
+        if route_stage:
+            self.current_route_stage = route_stage
+        if status:
+            self.status = status
+        self.save(update_fields=['current_route_stage', 'status', 'updated_at'])
+        return len(apply_bulk_transition(self.shipments.all(), route_stage=route_stage, status=status, actor=actor))
+
+
+class TransitLegStat(models.Model):
+    """
+    How long shipments stay at each milestone before reaching the next one,
+    from the ShipmentEvent history (shipping/transit.py). Refreshed by the
+    refresh_transit_stats command.
+    """
+    milestone = models.CharField(choices=Shipment.ROUTE_STAGES, max_length=20, unique=True)
+    next_milestone = models.CharField(max_length=20)
+    sample_count = models.PositiveIntegerField()
+    mean_hours = models.FloatField()
+    median_hours = models.FloatField()
+    p90_hours = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Transit Leg Statistic'
+        verbose_name_plural = 'Transit Leg Statistics'
 
+    def __str__(self):
+        return f"{self.milestone} -> {self.next_milestone}: {self.median_hours:.0f}h median"
 
 
 class PackingList(models.Model):
@@ -251,8 +489,29 @@ class PackingList(models.Model):
     total_cartons = models.IntegerField(default=0)
     total_weight = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     
-    # PDF file (uploaded from Flutter)
-    pdf_file = models.FileField(upload_to='packing_lists/%Y/%m/', max_length=500)
+    # PDF file (uploaded from Flutter), stored once per distinct content
+    pdf_file = models.FileField(
+        upload_to='packing_lists/%Y/%m/',
+        storage=get_packing_list_storage,
+        max_length=500
+    )
+    
+    # Totals extracted from the PDF (see shipping/extraction.py)
+    EXTRACTION_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('extracted', 'Extracted'),
+        ('failed', 'Failed'),
+    ]
+    extraction_status = models.CharField(
+        max_length=20,
+        choices=EXTRACTION_STATUS_CHOICES,
+        default='pending',
+        db_index=True
+    )
+    extracted_total_cartons = models.IntegerField(null=True, blank=True)
+    extracted_total_weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    extraction_error = models.CharField(max_length=255, blank=True)
+    extracted_at = models.DateTimeField(null=True, blank=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -262,6 +521,98 @@ class PackingList(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Packing List'
         verbose_name_plural = 'Packing Lists'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='packing_list_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.unique_id} - {self.date}"
+
+    @property
+    def pdf_etag(self):
+        """Strong ETag for the PDF download, changing whenever the row is updated"""
+        return f'"{self.unique_id.hex}-{int(self.updated_at.timestamp() * 1000000)}"'
+
+    @property
+    def totals_match(self):
+        """Whether the entered totals agree with the PDF; None until extracted"""
+        if self.extraction_status != 'extracted':
+            return None
+        return (
+            self.total_cartons == self.extracted_total_cartons
+            and self.total_weight == self.extracted_total_weight
+        )
+
+
+class PackingListLine(models.Model):
+    """One consignment line of a packing list, extracted from its PDF"""
+    packing_list = models.ForeignKey(
+        PackingList,
+        on_delete=models.CASCADE,
+        related_name='lines'
+    )
+    position = models.PositiveIntegerField()
+    carton_code = models.CharField(max_length=20, blank=True, db_index=True)
+    details = models.CharField(max_length=255, help_text="Client name and description as printed")
+    contact = models.CharField(max_length=20, blank=True)
+    weight = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ['packing_list', 'position']
+        verbose_name = 'Packing List Line'
+        verbose_name_plural = 'Packing List Lines'
+
+    def __str__(self):
+        return f"{self.carton_code or '-'} {self.details} ({self.weight} kg)"
+
+
+
+class PackingListUpload(models.Model):
+    """Resumable chunked upload of a packing-list PDF (see shipping/uploads.py)"""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='packing_list_uploads'
+    )
+
+    # File being uploaded
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField(help_text="Size in bytes")
+    checksum = models.CharField(max_length=64, help_text="SHA-256 hex digest, verified on finalize")
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    temp_file = models.CharField(max_length=500, help_text="Storage path of the partial file")
+
+    # Packing list fields, applied when the upload is finalized
+    date = models.DateField(default=timezone.now)
+    total_cartons = models.IntegerField(default=0)
+    total_weight = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    packing_list = models.OneToOneField(
+        PackingList,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Packing List Upload'
+        verbose_name_plural = 'Packing List Uploads'
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.received_bytes >= self.total_size
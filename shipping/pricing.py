@@ -0,0 +1,127 @@
+"""
+Set-based invoice re-pricing.
+
+Invoice.save prices one row at a time. When a ServiceTier or WeightHandling
+rate changes, ``reprice`` recomputes every affected open invoice inside the
+database with a single UPDATE (optionally in batches of primary keys), and
+``preview`` reports the impact per service tier before anything is written.
+
+The formula is the one Invoice.save uses (through shipping/rates.py):
+    total_amount = round(weight_kg × price_per_kg_usd × rate_tsh_per_kg, 2)
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Round
+
+from . import rollups
+from .models import Invoice, ServiceTier, WeightHandling
+
+
+OPEN_STATUSES = ('unpaid',)
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def new_total_expression():
+    """Database-side total for each invoice row, from its current tier and handling rates"""
+    tier_price = ServiceTier.objects.filter(pk=OuterRef('service_tier_id')).values('price_per_kg_usd')[:1]
+    handling_rate = WeightHandling.objects.filter(pk=OuterRef('weight_handling_id')).values('rate_tsh_per_kg')[:1]
+    return Cast(
+        Round(F('weight_kg') * Subquery(tier_price) * Subquery(handling_rate), 2),
+        MONEY
+    )
+
+
+def repriceable(invoices=None, statuses=OPEN_STATUSES):
+    """Open invoices whose stored total differs from what the current rates give"""
+    invoices = Invoice.objects.all() if invoices is None else invoices
+    return (
+        invoices.filter(
+            payment_status__in=statuses,
+            service_tier__isnull=False,
+            weight_handling__isnull=False
+        )
+        .annotate(new_total=new_total_expression())
+        .filter(~Q(total_amount=F('new_total')))
+    )
+
+
+def preview(invoices=None, statuses=OPEN_STATUSES):
+    """
+    Impact of re-pricing, per service tier: a list of dicts with
+    ``service_tier``, ``invoices``, ``current_total``, ``new_total``, ``delta``.
+    """
+    rows = (
+        repriceable(invoices, statuses)
+        .values('service_tier', 'service_tier__name')
+        .annotate(
+            invoices=Count('pk'),
+            current=Sum('total_amount'),
+            new=Sum('new_total'),
+        )
+        .order_by('service_tier__name')
+    )
+    return [
+        {
+            'service_tier': row['service_tier__name'],
+            'invoices': row['invoices'],
+            'current_total': row['current'],
+            'new_total': row['new'],
+            'delta': row['new'] - row['current'],
+        }
+        for row in rows
+    ]
+
+
+def _update(invoices):
+    new_total = new_total_expression()
+    return invoices.update(
+        total_amount=new_total,
+        credit_amount=new_total - F('paying_bill'),
+        payment_status=Case(
+            When(paying_bill__gte=new_total, then=Value('paid')),
+            When(paying_bill__gt=0, then=Value('partially_paid')),
+            default=Value('unpaid'),
+        ),
+    )
+
+
+def reprice(invoices=None, statuses=OPEN_STATUSES, batch_size=None):
+    """
+    Re-price open invoices in the database and return the number updated.
+    Without ``batch_size`` this is one UPDATE statement; with it, rows are
+    updated in primary-key batches, each in its own short transaction.
+    """
+    targets = repriceable(invoices, statuses)
+    if not batch_size:
+        with transaction.atomic():
+            batch = Invoice.objects.filter(pk__in=targets.values('pk'))
+            # The UPDATE skips Invoice.save, so refresh the revenue rollup explicitly
+            rollups.schedule_invoices(batch)
+            return _update(batch)
+
+    pks = list(targets.values_list('pk', flat=True))
+    updated = 0
+    for start in range(0, len(pks), batch_size):
+        with transaction.atomic():
+            batch = Invoice.objects.filter(pk__in=pks[start:start + batch_size])
+            rollups.schedule_invoices(batch)
+            updated += _update(batch)
+    return updated
+
+
+def format_preview(rows):
+    """Plain-text lines for admin messages and command output"""
+    lines = []
+    total_delta = Decimal('0')
+    for row in rows:
+        total_delta += row['delta']
+        lines.append(
+            f"{row['service_tier']}: {row['invoices']} invoice(s), "
+            f"TSH {row['current_total']:,.2f} -> {row['new_total']:,.2f} ({row['delta']:+,.2f})"
+        )
+    lines.append(f'Total change: TSH {total_delta:+,.2f}')
+    return lines
@@ -0,0 +1,121 @@
+"""
+In-memory rate matrix: combined TSH-per-kg rate for every service tier ×
+weight handling pair.
+
+Each process keeps one RateMatrix, built with two queries. Its version is a
+token in Django's cache (shared between workers when CACHES points at Redis
+or the file cache); saving or deleting a ServiceTier or WeightHandling
+replaces the token (shipping/signals.py), and every process rebuilds its
+matrix the next time it notices the token changed. Pricing an invoice then
+needs no rate queries at all.
+"""
+
+import threading
+import uuid
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'shipping:rate_matrix:version'
+CENTS = Decimal('0.01')
+
+_matrix = None
+_lock = threading.Lock()
+
+
+class RateMatrix:
+    def __init__(self, version, tiers, handlings):
+        self.version = version
+        # id -> (name, per-kg rate)
+        self.tiers = tiers
+        self.handlings = handlings
+        self.rates = {
+            (tier_id, handling_id): tier_price * handling_rate
+            for tier_id, (_, tier_price) in tiers.items()
+            for handling_id, (_, handling_rate) in handlings.items()
+        }
+
+    # Matrices are equal when built from the same rates version, so memoized
+    # quotes are reused until the rates change and never after
+    def __eq__(self, other):
+        return isinstance(other, RateMatrix) and other.version == self.version
+
+    def __hash__(self):
+        return hash(self.version)
+
+    def rate(self, tier_id, handling_id):
+        """Combined TSH per kg, or None for an unknown pair"""
+        return self.rates.get((tier_id, handling_id))
+
+    def total(self, weight_kg, tier_id, handling_id):
+        """Invoice total rounded to cents, or None for an unknown pair"""
+        rate = self.rate(tier_id, handling_id)
+        if rate is None:
+            return None
+        return (Decimal(weight_kg) * rate).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def build(version):
+    from .models import ServiceTier, WeightHandling
+
+    tiers = {
+        pk: (name, price)
+        for pk, name, price in ServiceTier.objects.values_list('pk', 'name', 'price_per_kg_usd')
+    }
+    handlings = {
+        pk: (name, rate)
+        for pk, name, rate in WeightHandling.objects.values_list('pk', 'name', 'rate_tsh_per_kg')
+    }
+    return RateMatrix(version, tiers, handlings)
+
+
+def get_rate_matrix(refresh=False):
+    """The current matrix, rebuilt if the rates changed since it was built"""
+    global _matrix
+    version = current_version()
+    matrix = _matrix
+    if refresh or matrix is None or matrix.version != version:
+        with _lock:
+            if refresh or _matrix is None or _matrix.version != version:
+                _matrix = build(version)
+            matrix = _matrix
+    return matrix
+
+
+def invalidate():
+    """Make every process rebuild its matrix on next use"""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+@lru_cache(maxsize=4096)
+def quote_options(matrix, weight_kg, tier_ids=None, handling_ids=None):
+    """
+    Every tier × handling option for ``weight_kg``, cheapest first. ``tier_ids``
+    and ``handling_ids`` are tuples restricting the options (None for all).
+    Memoized per matrix version, weight and selection.
+    """
+    options = []
+    for tier_id, (tier_name, tier_price) in matrix.tiers.items():
+        if tier_ids is not None and tier_id not in tier_ids:
+            continue
+        for handling_id, (handling_name, handling_rate) in matrix.handlings.items():
+            if handling_ids is not None and handling_id not in handling_ids:
+                continue
+            options.append({
+                'service_tier': {'id': tier_id, 'name': tier_name, 'price_per_kg_usd': tier_price},
+                'weight_handling': {'id': handling_id, 'name': handling_name, 'rate_tsh_per_kg': handling_rate},
+                'rate_per_kg': matrix.rate(tier_id, handling_id),
+                'total_amount': matrix.total(weight_kg, tier_id, handling_id),
+            })
+    options.sort(key=lambda option: option['total_amount'])
+    return tuple(options)
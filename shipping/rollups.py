@@ -0,0 +1,189 @@
+"""
+Revenue read model: the RevenueDaily table.
+
+A bucket is one (day, service tier). Whenever an invoice or payment in a
+bucket is written, the bucket is recomputed from its source rows after the
+transaction commits (see the handlers in shipping/signals.py), so the rollup
+never drifts from the invoices and dashboards only ever read the rollup:
+a month of rows per tier instead of every invoice.
+
+- Invoice rows (blank payment_method): invoices created that day, their
+  total and the credit still outstanding on them.
+- Payment rows: payments dated that day, per payment method.
+
+``rebuild`` recomputes a whole date range set-based, for the initial fill
+and after bulk changes that bypass the model signals.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import Invoice, Payment, RevenueDaily
+
+
+logger = logging.getLogger(__name__)
+
+
+def invoice_day(invoice):
+    """The rollup day of an invoice: its creation date in the current time zone"""
+    return timezone.localdate(invoice.created_at)
+
+
+def _day_range(date_from, date_to):
+    """Aware datetime bounds covering ``date_from`` .. ``date_to`` inclusive"""
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return start, end
+
+
+def _rows(invoices, payments):
+    """RevenueDaily instances from grouped invoice and payment querysets"""
+    rows = [
+        RevenueDaily(
+            date=row['day'],
+            service_tier_id=row['service_tier'],
+            payment_method='',
+            invoice_count=row['count'],
+            invoiced_amount=row['invoiced'] or 0,
+            outstanding_credit=row['credit'] or 0,
+        )
+        for row in (
+            invoices.annotate(day=TruncDate('created_at'))
+            .values('day', 'service_tier')
+            .annotate(count=Count('pk'), invoiced=Sum('total_amount'), credit=Sum('credit_amount'))
+            .order_by()
+        )
+    ]
+    rows += [
+        RevenueDaily(
+            date=row['date'],
+            service_tier_id=row['invoice__service_tier'],
+            payment_method=row['payment_method'],
+            payment_count=row['count'],
+            paid_amount=row['paid'] or 0,
+        )
+        for row in (
+            payments.values('date', 'invoice__service_tier', 'payment_method')
+            .annotate(count=Count('pk'), paid=Sum('amount'))
+            .order_by()
+        )
+    ]
+    return rows
+
+
+def recompute(day, tier_id, attempts=3):
+    """Replace the rollup rows of one (day, tier) bucket with fresh aggregates"""
+    start, end = _day_range(day, day)
+    invoices = Invoice.objects.filter(created_at__gte=start, created_at__lt=end, service_tier_id=tier_id)
+    payments = Payment.objects.filter(date=day, invoice__service_tier_id=tier_id)
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                rows = _rows(invoices, payments)
+                RevenueDaily.objects.filter(date=day, service_tier_id=tier_id).delete()
+                RevenueDaily.objects.bulk_create(rows)
+            return
+        except IntegrityError:
+            # A concurrent recompute of the same bucket committed first; redo ours over it
+            if attempt == attempts - 1:
+                raise
+
+
+def _recompute_scheduled(day, tier_id):
+    try:
+        recompute(day, tier_id)
+    except Exception as e:
+        logger.error(f"Failed to update revenue rollup for {day} / tier {tier_id}: {str(e)}")
+
+
+def schedule(day, tier_id):
+    """Recompute a bucket once the current transaction commits"""
+    transaction.on_commit(lambda: _recompute_scheduled(day, tier_id))
+
+
+def invoice_buckets(invoices):
+    """Every (day, tier) bucket ``invoices`` count in: their own and their payments'"""
+    buckets = {
+        (row['day'], row['service_tier'])
+        for row in invoices.annotate(day=TruncDate('created_at')).values('day', 'service_tier').distinct()
+    }
+    buckets |= set(
+        Payment.objects.filter(invoice__in=invoices)
+        .values_list('date', 'invoice__service_tier')
+        .distinct()
+    )
+    return buckets
+
+
+def schedule_invoices(invoices):
+    """Recompute every bucket ``invoices`` count in once the transaction commits"""
+    for day, tier_id in invoice_buckets(invoices):
+        schedule(day, tier_id)
+
+
+def rebuild(date_from=None, date_to=None):
+    """
+    Recompute every bucket between ``date_from`` and ``date_to`` (inclusive,
+    None for open-ended) in one transaction. Returns the number of rows written.
+    """
+    invoices = Invoice.objects.all()
+    payments = Payment.objects.all()
+    existing = RevenueDaily.objects.all()
+    if date_from:
+        invoices = invoices.filter(created_at__gte=_day_range(date_from, date_from)[0])
+        payments = payments.filter(date__gte=date_from)
+        existing = existing.filter(date__gte=date_from)
+    if date_to:
+        invoices = invoices.filter(created_at__lt=_day_range(date_to, date_to)[1])
+        payments = payments.filter(date__lte=date_to)
+        existing = existing.filter(date__lte=date_to)
+
+    rows = _rows(invoices, payments)
+    with transaction.atomic():
+        existing.delete()
+        RevenueDaily.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def summarize(date_from, date_to, period='day', group_by=None):
+    """
+    Rollup totals per day or month between two dates, optionally split by
+    ``'service_tier'`` or ``'payment_method'``. Reads RevenueDaily only.
+    Returns ``(rows, totals)``.
+    """
+    rollup = RevenueDaily.objects.filter(date__gte=date_from, date__lte=date_to)
+    sums = {
+        'invoice_count': Sum('invoice_count'),
+        'invoiced_amount': Sum('invoiced_amount'),
+        'outstanding_credit': Sum('outstanding_credit'),
+        'payment_count': Sum('payment_count'),
+        'paid_amount': Sum('paid_amount'),
+    }
+
+    fields = ['period']
+    if group_by == 'service_tier':
+        fields += ['service_tier', 'service_tier__name']
+    elif group_by == 'payment_method':
+        fields += ['payment_method']
+
+    period_expression = TruncMonth('date') if period == 'month' else F('date')
+    rows = list(
+        rollup.annotate(period=period_expression)
+        .values(*fields)
+        .annotate(**sums)
+        .order_by(*fields)
+    )
+    for row in rows:
+        if group_by == 'service_tier':
+            row['service_tier'] = {'id': row['service_tier'], 'name': row.pop('service_tier__name')}
+        elif group_by == 'payment_method':
+            # Invoice rows carry no payment method
+            row['payment_method'] = row['payment_method'] or None
+
+    totals = rollup.aggregate(**sums)
+    return rows, {name: value or 0 for name, value in totals.items()}
@@ -0,0 +1,35 @@
+"""
+Staff search over shipments, for the admin and /api/shipping/search/ (see
+backend_app/search.py for the matching rules and indexes).
+
+A shipment matches on its own tracking code, customer name, email and phone
+(as typed or normalized), or through its linked customer. Those customers
+are resolved first with their own indexed search and passed as a short id
+list, so the shipment query never joins users and stays a BitmapOr of index
+scans.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from authentication.utils.search import normalize_query, search_users
+from backend_app.search import matching
+
+
+SHIPMENT_FIELDS = ['tracking_code', 'customer_name', 'customer_email', 'customer_phone', 'customer_phone_e164']
+# Shipments of at most this many matching customers are included
+MAX_MATCHED_CUSTOMERS = 100
+
+
+def search_shipments(queryset, query):
+    query = normalize_query(query)
+    condition = matching(SHIPMENT_FIELDS, query)
+    if condition is None:
+        return queryset.none()
+    customers = list(
+        search_users(get_user_model().objects.order_by(), query)
+        .values_list('id', flat=True)[:MAX_MATCHED_CUSTOMERS]
+    )
+    if customers:
+        condition |= Q(customer_id__in=customers)
+    return queryset.filter(condition)
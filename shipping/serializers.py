@@ -1,20 +1,48 @@
+import os
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils.text import get_valid_filename
 from rest_framework import serializers
-from .models import ServiceTier, WeightHandling, Invoice, Shipment, PackingList, Payment
+
+from authentication.utils.phones import normalize_phone
+from backend_app import thumbnails
+from .models import (
+    ServiceTier, WeightHandling, Invoice, Shipment, ShipmentEvent, PackingList, PackingListLine, PackingListUpload,
+    Payment, Consolidation
+)
 
 
 # ============ Service Tier & Weight Handling Serializers ============
 class ServiceTierSerializer(serializers.ModelSerializer):
+    # Rates stay JSON numbers for the app, as they were before becoming exact decimals
+    price_per_kg_usd = serializers.DecimalField(max_digits=12, decimal_places=4, coerce_to_string=False)
+
     class Meta:
         model = ServiceTier
         fields = '__all__'
 
 
 class WeightHandlingSerializer(serializers.ModelSerializer):
+    rate_tsh_per_kg = serializers.DecimalField(max_digits=12, decimal_places=4, coerce_to_string=False)
+
     class Meta:
         model = WeightHandling
         fields = '__all__'
 
 
+class QuoteRequestSerializer(serializers.Serializer):
+    """Weights to price; all tiers and handlings unless restricted"""
+    weights = serializers.ListField(
+        child=serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01')),
+        min_length=1,
+        max_length=50
+    )
+    service_tier_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    weight_handling_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
 # ============ Payment Serializer ============
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -70,7 +98,9 @@ class ShipmentSerializer(serializers.ModelSerializer):
             'registered_date',
             'last_updated',
             'estimated_delivery',
+            'eta_predicted',
             'actual_delivery_date',
+            'consolidation',
             'admin_notes'
         ]
         read_only_fields = [
@@ -78,9 +108,32 @@ class ShipmentSerializer(serializers.ModelSerializer):
             'registered_date',
             'last_updated',
             'route_progress',
-            'is_delivered'
+            'is_delivered',
+            'eta_predicted'
         ]
 
+    def update(self, instance, validated_data):
+        if 'estimated_delivery' in validated_data and validated_data['estimated_delivery'] != instance.estimated_delivery:
+            # Set by hand: no longer overwritten by the predictions
+            validated_data['eta_predicted'] = False
+        return super().update(instance, validated_data)
+
+
+class ShipmentEventSerializer(serializers.ModelSerializer):
+    """One entry of a shipment's timeline; the actor is only shown to staff"""
+    route_stage_display = serializers.CharField(source='get_route_stage_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    actor_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShipmentEvent
+        fields = ['route_stage', 'route_stage_display', 'status', 'status_display', 'at', 'actor_name']
+
+    def get_actor_name(self, obj):
+        if not self.context.get('include_actor') or obj.actor is None:
+            return None
+        return obj.actor.full_name
+
 
 class ShipmentCreateSerializer(serializers.ModelSerializer):
     customer_email = serializers.EmailField(
@@ -106,21 +159,112 @@ class ShipmentCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class ShipmentImportRowSerializer(ShipmentCreateSerializer):
+    """One manifest row (shipping/imports.py); the customer is resolved from email/phone afterwards"""
+
+    class Meta(ShipmentCreateSerializer.Meta):
+        fields = [field for field in ShipmentCreateSerializer.Meta.fields if field != 'customer']
+        # Existing tracking codes are looked up once per chunk, not once per row
+        extra_kwargs = {'tracking_code': {'validators': []}}
+
+
+class ShipmentImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    on_conflict = serializers.ChoiceField(choices=['skip', 'update'], default='skip')
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith(('.csv', '.xlsx')):
+            raise serializers.ValidationError("Upload a .csv or .xlsx file.")
+        return value
+
+
+class CustomerResolveSerializer(serializers.Serializer):
+    phone = serializers.CharField(max_length=32, required=False)
+    email = serializers.EmailField(required=False)
+
+    def validate_phone(self, value):
+        phone = normalize_phone(value)
+        if phone is None:
+            raise serializers.ValidationError("Not a valid phone number.")
+        return phone
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Give a phone, an email or both.")
+        return attrs
+
+
+# ============ Consolidation Serializers ============
+class ConsolidationSerializer(serializers.ModelSerializer):
+    shipment_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Consolidation
+        fields = [
+            'id', 'reference', 'description', 'packing_list', 'status', 'current_route_stage',
+            'shipment_count', 'created_by', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'status', 'current_route_stage', 'created_by', 'created_at', 'updated_at']
+
+
+class ConsolidationTransitionSerializer(serializers.Serializer):
+    route_stage = serializers.ChoiceField(choices=Shipment.ROUTE_STAGES, required=False)
+    status = serializers.ChoiceField(choices=Shipment.STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Give a route_stage, a status or both.")
+        return attrs
+
+
+class ScanBatchSerializer(ConsolidationTransitionSerializer):
+    tracking_codes = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        min_length=1,
+        max_length=500
+    )
+
+    def validate(self, attrs):
+        if 'route_stage' not in attrs and 'status' not in attrs:
+            raise serializers.ValidationError("Give a route_stage, a status or both.")
+        return attrs
+
+
+class TrackingCodesSerializer(serializers.Serializer):
+    tracking_codes = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        min_length=1,
+        max_length=5000
+    )
+
+
 # ============ Packing List Serializers ============
 class PackingListSerializer(serializers.ModelSerializer):
     """Serializer for packing list"""
     
     created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
     pdf_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    totals_match = serializers.ReadOnlyField()
     
     class Meta:
         model = PackingList
         fields = [
             'id', 'date', 'created_by', 'created_by_name',
-            'total_cartons', 'total_weight', 'pdf_file', 'pdf_url',
-            'created_at', 'updated_at'
+            'total_cartons', 'total_weight', 'pdf_file', 'pdf_url', 'thumbnail_url',
+            'extraction_status', 'extracted_total_cartons', 'extracted_total_weight',
+            'totals_match', 'created_at', 'updated_at'
         ]
-        read_only_fields = [ 'created_by']
+        read_only_fields = [
+            'created_by', 'extraction_status', 'extracted_total_cartons', 'extracted_total_weight'
+        ]
+
+    def update(self, instance, validated_data):
+        if 'pdf_file' in validated_data:
+            # New document, extract it again
+            validated_data['extraction_status'] = 'pending'
+        return super().update(instance, validated_data)
     
     def get_pdf_url(self, obj):
         if obj.pdf_file:
@@ -128,3 +272,51 @@ class PackingListSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.pdf_file.url)
         return None
+
+    def get_thumbnail_url(self, obj):
+        """First-page preview; None until it has been generated"""
+        return thumbnails.thumbnail_url('packing_lists', obj.pdf_file, self.context.get('request'))
+
+
+class PackingListLineSerializer(serializers.ModelSerializer):
+    """Carton line extracted from a packing-list PDF"""
+    packing_list_date = serializers.DateField(source='packing_list.date', read_only=True)
+
+    class Meta:
+        model = PackingListLine
+        fields = [
+            'id', 'packing_list', 'packing_list_date', 'position',
+            'carton_code', 'details', 'contact', 'weight'
+        ]
+
+
+class PackingListUploadSerializer(serializers.ModelSerializer):
+    """Starts a chunked packing-list upload and reports its progress"""
+
+    class Meta:
+        model = PackingListUpload
+        fields = [
+            'id', 'filename', 'total_size', 'checksum', 'received_bytes', 'status',
+            'date', 'total_cartons', 'total_weight', 'packing_list', 'created_at'
+        ]
+        read_only_fields = ['id', 'received_bytes', 'status', 'packing_list', 'created_at']
+
+    def validate_filename(self, value):
+        filename = get_valid_filename(os.path.basename(value))
+        if os.path.splitext(filename)[1].lower() not in settings.ALLOWED_PDF_EXTENSIONS:
+            raise serializers.ValidationError("Only PDF files are allowed.")
+        return filename
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("total_size must be positive.")
+        if value > settings.PACKING_LIST_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File is larger than {settings.PACKING_LIST_UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
+
+    def validate_checksum(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError("checksum must be a SHA-256 hex digest.")
+        return value.lower()
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from authentication.signals import email_verified
+from backend_app import thumbnails
+from backend_app.admin_tools import invalidate_facets
+from . import rates, rollups
+from .linking import LinkOrphansThread
+from .models import Invoice, PackingList, Payment, ServiceTier, WeightHandling
+
+
+@receiver(post_save, sender=PackingList)
+def generate_packing_list_thumbnail(sender, instance, **kwargs):
+    """Render the first-page preview once the upload is committed"""
+    if instance.pdf_file:
+        transaction.on_commit(lambda: thumbnails.schedule('packing_lists', instance.pdf_file))
+
+
+@receiver([post_save, post_delete], sender=ServiceTier)
+@receiver([post_save, post_delete], sender=WeightHandling)
+def invalidate_rate_matrix(sender, **kwargs):
+    """Rates changed: every process rebuilds its rate matrix on next use"""
+    transaction.on_commit(rates.invalidate)
+
+
+# ============ Revenue rollup ============
+@receiver(post_save, sender=Invoice)
+def update_invoice_rollup(sender, instance, **kwargs):
+    # The tier it was loaded with (Invoice.from_db): a tier change also refreshes the buckets it leaves
+    old_tier = getattr(instance, '_stored_service_tier_id', instance.service_tier_id)
+    if old_tier != instance.service_tier_id:
+        # Its payments move between tiers too
+        rollups.schedule_invoices(Invoice.objects.filter(pk=instance.pk))
+        rollups.schedule(rollups.invoice_day(instance), old_tier)
+        for day in set(instance.payments.values_list('date', flat=True)):
+            rollups.schedule(day, old_tier)
+    else:
+        rollups.schedule(rollups.invoice_day(instance), instance.service_tier_id)
+
+
+@receiver(post_delete, sender=Invoice)
+def remove_invoice_from_rollup(sender, instance, **kwargs):
+    rollups.schedule(rollups.invoice_day(instance), instance.service_tier_id)
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollup(sender, instance, **kwargs):
+    tier_id = instance.invoice.service_tier_id
+    rollups.schedule(instance.date, tier_id)
+    # The date it was loaded with (Payment.from_db)
+    old_date = getattr(instance, '_stored_date', None)
+    if old_date and old_date != instance.date:
+        rollups.schedule(old_date, tier_id)
+
+
+@receiver(pre_delete, sender=Payment)
+def remember_payment_tier(sender, instance, **kwargs):
+    # Read while the invoice still exists: it may be deleted in the same cascade
+    instance._rollup_tier = instance.invoice.service_tier_id
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_from_rollup(sender, instance, **kwargs):
+    rollups.schedule(instance.date, getattr(instance, '_rollup_tier', None))
+
+
+@receiver(pre_delete, sender=ServiceTier)
+def move_rollup_to_no_tier(sender, instance, **kwargs):
+    """The tier's invoices fall back to no tier (SET_NULL); refresh those buckets"""
+    for day, _ in rollups.invoice_buckets(Invoice.objects.filter(service_tier=instance)):
+        rollups.schedule(day, None)
+
+
+# ============ Orphan shipments ============
+@receiver(email_verified)
+def link_verified_customer_shipments(sender, user, **kwargs):
+    """A customer who verified their email takes over the shipments registered under it"""
+    transaction.on_commit(lambda: LinkOrphansThread(user).start())
+
+
+# ============ Admin filter facets ============
+# What the cached admin filters show of each model; saves limited to other fields keep the counts
+FACET_FIELDS = {
+    'shipping.Invoice': {'service_tier', 'weight_handling'},
+    'shipping.PackingList': {'created_by'},
+    'shipping.ServiceTier': {'name'},
+    'shipping.WeightHandling': {'name'},
+    settings.AUTH_USER_MODEL: {'country', 'full_name'},
+}
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=PackingList)
+@receiver([post_save, post_delete], sender=ServiceTier)
+@receiver([post_save, post_delete], sender=WeightHandling)
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_admin_facets(sender, update_fields=None, **kwargs):
+    """Recount the admin sidebar filters that show this model"""
+    if update_fields is not None and not FACET_FIELDS[sender._meta.label] & set(update_fields):
+        return
+    transaction.on_commit(lambda: invalidate_facets(sender))
@@ -0,0 +1,181 @@
+"""
+Monthly customer statements: opening balance, the month's invoices and
+payments, and the closing balance.
+
+``iter_statements`` walks customers in primary-key chunks and loads each
+chunk's invoices, payments and opening balances with four grouped queries,
+whatever the chunk size. It yields plain dicts, so ``render_statement`` - a
+pure function with no database access - can run in a process pool (see the
+send_statements command).
+"""
+
+import calendar
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from html import escape
+
+from django.db.models import Sum
+from django.utils import timezone
+
+
+ZERO = Decimal('0.00')
+
+
+def month_bounds(year, month):
+    """First and last day of a month"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def previous_month(today=None):
+    today = today or timezone.localdate()
+    last_day = today.replace(day=1) - timedelta(days=1)
+    return last_day.year, last_day.month
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def customer_chunks(period_end, chunk_size, user_ids=None):
+    """Lists of customer ids with at least one invoice up to ``period_end``, in pk order"""
+    from .models import Invoice
+
+    customers = (
+        Invoice.objects.filter(created_at__lt=_start_of(period_end + timedelta(days=1)))
+        .values_list('user', flat=True)
+        .distinct()
+        .order_by('user')
+    )
+    if user_ids is not None:
+        customers = customers.filter(user__in=user_ids)
+
+    last = None
+    while True:
+        chunk = customers.filter(user__gt=last) if last is not None else customers
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def load_statements(user_ids, period_start, period_end):
+    """Statement data for a chunk of customers; customers with nothing to report are left out"""
+    from authentication.models import User
+    from .models import Invoice, Payment
+
+    start = _start_of(period_start)
+    end = _start_of(period_end + timedelta(days=1))
+
+    invoiced_before = dict(
+        Invoice.objects.filter(user__in=user_ids, created_at__lt=start)
+        .values('user').annotate(total=Sum('total_amount')).order_by()
+        .values_list('user', 'total')
+    )
+    paid_before = dict(
+        Payment.objects.filter(invoice__user__in=user_ids, date__lt=period_start)
+        .values('invoice__user').annotate(total=Sum('amount')).order_by()
+        .values_list('invoice__user', 'total')
+    )
+
+    statements = {
+        user['id']: {
+            'customer': {'email': user['email'], 'name': user['full_name']},
+            'period_start': period_start,
+            'period_end': period_end,
+            'opening_balance': (invoiced_before.get(user['id']) or ZERO) - (paid_before.get(user['id']) or ZERO),
+            'invoices': [],
+            'payments': [],
+        }
+        for user in User.objects.filter(pk__in=user_ids, is_active=True).values('id', 'email', 'full_name')
+    }
+
+    invoices = (
+        Invoice.objects.filter(user__in=statements.keys(), created_at__gte=start, created_at__lt=end)
+        .order_by('created_at')
+        .values('user', 'invoice_number', 'created_at', 'description', 'weight_kg',
+                'total_amount', 'paying_bill', 'credit_amount', 'payment_status')
+    )
+    for invoice in invoices:
+        invoice['created_at'] = timezone.localdate(invoice['created_at'])
+        statements[invoice.pop('user')]['invoices'].append(invoice)
+
+    payments = (
+        Payment.objects.filter(invoice__user__in=statements.keys(), date__gte=period_start, date__lte=period_end)
+        .order_by('date', 'created_at')
+        .values('invoice__user', 'date', 'invoice__invoice_number', 'payment_method', 'reference_number', 'amount')
+    )
+    for payment in payments:
+        statements[payment.pop('invoice__user')]['payments'].append(payment)
+
+    result = []
+    for statement in statements.values():
+        statement['invoiced'] = sum((i['total_amount'] for i in statement['invoices']), ZERO)
+        statement['paid'] = sum((p['amount'] for p in statement['payments']), ZERO)
+        statement['closing_balance'] = statement['opening_balance'] + statement['invoiced'] - statement['paid']
+        if statement['invoices'] or statement['payments'] or statement['closing_balance']:
+            result.append(statement)
+    return result
+
+
+def iter_statements(period_start, period_end, chunk_size=500, user_ids=None):
+    """Yield lists of statement dicts, one list per chunk of customers"""
+    for chunk in customer_chunks(period_end, chunk_size, user_ids):
+        yield load_statements(chunk, period_start, period_end)
+
+
+def _money(value):
+    return f'{value:,.2f}'
+
+
+def render_statement(statement):
+    """HTML for one statement; pure, so it can run in a worker process"""
+    period = statement['period_start'].strftime('%B %Y')
+    invoice_rows = ''.join(
+        f"""
+            <tr>
+                <td>{invoice['created_at']:%d %b %Y}</td>
+                <td>{escape(invoice['invoice_number'])}</td>
+                <td>{escape(invoice['description'])}</td>
+                <td style="text-align: right;">{invoice['weight_kg']}</td>
+                <td style="text-align: right;">{_money(invoice['total_amount'])}</td>
+                <td style="text-align: right;">{_money(invoice['credit_amount'])}</td>
+            </tr>"""
+        for invoice in statement['invoices']
+    ) or '<tr><td colspan="6">No invoices this month.</td></tr>'
+    payment_rows = ''.join(
+        f"""
+            <tr>
+                <td>{payment['date']:%d %b %Y}</td>
+                <td>{escape(payment['invoice__invoice_number'])}</td>
+                <td>{escape(payment['payment_method'])}</td>
+                <td>{escape(payment['reference_number'] or '')}</td>
+                <td style="text-align: right;">{_money(payment['amount'])}</td>
+            </tr>"""
+        for payment in statement['payments']
+    ) or '<tr><td colspan="5">No payments this month.</td></tr>'
+
+    return f"""
+    <div style="font-family: Arial, sans-serif; max-width: 700px; margin: 0 auto;">
+        <h2 style="color: #4A90E2;">Statement - {period}</h2>
+        <p>Hello {escape(statement['customer']['name'])},</p>
+        <p>Here is your account statement for {statement['period_start']:%d %b %Y} to {statement['period_end']:%d %b %Y}.</p>
+        <p>Opening balance: <strong>TSH {_money(statement['opening_balance'])}</strong></p>
+        <h3>Invoices</h3>
+        <table style="width: 100%; border-collapse: collapse;" border="1" cellpadding="6">
+            <tr><th>Date</th><th>Invoice</th><th>Description</th><th>Weight (kg)</th><th>Amount</th><th>Outstanding</th></tr>{invoice_rows}
+        </table>
+        <h3>Payments</h3>
+        <table style="width: 100%; border-collapse: collapse;" border="1" cellpadding="6">
+            <tr><th>Date</th><th>Invoice</th><th>Method</th><th>Reference</th><th>Amount</th></tr>{payment_rows}
+        </table>
+        <p>Invoiced this month: TSH {_money(statement['invoiced'])}<br>
+        Paid this month: TSH {_money(statement['paid'])}<br>
+        Closing balance: <strong>TSH {_money(statement['closing_balance'])}</strong></p>
+        <p>Best regards,<br>Kaluu Express Cargo Team</p>
+    </div>
+    """
+
+
+def statement_subject(statement):
+    return f"Your statement for {statement['period_start']:%B %Y} - Kaluu Express Cargo"
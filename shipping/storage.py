@@ -0,0 +1,163 @@
+"""
+Content-addressed storage for packing-list PDFs.
+
+Every PDF is stored once under ``packing_lists/cas/<aa>/<sha256>.pdf`` no
+matter how often it is uploaded; saving bytes that are already stored just
+returns the existing name. The SHA-256 is computed while the upload is
+spooled to disk, so each file is read only once.
+
+Reference counting: a blob's references are the PackingList rows whose
+pdf_file holds its name, counted with a single GROUP BY (see
+``reference_counts``), so there is no counter to drift out of sync with the
+table. Deleting a row never deletes the blob; ``gc_packing_list_blobs``
+sweeps unreferenced blobs later, skipping anything written within a grace
+period so uploads whose row isn't committed yet are not collected.
+"""
+
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Count
+
+
+CAS_PREFIX = 'packing_lists/cas/'
+CHUNK_SIZE = 64 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the SHA-256 of their content"""
+
+    def blob_name(self, digest, extension='.pdf'):
+        return f'{CAS_PREFIX}{digest[:2]}/{digest}{extension}'
+
+    def is_blob(self, name):
+        return name.startswith(CAS_PREFIX)
+
+    def _spool(self, content):
+        """Copy ``content`` to a temporary file inside the storage, hashing it on the way"""
+        tmp_path = self.path(f'{CAS_PREFIX}tmp/{uuid.uuid4().hex}')
+        os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+
+        digest = hashlib.sha256()
+        with open(tmp_path, 'wb') as f:
+            for chunk in content.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+        return digest.hexdigest(), tmp_path
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        extension = os.path.splitext(name)[1].lower() or '.pdf'
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk: hash in place and move it, no copy
+            source = content.temporary_file_path()
+            digest, spooled = file_sha256(source), False
+        else:
+            digest, source = self._spool(content)
+            spooled = True
+
+        blob = self.blob_name(digest, extension)
+        full_path = self.path(blob)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        if os.path.exists(full_path):
+            # Deduplicated. Refresh the mtime so a running sweep's grace period
+            # covers the new reference until its row is committed.
+            os.utime(full_path)
+            if spooled:
+                os.remove(source)
+        else:
+            # Same name means same bytes, so a concurrent writer winning the
+            # race is harmless; replacing is atomic either way.
+            if spooled:
+                os.replace(source, full_path)
+            else:
+                file_move_safe(source, full_path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+
+        return blob
+
+    def delete(self, name):
+        # Blobs may be shared between packing lists; the GC sweep removes them
+        # once nothing references them.
+        if self.is_blob(name):
+            return
+        super().delete(name)
+
+    def iter_blobs(self):
+        """Yield ``(name, size, mtime)`` for every stored blob"""
+        root = self.path(CAS_PREFIX)
+        if not os.path.isdir(root):
+            return
+        for shard in sorted(os.listdir(root)):
+            shard_path = os.path.join(root, shard)
+            if shard == 'tmp' or not os.path.isdir(shard_path):
+                continue
+            for entry in os.scandir(shard_path):
+                if entry.is_file():
+                    stat = entry.stat()
+                    yield f'{CAS_PREFIX}{shard}/{entry.name}', stat.st_size, stat.st_mtime
+
+    def sweep(self, referenced, older_than, dry_run=False):
+        """
+        Remove blobs not in ``referenced`` whose mtime is before the
+        ``older_than`` timestamp. Returns ``(count, bytes)`` reclaimed.
+        """
+        count = reclaimed = 0
+        for name, size, mtime in self.iter_blobs():
+            if name in referenced or mtime >= older_than:
+                continue
+            if not dry_run:
+                super().delete(name)
+            count += 1
+            reclaimed += size
+
+        # Spool files left behind by crashed saves
+        tmp_root = self.path(f'{CAS_PREFIX}tmp')
+        if os.path.isdir(tmp_root):
+            for entry in os.scandir(tmp_root):
+                stat = entry.stat()
+                if entry.is_file() and stat.st_mtime < older_than:
+                    if not dry_run:
+                        os.remove(entry.path)
+                    count += 1
+                    reclaimed += stat.st_size
+
+        return count, reclaimed
+
+
+packing_list_storage = ContentAddressedStorage()
+
+
+def get_packing_list_storage():
+    return packing_list_storage
+
+
+def reference_counts():
+    """Map of stored PDF name -> number of packing lists using it"""
+    from .models import PackingList
+
+    rows = (
+        PackingList.objects.exclude(pdf_file='')
+        .values('pdf_file')
+        .annotate(references=Count('id'))
+        .values_list('pdf_file', 'references')
+    )
+    return dict(rows)
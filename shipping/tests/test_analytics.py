@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+
+class AgingReportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser('staff@example.com', 'pw', full_name='Staff')
+        )
+
+    def test_limit_is_clamped(self):
+        for limit in ('-5', '5000', 'all'):
+            response = self.client.get('/api/shipping/analytics/aging/', {'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['data'], [])
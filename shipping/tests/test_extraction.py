@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shipping.extraction import ExtractionError
+from shipping.management.commands.extract_packing_lists import Command
+from shipping.models import PackingList, PackingListLine
+
+
+RESULT = {'lines': [], 'total_cartons': 3, 'total_weight': Decimal('42.00')}
+
+
+def parse_or_die(path):
+    """parse_pdf stand-in for real worker processes: crashed.pdf kills its worker"""
+    if path.endswith('crashed.pdf'):
+        os._exit(1)
+    return RESULT
+
+
+class ExtractCommandTests(TestCase):
+    def setUp(self):
+        staff = get_user_model().objects.create_user('staff@example.com', 'pw', full_name='Staff', is_staff=True)
+        self.packing_lists = [
+            PackingList.objects.create(created_by=staff, pdf_file=f'packing_lists/test/{name}.pdf')
+            for name in ('good', 'unreadable', 'buggy', 'crashed')
+        ]
+
+    def parse(self, path):
+        if path.endswith('unreadable.pdf'):
+            raise ExtractionError('No text layer')
+        if path.endswith('buggy.pdf'):
+            raise TypeError("'NoneType' object is not subscriptable")
+        if path.endswith('crashed.pdf'):
+            raise BrokenProcessPool('A process in the process pool was terminated abruptly')
+        return RESULT
+
+    def test_every_error_is_recorded_without_stopping(self):
+        command = Command(stdout=mock.Mock(), stderr=mock.Mock())
+        with mock.patch('shipping.management.commands.extract_packing_lists.parse_pdf', self.parse), \
+                ThreadPoolExecutor(max_workers=2) as pool, self.assertLogs(
+                    'shipping.management.commands.extract_packing_lists', 'ERROR') as logs:
+            extracted, failed, stalled = command.extract(pool, self.packing_lists)
+
+        self.assertEqual((extracted, failed), (1, 2))
+        self.assertEqual([packing_list.pdf_file.name for packing_list in stalled], ['packing_lists/test/crashed.pdf'])
+        self.assertEqual(len(logs.records), 1)
+        statuses = self.statuses()
+        self.assertEqual(statuses['good.pdf'], ('extracted', ''))
+        self.assertEqual(statuses['unreadable.pdf'], ('failed', 'No text layer'))
+        self.assertEqual(statuses['buggy.pdf'], ('failed', "TypeError: 'NoneType' object is not subscriptable"))
+        self.assertEqual(statuses['crashed.pdf'], ('pending', ''))
+
+    def statuses(self):
+        return {
+            name.rsplit('/', 1)[1]: (status, error)
+            for name, status, error in PackingList.objects.values_list(
+                'pdf_file', 'extraction_status', 'extraction_error'
+            )
+        }
+
+    @mock.patch('shipping.management.commands.extract_packing_lists.parse_pdf', parse_or_die)
+    def test_only_the_file_that_kills_the_worker_fails(self):
+        command = Command(stdout=mock.Mock(), stderr=mock.Mock())
+        # crashed.pdf first, in one worker: every other file is still queued when it dies
+        packing_lists = sorted(self.packing_lists, key=lambda packing_list: 'crashed' not in packing_list.pdf_file.name)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            extracted, failed, stalled = command.extract(pool, packing_lists)
+
+        self.assertEqual((extracted, failed, len(stalled)), (0, 0, 4))
+        self.assertEqual({status for status, _ in self.statuses().values()}, {'pending'})
+
+        with self.assertLogs('shipping.management.commands.extract_packing_lists', 'ERROR'):
+            self.assertEqual(command.isolate(stalled), (3, 1))
+        statuses = self.statuses()
+        self.assertEqual(statuses.pop('crashed.pdf'), ('failed', 'The extraction worker died reading this file'))
+        self.assertEqual(set(statuses.values()), {('extracted', '')})
+
+
+class CartonSearchTests(TestCase):
+    def setUp(self):
+        staff = get_user_model().objects.create_user('staff@example.com', 'pw', full_name='Staff', is_staff=True)
+        packing_list = PackingList.objects.create(created_by=staff, pdf_file='packing_lists/test/a.pdf')
+        PackingListLine.objects.create(packing_list=packing_list, position=1, carton_code='C-1', weight=Decimal('4.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def get(self, **params):
+        return self.client.get('/api/shipping/packing-lists/cartons/', params)
+
+    def test_packing_list_must_be_an_id(self):
+        self.assertEqual(self.get(packing_list='abc').status_code, 400)
+        self.assertEqual(self.get(packing_list=PackingList.objects.get().pk).data['count'], 1)
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(self.get(limit=-5).data['count'], 0)
+        self.assertEqual(self.get(limit=5000).data['count'], 1)
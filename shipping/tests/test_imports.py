@@ -0,0 +1,114 @@
+import io
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from shipping import imports
+from shipping.models import Shipment, ShipmentEvent
+
+
+def manifest(*lines):
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+def run(*lines, **options):
+    return imports.import_shipments(manifest(*lines), 'manifest.csv', **options)
+
+
+class ImportShipmentsTests(TestCase):
+    def setUp(self):
+        self.existing = Shipment.objects.create(
+            tracking_code='KX-1', origin='Guangzhou', destination='Dar es Salaam', weight=Decimal('5.00'),
+            description='Shoes', admin_notes='Fragile', estimated_delivery=date(2026, 3, 1), eta_predicted=True
+        )
+
+    def test_creates_new_shipments_with_their_first_event(self):
+        report = run(
+            'Tracking Number,origin,destination,weight,description',
+            'KX-2,Guangzhou,Zanzibar,12.5,Bags',
+            'KX-3,Yiwu,Dar es Salaam,3,',
+        )
+        self.assertEqual((report['rows'], report['created'], report['failed']), (2, 2, 0))
+        shipment = Shipment.objects.get(tracking_code='KX-2')
+        self.assertEqual((shipment.weight, shipment.description), (Decimal('12.50'), 'Bags'))
+        self.assertEqual(ShipmentEvent.objects.filter(shipment__tracking_code__in=['KX-2', 'KX-3']).count(), 2)
+
+    def test_skip_leaves_existing_shipments_alone(self):
+        report = run('tracking_code,origin,destination,weight', 'KX-1,Yiwu,Zanzibar,9')
+        self.assertEqual((report['created'], report['skipped'], report['updated']), (0, 1, 0))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.origin, self.existing.weight), ('Guangzhou', Decimal('5.00')))
+
+    def test_update_only_touches_the_manifest_columns(self):
+        report = run('tracking_code,origin,destination,weight', 'KX-1,Yiwu,Zanzibar,9', on_conflict='update')
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.origin, self.existing.weight), ('Yiwu', Decimal('9.00')))
+        self.assertEqual(self.existing.description, 'Shoes')
+        self.assertEqual(self.existing.admin_notes, 'Fragile')
+        self.assertEqual(self.existing.estimated_delivery, date(2026, 3, 1))
+        self.assertTrue(self.existing.eta_predicted)
+
+    def test_updated_delivery_date_is_no_longer_predicted(self):
+        run('tracking_code,origin,destination,weight,estimated_delivery', 'KX-1,Yiwu,Zanzibar,9,2026-04-15',
+            on_conflict='update')
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.estimated_delivery, date(2026, 4, 15))
+        self.assertFalse(self.existing.eta_predicted)
+
+    def test_code_inserted_after_the_lookup_is_updated_not_created(self):
+        build = imports.Importer.build
+        calls = []
+
+        def stale_build(importer, rows):
+            # The first lookup misses KX-1, as if another import had inserted it just after
+            shipments, existing = build(importer, rows)
+            if not calls:
+                existing.pop('KX-1')
+            calls.append(1)
+            return shipments, existing
+
+        events = ShipmentEvent.objects.filter(shipment=self.existing).count()
+        with mock.patch.object(imports.Importer, 'build', stale_build):
+            report = run('tracking_code,origin,destination,weight', 'KX-1,Yiwu,Zanzibar,9', on_conflict='update')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        self.assertEqual(ShipmentEvent.objects.filter(shipment=self.existing).count(), events)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.origin, 'Yiwu')
+
+    def test_dry_run_writes_nothing(self):
+        report = run('tracking_code,origin,destination,weight', 'KX-2,Yiwu,Zanzibar,9', dry_run=True)
+        self.assertEqual(report['created'], 1)
+        self.assertFalse(Shipment.objects.filter(tracking_code='KX-2').exists())
+
+    def test_bad_rows_are_reported_without_stopping(self):
+        report = run(
+            'tracking_code,origin,destination,weight',
+            'KX-2,Yiwu,Zanzibar,heavy',
+            'KX-3,Yiwu,Zanzibar,4',
+            'KX-3,Yiwu,Zanzibar,5',
+        )
+        self.assertEqual((report['created'], report['failed']), (1, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 4])
+        self.assertIn('weight', report['errors'][0]['errors'])
+
+    def test_customers_are_linked_by_verified_email_only(self):
+        User = get_user_model()
+        verified = User.objects.create_user('buyer@example.com', 'pw', full_name='Buyer', is_verified=True)
+        User.objects.create_user('new@example.com', 'pw', full_name='New', phone_number='+255712345678')
+        run(
+            'tracking_code,origin,destination,weight,customer_email,customer_phone',
+            'KX-2,Yiwu,Zanzibar,4,BUYER@example.com,',
+            'KX-3,Yiwu,Zanzibar,4,new@example.com,',
+            'KX-4,Yiwu,Zanzibar,4,,0712345678',
+        )
+        customers = dict(Shipment.objects.values_list('tracking_code', 'customer'))
+        self.assertEqual(customers, {'KX-1': None, 'KX-2': verified.pk, 'KX-3': None, 'KX-4': None})
+
+    def test_missing_columns(self):
+        with self.assertRaises(imports.ManifestError):
+            run('tracking_code,origin', 'KX-2,Yiwu')
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import EmailVerification
+from shipping import linking
+from shipping.models import Shipment
+
+
+def make_shipment(code, **fields):
+    return Shipment.objects.create(
+        tracking_code=code, origin='Guangzhou', destination='Dar es Salaam', weight=Decimal('5.00'), **fields
+    )
+
+
+class LinkOrphansTests(TestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        self.orphan = make_shipment('KX-1', customer_email='Victim@Example.com', customer_phone='0712345678')
+
+    def test_unverified_account_is_not_linked(self):
+        user = self.User.objects.create_user('victim@example.com', 'pw', full_name='Victim')
+        self.assertEqual(linking.link_orphans(user), 0)
+        self.orphan.refresh_from_db()
+        self.assertIsNone(self.orphan.customer)
+
+    def test_verified_email_is_linked_in_any_case(self):
+        user = self.User.objects.create_user('victim@example.com', 'pw', full_name='Victim', is_verified=True)
+        self.assertEqual(linking.link_orphans(user), 1)
+        self.orphan.refresh_from_db()
+        self.assertEqual(self.orphan.customer, user)
+
+    def test_phone_is_never_used(self):
+        user = self.User.objects.create_user(
+            'someone@example.com', 'pw', full_name='Someone', phone_number='+255712345678', is_verified=True
+        )
+        self.assertEqual(user.phone_e164, self.orphan.customer_phone_e164)
+        self.assertEqual(linking.link_orphans(user), 0)
+        self.assertEqual(linking.link_all()['linked'], 0)
+        self.orphan.refresh_from_db()
+        self.assertIsNone(self.orphan.customer)
+
+    def test_link_all_only_uses_verified_unique_emails(self):
+        verified = self.User.objects.create_user('victim@example.com', 'pw', full_name='Victim', is_verified=True)
+        self.User.objects.create_user('other@example.com', 'pw', full_name='Other')
+        unverified_orphan = make_shipment('KX-2', customer_email='other@example.com')
+        self.User.objects.create_user('shared@example.com', 'pw', full_name='Shared', is_verified=True)
+        self.User.objects.create_user('SHARED@example.com', 'pw', full_name='Shared 2', is_verified=True)
+        shared_orphan = make_shipment('KX-3', customer_email='shared@example.com')
+
+        report = linking.link_all(dry_run=True)
+        self.assertEqual((report['orphans'], report['linked']), (3, 1))
+        self.orphan.refresh_from_db()
+        self.assertIsNone(self.orphan.customer)
+
+        report = linking.link_all()
+        self.assertEqual(report['linked'], 1)
+        self.assertEqual(report['top_customers'], [('victim@example.com', 1)])
+        self.orphan.refresh_from_db()
+        unverified_orphan.refresh_from_db()
+        shared_orphan.refresh_from_db()
+        self.assertEqual(self.orphan.customer, verified)
+        self.assertIsNone(unverified_orphan.customer)
+        self.assertIsNone(shared_orphan.customer)
+
+        # Only orphans are ever looked at
+        self.assertEqual(linking.link_all()['orphans'], 2)
+
+    def test_linked_shipments_are_left_alone(self):
+        owner = self.User.objects.create_user('owner@example.com', 'pw', full_name='Owner')
+        shipment = make_shipment('KX-4', customer=owner, customer_email='victim@example.com')
+        user = self.User.objects.create_user('victim@example.com', 'pw', full_name='Victim', is_verified=True)
+        linking.link_orphans(user)
+        shipment.refresh_from_db()
+        self.assertEqual(shipment.customer, owner)
+
+
+class LinkOnVerificationTests(TestCase):
+    """Linking is triggered by email verification, not by registration"""
+
+    def setUp(self):
+        self.orphan = make_shipment('KX-1', customer_email='victim@example.com', customer_phone='+255712345678')
+        self.client = APIClient()
+
+    @mock.patch('shipping.signals.LinkOrphansThread')
+    def test_registration_does_not_link(self, thread):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/register/', {
+                'email': 'attacker@example.com', 'full_name': 'Attacker', 'phone_number': '+255712345678',
+                'country': 'Tanzania', 'city': 'Dar', 'password': 'Sup3rSecret!x', 'confirm_password': 'Sup3rSecret!x'
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        thread.assert_not_called()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['tokens']['access']}")
+        listed = self.client.get('/api/shipping/shipments/')
+        self.assertEqual(listed.status_code, 200)
+        self.assertNotIn('KX-1', str(listed.json()))
+
+    @mock.patch('shipping.signals.LinkOrphansThread')
+    def test_verification_links(self, thread):
+        user = get_user_model().objects.create_user('victim@example.com', 'pw', full_name='Victim')
+        EmailVerification.objects.create(user=user, token='t0k3n', expires_at=timezone.now() + timedelta(hours=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/verify-email/', {'token': 't0k3n'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        thread.assert_called_once()
+        linked_user = thread.call_args.args[0]
+        self.assertTrue(linked_user.is_verified)
+
+        # What the thread does
+        self.assertEqual(linking.link_orphans(linked_user), 1)
+        self.orphan.refresh_from_db()
+        self.assertEqual(self.orphan.customer, user)
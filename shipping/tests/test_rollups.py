@@ -0,0 +1,60 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from shipping.models import Invoice, Payment, RevenueDaily, ServiceTier
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        self.air = ServiceTier.objects.create(name='Air', price_per_kg_usd=Decimal('8.00'))
+        self.sea = ServiceTier.objects.create(name='Sea', price_per_kg_usd=Decimal('2.00'))
+        customer = get_user_model().objects.create_user('buyer@example.com', 'pw', full_name='Buyer')
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = Invoice.objects.create(
+                user=customer, description='Shoes', packages='2 cartons', weight_kg=Decimal('10.00'),
+                service_tier=self.air, total_amount=Decimal('100000.00')
+            )
+            Payment.objects.create(invoice=invoice, amount=Decimal('40000.00'), date=timezone.localdate())
+
+    def buckets(self):
+        return sorted(
+            (row.service_tier.name, row.payment_method, row.date == timezone.localdate(),
+             row.invoiced_amount, row.paid_amount)
+            for row in RevenueDaily.objects.select_related('service_tier')
+        )
+
+    def test_tier_change_moves_the_invoice_and_its_payments(self):
+        invoice = Invoice.objects.get()
+        invoice.service_tier = self.sea
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            invoice.save()
+        # The stored tier comes from loading the invoice, not from a SELECT before the UPDATE
+        self.assertTrue(queries.captured_queries[0]['sql'].startswith('UPDATE'))
+        self.assertEqual(self.buckets(), [
+            ('Sea', '', True, Decimal('100000.00'), Decimal('0.00')),
+            ('Sea', 'cash', True, Decimal('0.00'), Decimal('40000.00')),
+        ])
+
+    def test_payment_date_change_empties_the_old_day(self):
+        payment = Payment.objects.get()
+        payment.date = timezone.localdate() - timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.save()
+        self.assertEqual(self.buckets(), [
+            ('Air', '', True, Decimal('100000.00'), Decimal('0.00')),
+            ('Air', 'cash', False, Decimal('0.00'), Decimal('40000.00')),
+        ])
+
+    def test_repeated_saves_track_the_stored_tier(self):
+        invoice = Invoice.objects.get()
+        for tier in (self.sea, self.air):
+            invoice.service_tier = tier
+            with self.captureOnCommitCallbacks(execute=True):
+                invoice.save()
+        self.assertEqual([name for name, method, *_ in self.buckets() if method == ''], ['Air'])
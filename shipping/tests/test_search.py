@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from shipping.models import Shipment
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create_superuser('staff@example.com', 'pw', full_name='Staff')
+        User.objects.create_user('juma@example.com', 'pw', full_name='Juma Ally')
+        for code in ('KX-1001', 'KX-1002', 'ZZ-2001'):
+            Shipment.objects.create(
+                tracking_code=code, origin='Guangzhou', destination='Dar es Salaam', weight=Decimal('5.00')
+            )
+
+    def test_api_limit_is_at_least_one(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.get('/api/shipping/search/', {'q': 'KX-100', 'limit': -1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['data']['shipments']), 1)
+
+    def admin_search(self, model, query):
+        model_admin = admin.site._registry[model]
+        results, _ = model_admin.get_search_results(None, model.objects.all(), query)
+        return results
+
+    def test_admin_short_terms_use_the_stock_search(self):
+        shipments = self.admin_search(Shipment, 'KX')
+        self.assertEqual(sorted(shipments.values_list('tracking_code', flat=True)), ['KX-1001', 'KX-1002'])
+        users = self.admin_search(get_user_model(), 'Ju')
+        self.assertEqual(list(users.values_list('email', flat=True)), ['juma@example.com'])
+
+    def test_admin_long_terms_use_the_indexed_search(self):
+        shipments = self.admin_search(Shipment, 'kx-1002')
+        self.assertEqual(list(shipments.values_list('tracking_code', flat=True)), ['KX-1002'])
@@ -0,0 +1,111 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from notifications.models import Notification
+from shipping import transitions
+from shipping.models import Shipment, ShipmentEvent
+
+
+def make_shipment(code, **fields):
+    return Shipment.objects.create(
+        tracking_code=code, origin='Guangzhou', destination='Dar es Salaam', weight=Decimal('5.00'), **fields
+    )
+
+
+@mock.patch('shipping.transitions.PushNotificationThread')
+class BulkTransitionTests(TestCase):
+    def setUp(self):
+        self.staff = get_user_model().objects.create_user('staff@example.com', 'pw', full_name='Staff', is_staff=True)
+        self.customer = get_user_model().objects.create_user('buyer@example.com', 'pw', full_name='Buyer')
+        self.owned = make_shipment('KX-1', customer=self.customer)
+        self.orphan = make_shipment('KX-2')
+        self.arrived = make_shipment('KX-3', customer=self.customer, current_route_stage='ethiopia')
+
+    def transition(self, **kwargs):
+        notifications = Notification.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            changed = transitions.apply_bulk_transition(Shipment.objects.all(), actor=self.staff, **kwargs)
+        return sorted(changed), Notification.objects.count() - notifications
+
+    def test_moves_records_and_notifies_only_what_changed(self, push):
+        changed, notified = self.transition(route_stage='ethiopia')
+        self.assertEqual(changed, sorted([self.owned.pk, self.orphan.pk]))
+        self.assertEqual(
+            list(Shipment.objects.order_by('tracking_code').values_list('current_route_stage', flat=True)),
+            ['ethiopia'] * 3
+        )
+        self.assertEqual(
+            list(ShipmentEvent.objects.filter(actor=self.staff).order_by('shipment__tracking_code')
+                 .values_list('shipment__tracking_code', 'route_stage', 'status')),
+            [('KX-1', 'ethiopia', 'pending'), ('KX-2', 'ethiopia', 'pending')]
+        )
+        # Only KX-1 has a customer; KX-3 was already there
+        self.assertEqual(notified, 1)
+        notification = Notification.objects.get(notification_type='shipment_route')
+        self.assertEqual((notification.user, notification.data['tracking_code']), (self.customer, 'KX-1'))
+        push.assert_called_once()
+        self.assertEqual(len(push.call_args.args[0]), 1)
+        push.return_value.start.assert_called_once()
+
+    def test_stage_and_status_fan_out_one_notification_each(self, push):
+        changed, notified = self.transition(route_stage='ethiopia', status='intransit')
+        self.assertEqual(len(changed), 3)
+        # KX-1 changes both, KX-3 only its status
+        self.assertEqual(notified, 3)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('data__tracking_code', 'notification_type')),
+            [('KX-1', 'shipment_route'), ('KX-1', 'shipment_status'), ('KX-3', 'shipment_status')]
+        )
+
+    def test_repeating_is_harmless(self, push):
+        self.transition(status='delivered')
+        delivered = dict(Shipment.objects.values_list('tracking_code', 'actual_delivery_date'))
+        self.assertTrue(all(delivered.values()))
+        events = ShipmentEvent.objects.count()
+
+        changed, notified = self.transition(status='delivered')
+        self.assertEqual((changed, notified), ([], 0))
+        self.assertEqual(ShipmentEvent.objects.count(), events)
+        self.assertEqual(dict(Shipment.objects.values_list('tracking_code', 'actual_delivery_date')), delivered)
+
+    def test_without_notify(self, push):
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.apply_bulk_transition(Shipment.objects.all(), status='intransit', notify=False)
+        self.assertFalse(Notification.objects.exists())
+        push.assert_not_called()
+
+    def test_rejects_unknown_targets(self, push):
+        for kwargs in ({}, {'route_stage': 'mars'}, {'status': 'lost'}):
+            with self.assertRaises(ValueError):
+                transitions.apply_bulk_transition(Shipment.objects.all(), **kwargs)
+
+
+@mock.patch('shipping.transitions.PushNotificationThread')
+class ScanTests(TestCase):
+    def test_results(self, push):
+        make_shipment('KX-1')
+        make_shipment('KX-2', current_route_stage='zanzibar')
+        make_shipment('KX-3', current_route_stage='dar_es_salaam')
+        results = transitions.apply_scans(['KX-1', 'KX-2', 'KX-3', 'KX-1', 'NOPE'], route_stage='zanzibar')
+        self.assertEqual(
+            [(result['tracking_code'], result['result']) for result in results],
+            [('KX-1', 'updated'), ('KX-2', 'unchanged'), ('KX-3', 'ahead'), ('NOPE', 'not_found')]
+        )
+        self.assertEqual(results[0]['current_route_stage'], 'zanzibar')
+        self.assertEqual(
+            dict(Shipment.objects.values_list('tracking_code', 'current_route_stage')),
+            {'KX-1': 'zanzibar', 'KX-2': 'zanzibar', 'KX-3': 'dar_es_salaam'}
+        )
+
+        # A retried batch changes nothing
+        retried = transitions.apply_scans(['KX-1'], route_stage='zanzibar')
+        self.assertEqual(retried[0]['result'], 'unchanged')
+
+    def test_status_behind_is_not_moved_back(self, push):
+        make_shipment('KX-1', status='delivered')
+        results = transitions.apply_scans(['KX-1'], status='intransit')
+        self.assertEqual(results[0]['result'], 'ahead')
+        self.assertEqual(Shipment.objects.get().status, 'delivered')
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from shipping import uploads
+from shipping.models import PackingList, PackingListUpload
+
+
+PDF = b'%PDF-1.4\n' + b'carton line\n' * 2000 + b'%%EOF\n'
+UPLOADS = '/api/shipping/packing-lists/uploads/'
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        media = override_settings(MEDIA_ROOT=self.media)
+        media.enable()
+        self.addCleanup(media.disable)
+        # No preview rendering in the background once the temporary media root is gone
+        thumbnails = mock.patch('backend_app.thumbnails.schedule')
+        thumbnails.start()
+        self.addCleanup(thumbnails.stop)
+
+        staff = get_user_model().objects.create_user(
+            'staff@example.com', 'pw', full_name='Staff', is_staff=True, can_create_packing_list=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    def start(self, content=PDF, checksum=None):
+        response = self.client.post(UPLOADS, {
+            'filename': 'list.pdf', 'total_size': len(content),
+            'checksum': checksum or hashlib.sha256(content).hexdigest(),
+            'date': '2026-10-01', 'total_cartons': 3, 'total_weight': '42.00'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['data']['id']
+
+    def send(self, upload_id, chunk, offset):
+        return self.client.post(
+            f'{UPLOADS}{upload_id}/', chunk, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def finalize(self, upload_id):
+        return self.client.post(f'{UPLOADS}{upload_id}/finalize/')
+
+    def test_chunks_resume_and_finalize(self):
+        upload_id = self.start()
+        half = len(PDF) // 2
+
+        response = self.send(upload_id, PDF[:half], 0)
+        self.assertEqual((response.status_code, response.data['offset'], response.data['complete']), (200, half, False))
+
+        # A retried or skipped chunk is refused with the offset to resume from
+        for offset in (0, half + 10):
+            response = self.send(upload_id, PDF[half:], offset)
+            self.assertEqual((response.status_code, response.data['offset']), (409, half))
+        self.assertEqual(self.client.get(f'{UPLOADS}{upload_id}/').data['data']['received_bytes'], half)
+
+        self.assertEqual(self.finalize(upload_id).status_code, 400)
+        response = self.send(upload_id, PDF[half:], half)
+        self.assertEqual((response.data['offset'], response.data['complete']), (len(PDF), True))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 201)
+        packing_list = PackingList.objects.get()
+        with packing_list.pdf_file.open('rb') as f:
+            self.assertEqual(f.read(), PDF)
+        upload = PackingListUpload.objects.get()
+        self.assertEqual((upload.status, upload.packing_list), ('completed', packing_list))
+        self.assertFalse(os.path.exists(os.path.join(self.media, upload.temp_file)))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PackingList.objects.count(), 1)
+
+    def test_checksum_mismatch_starts_over(self):
+        upload_id = self.start(checksum='0' * 64)
+        self.send(upload_id, PDF, 0)
+        response = self.finalize(upload_id)
+        self.assertEqual((response.status_code, response.data['offset']), (400, 0))
+        self.assertEqual(PackingListUpload.objects.get().received_bytes, 0)
+        self.assertFalse(PackingList.objects.exists())
+
+    def test_not_a_pdf(self):
+        content = b'GIF89a' + b'\0' * 100
+        upload_id = self.start(content)
+        self.send(upload_id, content, 0)
+        self.assertEqual(self.finalize(upload_id).data['error'], 'File is not a PDF')
+
+    def test_concurrent_finalize_creates_one_packing_list(self):
+        upload_id = self.start()
+        self.send(upload_id, PDF, 0)
+        # Both requests loaded the upload while it was still 'uploading'
+        first, second = PackingListUpload.objects.get(pk=upload_id), PackingListUpload.objects.get(pk=upload_id)
+
+        uploads.finalize_upload(first)
+        # The partial file is gone by now: the second call must not reach it
+        with self.assertRaisesMessage(uploads.UploadError, 'already finalized'):
+            uploads.finalize_upload(second)
+        self.assertEqual(PackingList.objects.count(), 1)
@@ -0,0 +1,186 @@
+"""
+Transit times from the ShipmentEvent log.
+
+A shipment's milestones are its route stages followed by delivery; it
+reaches a milestone at its first event there. ``legs`` turns that into one
+row per milestone with the time the next one was reached, computed in the
+database with a LEAD() window over the per-milestone MIN(at), so leg
+durations for any number of shipments come from a single query.
+
+``compute_leg_stats`` reduces the legs of all shipments to per-milestone
+dwell-time statistics with NumPy, and ``predict_etas`` uses the medians to
+fill in ``estimated_delivery`` for shipments still in transit. Both run from
+the refresh_transit_stats command, so requests only ever read stored values.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db.models import Case, CharField, F, Min, Q, Value, When, Window
+from django.db.models.functions import Lead
+from django.utils import timezone
+
+from .models import Shipment, ShipmentEvent, TransitLegStat
+
+
+MILESTONES = [stage for stage, _ in Shipment.ROUTE_STAGES] + ['delivered']
+MILESTONE_LABELS = dict(Shipment.ROUTE_STAGES, delivered='Delivered')
+MILESTONE_INDEX = {milestone: index for index, milestone in enumerate(MILESTONES)}
+
+
+def milestone_expression():
+    return Case(
+        When(status='delivered', then=Value('delivered')),
+        default=F('route_stage'),
+        output_field=CharField()
+    )
+
+
+def legs(events=None):
+    """
+    Queryset of dicts ``shipment, milestone, arrived_at, left_at`` ordered by
+    shipment and arrival; ``left_at`` is when the next milestone was reached,
+    None while the shipment is still there.
+    """
+    events = ShipmentEvent.objects.all() if events is None else events
+    return (
+        events.annotate(milestone=milestone_expression())
+        .values('shipment', 'milestone')
+        .annotate(arrived_at=Min('at'))
+        .annotate(left_at=Window(
+            Lead('arrived_at'),
+            partition_by=[F('shipment')],
+            order_by=F('arrived_at').asc()
+        ))
+        .order_by('shipment', 'arrived_at')
+    )
+
+
+def shipment_legs(shipment):
+    """Legs of one shipment, with durations in hours"""
+    rows = []
+    for row in legs(ShipmentEvent.objects.filter(shipment=shipment)):
+        left_at = row['left_at']
+        rows.append({
+            'milestone': row['milestone'],
+            'milestone_display': MILESTONE_LABELS.get(row['milestone'], row['milestone']),
+            'arrived_at': row['arrived_at'],
+            'left_at': left_at,
+            'hours': round((left_at - row['arrived_at']).total_seconds() / 3600, 1) if left_at else None,
+        })
+    return rows
+
+
+def _leg_arrays(events):
+    """Legs as NumPy arrays: shipment ids, milestone indexes, arrival and departure epoch seconds (NaN if none)"""
+    rows = [
+        (row['shipment'], MILESTONE_INDEX.get(row['milestone'], -1), row['arrived_at'].timestamp(),
+         row['left_at'].timestamp() if row['left_at'] else np.nan)
+        for row in legs(events).iterator(chunk_size=5000)
+    ]
+    if not rows:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty, empty
+    shipments, milestones, arrived, left = zip(*rows)
+    return np.array(shipments), np.array(milestones), np.array(arrived), np.array(left)
+
+
+def compute_leg_stats(events=None, min_samples=5):
+    """
+    Per-milestone dwell time statistics in hours, over legs that went straight
+    on to the next milestone. Returns a list of dicts ready for TransitLegStat;
+    milestones with fewer than ``min_samples`` legs are left out.
+    """
+    shipments, milestones, arrived, left = _leg_arrays(events)
+
+    # The milestone each leg ended at: the next row of the same shipment
+    next_milestones = np.full(len(milestones), -1)
+    same_shipment = shipments[1:] == shipments[:-1]
+    next_milestones[:-1] = np.where(same_shipment, milestones[1:], -1)
+
+    complete = (next_milestones == milestones + 1) & ~np.isnan(left)
+    hours = (left - arrived) / 3600
+
+    stats = []
+    for index, milestone in enumerate(MILESTONES[:-1]):
+        sample = hours[complete & (milestones == index)]
+        if len(sample) < min_samples:
+            continue
+        stats.append({
+            'milestone': milestone,
+            'next_milestone': MILESTONES[index + 1],
+            'sample_count': int(len(sample)),
+            'mean_hours': float(sample.mean()),
+            'median_hours': float(np.median(sample)),
+            'p90_hours': float(np.percentile(sample, 90)),
+        })
+    return stats
+
+
+def save_leg_stats(stats):
+    """Replace the stored statistics"""
+    TransitLegStat.objects.exclude(milestone__in=[row['milestone'] for row in stats]).delete()
+    for row in stats:
+        TransitLegStat.objects.update_or_create(milestone=row['milestone'], defaults=row)
+
+
+def remaining_hours(stats):
+    """
+    Array indexed by milestone: median hours from reaching it to delivery,
+    NaN where a leg on the way has no statistics
+    """
+    medians = np.full(len(MILESTONES) - 1, np.nan)
+    for row in stats:
+        medians[MILESTONE_INDEX[row['milestone']]] = row['median_hours']
+    # Remaining time from milestone i is the sum of the medians of legs i..end
+    remaining = np.append(np.cumsum(medians[::-1])[::-1], 0.0)
+    return remaining
+
+
+def predict_etas(stats, dry_run=False):
+    """
+    Fill ``estimated_delivery`` for undelivered shipments whose estimate is
+    missing or was predicted before (estimates typed in by staff are kept).
+    Returns the number of shipments changed.
+    """
+    remaining = remaining_hours(stats)
+    shipments = {
+        shipment.pk: shipment
+        for shipment in Shipment.objects.exclude(status='delivered')
+        .filter(Q(eta_predicted=True) | Q(estimated_delivery__isnull=True))
+        .only('id', 'current_route_stage', 'last_updated', 'estimated_delivery', 'eta_predicted')
+    }
+    if not shipments:
+        return 0
+
+    # Where each shipment is now and since when: its open leg
+    ids, milestones, arrived, left = _leg_arrays(ShipmentEvent.objects.filter(shipment__in=list(shipments)))
+    current = np.isnan(left)
+    arrival = dict(zip(ids[current].tolist(), zip(milestones[current].tolist(), arrived[current].tolist())))
+
+    ids = np.array(list(shipments))
+    milestone_indexes = np.array([
+        arrival[pk][0] if pk in arrival else MILESTONE_INDEX[shipments[pk].current_route_stage]
+        for pk in shipments
+    ])
+    arrived_at = np.array([
+        arrival[pk][1] if pk in arrival else shipments[pk].last_updated.timestamp()
+        for pk in shipments
+    ])
+    # Overdue shipments are expected today rather than on a date already past
+    etas = np.maximum(arrived_at + remaining[milestone_indexes] * 3600, timezone.now().timestamp())
+    known = ~np.isnan(etas)
+
+    changed = []
+    for pk, eta in zip(ids[known].tolist(), etas[known].tolist()):
+        shipment = shipments[pk]
+        eta_date = timezone.localdate(datetime.fromtimestamp(eta, tz=dt_timezone.utc))
+        if shipment.estimated_delivery != eta_date or not shipment.eta_predicted:
+            shipment.estimated_delivery = eta_date
+            shipment.eta_predicted = True
+            changed.append(shipment)
+
+    if changed and not dry_run:
+        # bulk_update skips Shipment.save: no events or notifications for an estimate
+        Shipment.objects.bulk_update(changed, ['estimated_delivery', 'eta_predicted'], batch_size=500)
+    return len(changed)
@@ -0,0 +1,178 @@
+"""
+Set-based stage and status changes for many shipments at once.
+
+Saving shipments one by one costs a SELECT in the notification signal, an
+UPDATE, an event INSERT and up to two notification INSERTs per shipment.
+``apply_bulk_transition`` does the same work for a whole queryset in a
+fixed number of statements: one locking SELECT, one UPDATE per 1,000 rows,
+and bulk INSERTs of the ShipmentEvent and Notification rows. Push
+notifications are sent in one background batch after the commit.
+"""
+
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from notifications.models import Notification
+from notifications.utils import PushNotificationThread, shipment_route_notification, shipment_status_notification
+from .events import current_actor
+from .models import Shipment, ShipmentEvent
+
+
+STAGES = [stage for stage, _ in Shipment.ROUTE_STAGES]
+STATUSES = [status for status, _ in Shipment.STATUS_CHOICES]
+STAGE_LABELS = dict(Shipment.ROUTE_STAGES)
+STATUS_LABELS = dict(Shipment.STATUS_CHOICES)
+UPDATE_BATCH_SIZE = 1000
+
+
+def next_stage(stage):
+    """The stage after ``stage``, or None at the last one"""
+    index = STAGES.index(stage)
+    return STAGES[index + 1] if index < len(STAGES) - 1 else None
+
+
+def stage_progress(stage):
+    """Same as Shipment.route_progress"""
+    return ((STAGES.index(stage) + 1) / len(STAGES)) * 100
+
+
+def apply_bulk_transition(shipments, route_stage=None, status=None, actor=None, notify=True):
+    """
+    Move every shipment in the queryset ``shipments`` to ``route_stage``
+    and/or ``status``. Shipments already there are left alone, so repeating a
+    call is harmless. Records ShipmentEvents and notifies customers of what
+    changed, like Shipment.save and its signals do. Returns the changed ids.
+    """
+    if route_stage is None and status is None:
+        raise ValueError('Give a route_stage, a status or both')
+    if route_stage is not None and route_stage not in STAGE_LABELS:
+        raise ValueError(f'Unknown route stage: {route_stage}')
+    if status is not None and status not in STATUS_LABELS:
+        raise ValueError(f'Unknown status: {status}')
+
+    target = Q()
+    if route_stage is not None:
+        target &= Q(current_route_stage=route_stage)
+    if status is not None:
+        target &= Q(status=status)
+
+    now = timezone.now()
+    actor = actor or current_actor()
+    updates = {'last_updated': now}
+    if route_stage is not None:
+        updates['current_route_stage'] = route_stage
+    if status is not None:
+        updates['status'] = status
+        if status == 'delivered':
+            updates['actual_delivery_date'] = Coalesce(F('actual_delivery_date'), Value(now))
+
+    with transaction.atomic():
+        rows = list(
+            shipments.exclude(target)
+            .select_for_update()
+            .values('id', 'customer_id', 'tracking_code', 'current_route_stage', 'status')
+        )
+        if not rows:
+            return []
+        ids = [row['id'] for row in rows]
+
+        for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+            Shipment.objects.filter(id__in=ids[start:start + UPDATE_BATCH_SIZE]).update(**updates)
+
+        ShipmentEvent.objects.bulk_create([
+            ShipmentEvent(
+                shipment_id=row['id'],
+                route_stage=route_stage or row['current_route_stage'],
+                status=status or row['status'],
+                at=now,
+                actor=actor
+            )
+            for row in rows
+        ], batch_size=UPDATE_BATCH_SIZE)
+
+        if notify:
+            notifications = []
+            for row in rows:
+                if not row['customer_id']:
+                    continue
+                if status is not None and row['status'] != status:
+                    notifications.append(shipment_status_notification(
+                        row['customer_id'], row['id'], row['tracking_code'], status, STATUS_LABELS[status]
+                    ))
+                if route_stage is not None and row['current_route_stage'] != route_stage:
+                    notifications.append(shipment_route_notification(
+                        row['customer_id'], row['id'], row['tracking_code'],
+                        route_stage, STAGE_LABELS[route_stage], stage_progress(route_stage)
+                    ))
+            if notifications:
+                Notification.objects.bulk_create(notifications, batch_size=UPDATE_BATCH_SIZE)
+                transaction.on_commit(lambda: PushNotificationThread(notifications).start())
+
+    return ids
+
+
+def advance_to_next_stage(shipments, actor=None):
+    """Move each shipment one stage along its route, one set-based transition per current stage"""
+    changed = []
+    # Last stage first, so a shipment moved on is not picked up again by the next pass
+    for stage in reversed(STAGES[:-1]):
+        changed += apply_bulk_transition(
+            shipments.filter(current_route_stage=stage), route_stage=next_stage(stage), actor=actor
+        )
+    return changed
+
+
+def apply_scans(tracking_codes, route_stage=None, status=None, actor=None):
+    """
+    Warehouse scans: move the shipments with ``tracking_codes`` to
+    ``route_stage`` and/or ``status`` in one set-based transition. Returns one
+    result per distinct code, in order: ``updated``, ``unchanged`` (already
+    there, e.g. a retried scan), ``ahead`` (further along than the scan; never
+    moved back) or ``not_found``.
+    """
+    codes = list(dict.fromkeys(tracking_codes))
+    found = {
+        row['tracking_code']: row
+        for row in Shipment.objects.filter(tracking_code__in=codes)
+        .values('id', 'tracking_code', 'current_route_stage', 'status')
+    }
+
+    def outcome(row):
+        stage_at, status_at = row['current_route_stage'], row['status']
+        if (route_stage is None or stage_at == route_stage) and (status is None or status_at == status):
+            return 'unchanged'
+        if (route_stage is not None and STAGES.index(stage_at) > STAGES.index(route_stage)) or \
+                (status is not None and STATUSES.index(status_at) > STATUSES.index(status)):
+            return 'ahead'
+        return 'updated'
+
+    outcomes = {code: outcome(row) for code, row in found.items()}
+    candidates = [found[code]['id'] for code, result in outcomes.items() if result == 'updated']
+    changed = set()
+    if candidates:
+        changed = set(apply_bulk_transition(
+            Shipment.objects.filter(id__in=candidates), route_stage=route_stage, status=status, actor=actor
+        ))
+
+    results = []
+    for code in codes:
+        row = found.get(code)
+        if row is None:
+            results.append({'tracking_code': code, 'result': 'not_found'})
+            continue
+        result = outcomes[code]
+        if result == 'updated' and row['id'] not in changed:
+            # A concurrent scan got there first
+            result = 'unchanged'
+        if result == 'updated':
+            row['current_route_stage'] = route_stage or row['current_route_stage']
+            row['status'] = status or row['status']
+        results.append({
+            'tracking_code': code,
+            'result': result,
+            'current_route_stage': row['current_route_stage'],
+            'status': row['status'],
+        })
+    return results
@@ -0,0 +1,180 @@
+"""
+Resumable chunked upload of packing-list PDFs.
+
+Protocol (all under /api/shipping/packing-lists/uploads/):
+
+1. POST uploads/                     JSON: filename, total_size, checksum
+                                     (SHA-256 hex), date, total_cartons,
+                                     total_weight -> upload id, offset 0
+2. POST uploads/<id>/                raw bytes, ``Upload-Offset: <n>`` header.
+                                     Appends the chunk if n is the current
+                                     offset, otherwise 409 with the offset to
+                                     resume from.
+   GET  uploads/<id>/                current offset, to resume after a drop
+3. POST uploads/<id>/finalize/       verifies size, checksum and PDF header,
+                                     then creates the PackingList
+
+Chunks are copied from the request stream to the partial file in
+CHUNK_SIZE pieces, so a worker never holds more than that in memory no
+matter how large the PDF is. Partial files live next to the finished ones
+under packing_lists/%Y/%m/ and are moved, not copied, into the
+content-addressed store (shipping/storage.py).
+"""
+
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PackingList, PackingListUpload
+from .storage import file_sha256
+
+
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b'%PDF-'
+
+
+class UploadError(Exception):
+    """Raised when a chunk or finalize request can't be applied"""
+
+
+class PartialUploadFile(File):
+    """
+    File wrapper for a finished partial upload. FileSystemStorage moves files
+    that expose temporary_file_path() instead of copying their contents.
+    """
+
+    def __init__(self, path, name):
+        super().__init__(None, name=name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def chunks(self, chunk_size=None):
+        with open(self.path, 'rb') as f:
+            while chunk := f.read(chunk_size or CHUNK_SIZE):
+                yield chunk
+
+
+def temp_file_name(upload_id):
+    return timezone.now().strftime(f'packing_lists/%Y/%m/{upload_id}.part')
+
+
+def start_upload(user, **fields):
+    upload = PackingListUpload(created_by=user, **fields)
+    upload.temp_file = temp_file_name(upload.id)
+
+    path = default_storage.path(upload.temp_file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+    upload.save()
+    return upload
+
+
+def append_chunk(upload, stream, offset, length):
+    """
+    Write ``length`` bytes from ``stream`` at ``offset`` and return the new
+    offset. Whatever was written before the stream broke off is kept, so the
+    client can resume from the returned offset.
+    """
+    if upload.status != 'uploading':
+        raise UploadError('Upload is already finalized')
+    if offset != upload.received_bytes:
+        raise UploadError(f'Expected offset {upload.received_bytes}')
+    if offset + length > upload.total_size:
+        raise UploadError('Chunk exceeds the declared total_size')
+
+    written = 0
+    path = default_storage.path(upload.temp_file)
+    try:
+        with open(path, 'r+b') as f:
+            # Drop bytes left over from an interrupted chunk that was never recorded
+            f.seek(offset)
+            f.truncate()
+            while written < length:
+                data = stream.read(min(CHUNK_SIZE, length - written))
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+    finally:
+        if written:
+            # Conditional on the old offset so concurrent retries can't double count
+            PackingListUpload.objects.filter(pk=upload.pk, received_bytes=offset).update(
+                received_bytes=offset + written,
+                updated_at=timezone.now()
+            )
+            upload.received_bytes = offset + written
+
+    return upload.received_bytes
+
+
+def finalize_upload(upload):
+    """Verify the uploaded file and turn it into a PackingList"""
+    with transaction.atomic():
+        # Concurrent finalize calls queue on the row lock; the later ones then see it completed
+        upload.refresh_from_db(from_queryset=PackingListUpload.objects.select_for_update())
+        if upload.status != 'uploading':
+            raise UploadError('Upload is already finalized')
+        if not upload.is_complete:
+            raise UploadError(f'Upload incomplete: {upload.received_bytes} of {upload.total_size} bytes received')
+
+        path = default_storage.path(upload.temp_file)
+        try:
+            with open(path, 'rb') as f:
+                is_pdf = f.read(len(PDF_MAGIC)) == PDF_MAGIC
+            checksum = file_sha256(path)
+        except FileNotFoundError:
+            raise UploadError('Partial file is gone; start a new upload')
+        if not is_pdf:
+            raise UploadError('File is not a PDF')
+
+        if checksum == upload.checksum.lower():
+            packing_list = PackingList(
+                created_by=upload.created_by,
+                date=upload.date,
+                total_cartons=upload.total_cartons,
+                total_weight=upload.total_weight
+            )
+            packing_list.pdf_file.save(upload.filename, PartialUploadFile(path, upload.filename), save=False)
+            packing_list.save()
+
+            upload.packing_list = packing_list
+            upload.status = 'completed'
+            upload.save(update_fields=['packing_list', 'status', 'updated_at'])
+        else:
+            # Start over rather than keep bytes we know are wrong
+            with open(path, 'wb'):
+                pass
+            upload.received_bytes = 0
+            upload.save(update_fields=['received_bytes', 'updated_at'])
+            packing_list = None
+
+    if packing_list is None:
+        raise UploadError('Checksum mismatch; upload has been reset to offset 0')
+
+    # The partial file is moved into place, unless the same PDF was already stored
+    if os.path.exists(path):
+        os.remove(path)
+
+    return packing_list
+
+
+def purge_stale_uploads(older_than):
+    """Delete unfinished uploads last touched before ``older_than`` and their partial files"""
+    stale = PackingListUpload.objects.filter(status='uploading', updated_at__lt=older_than)
+    count = 0
+    for upload in stale.iterator():
+        if default_storage.exists(upload.temp_file):
+            default_storage.delete(upload.temp_file)
+        upload.delete()
+        count += 1
+    return count
@@ -1,24 +1,44 @@
 # shipping/urls.py
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, async_views
 
 router = DefaultRouter()
 router.register(r'packing-lists', views.PackingListViewSet, basename='packing-list')
+router.register(r'consolidations', views.ConsolidationViewSet, basename='consolidation')
+
+if settings.ASYNC_READ_VIEWS:
+    shipping_config_view = async_views.get_shipping_config
+    shipment_by_tracking_view = async_views.get_shipment_by_tracking
+else:
+    shipping_config_view = views.get_shipping_config
+    shipment_by_tracking_view = views.get_shipment_by_tracking
 
 urlpatterns = [
     # Shipping Configuration
-    path("config/", views.get_shipping_config, name="shipping-config"),
+    path("config/", shipping_config_view, name="shipping-config"),
+    path("quote/", views.get_quote, name="shipping-quote"),
     
     # Invoice Endpoints
     path('invoices/', views.InvoiceListCreateView.as_view(), name='invoice-list-create'),
     path('invoices/<uuid:pk>/', views.InvoiceDetailView.as_view(), name='invoice-detail'),
     
+    # Analytics (staff)
+    path('analytics/revenue/', views.revenue_analytics, name='revenue-analytics'),
+    path('analytics/aging/', views.aging_report, name='aging-report'),
+    path('analytics/transit/', views.transit_analytics, name='transit-analytics'),
+
     # Shipment Endpoints
+    path('search/', views.search, name='search'),
+    path('customers/resolve/', views.resolve_customer, name='customer-resolve'),
     path('shipments/', views.ShipmentListCreateView.as_view(), name='shipment-list-create'),
+    path('shipments/import/', views.import_shipments, name='shipment-import'),
+    path('shipments/scan/', views.scan_shipments, name='shipment-scan'),
     path('shipments/<int:pk>/', views.ShipmentDetailView.as_view(), name='shipment-detail'),
-    path('shipments/track/<str:tracking_code>/', views.get_shipment_by_tracking, name='shipment-by-tracking'),
+    path('shipments/<int:pk>/timeline/', views.get_shipment_timeline, name='shipment-timeline'),
+    path('shipments/track/<str:tracking_code>/', shipment_by_tracking_view, name='shipment-by-tracking'),
 
     # Packing List Endpoints (via Router)
     path('', include(router.urls)),
@@ -1,21 +1,54 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import generics, permissions, status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework import viewsets, status, permissions
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse
+from django.http import Http404
+from django.contrib.auth import get_user_model
+from django.db.models import Count
 from rest_framework.decorators import action
 
-from .models import ServiceTier, WeightHandling, Invoice, Shipment, PackingList
+from backend_app import exports
+from backend_app.file_delivery import serve_file
+
+from django.conf import settings
+from django.http.request import UnreadablePostError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from .models import (
+    ServiceTier, WeightHandling, Invoice, Shipment, PackingList, PackingListLine, PackingListUpload, TransitLegStat,
+    Consolidation
+)
 from .serializers import (
     ServiceTierSerializer, 
     WeightHandlingSerializer, 
     InvoiceSerializer,
     ShipmentSerializer,
     ShipmentCreateSerializer,
-    PackingListSerializer
+    PackingListSerializer,
+    PackingListLineSerializer,
+    PackingListUploadSerializer,
+    QuoteRequestSerializer,
+    ShipmentEventSerializer,
+    ConsolidationSerializer,
+    ConsolidationTransitionSerializer,
+    TrackingCodesSerializer,
+    ShipmentImportSerializer,
+    ScanBatchSerializer,
+    CustomerResolveSerializer
 )
+from authentication.utils.search import search_users
+from backend_app.search import MIN_TERM_LENGTH, terms
+from . import aging, imports, linking, rollups, uploads
+from .events import acting_as
+from .rates import get_rate_matrix, quote_options
+from .search import search_shipments
+from .transit import shipment_legs
+from .transitions import apply_scans
 
 
 # ============ Shipping Configuration ============
@@ -32,6 +65,53 @@ def get_shipping_config(request):
     })
 
 
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def get_quote(request):
+    """
+    Price one or more weights against every service tier × weight handling
+    option in a single call, from the cached rate matrix (no rate queries)
+
+    POST {"weights": [12.5, 30], "service_tier_ids": [1], "weight_handling_ids": [1, 2]}
+    GET ?weight=12.5&weight=30&service_tier_id=1&weight_handling_id=1
+    The id filters are optional.
+    """
+    if request.method == 'GET':
+        params = request.query_params
+        data = {'weights': params.getlist('weight')}
+        if 'service_tier_id' in params:
+            data['service_tier_ids'] = params.getlist('service_tier_id')
+        if 'weight_handling_id' in params:
+            data['weight_handling_ids'] = params.getlist('weight_handling_id')
+    else:
+        data = request.data
+
+    serializer = QuoteRequestSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    tier_ids = serializer.validated_data.get('service_tier_ids')
+    handling_ids = serializer.validated_data.get('weight_handling_ids')
+
+    matrix = get_rate_matrix()
+    quotes = [
+        {
+            'weight_kg': weight,
+            'options': quote_options(
+                matrix,
+                weight,
+                tuple(sorted(set(tier_ids))) if tier_ids is not None else None,
+                tuple(sorted(set(handling_ids))) if handling_ids is not None else None
+            )
+        }
+        for weight in serializer.validated_data['weights']
+    ]
+
+    return Response({
+        'success': True,
+        'currency': 'TSH',
+        'quotes': quotes
+    })
+
+
 # ============ Invoice Views ============
 class InvoiceListCreateView(generics.ListCreateAPIView):
     """List all invoices for the authenticated user, or create a new invoice"""
@@ -63,6 +143,134 @@ class InvoiceDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Invoice.objects.filter(user=self.request.user)
 
 
+# ============ Analytics ============
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def revenue_analytics(request):
+    """
+    Revenue, payments and outstanding credit per day or month, from the
+    RevenueDaily rollup (never scans invoices)
+    Query params: period (day|month, default month), date_from, date_to
+    (YYYY-MM-DD; default the last 12 months, or 31 days by day),
+    group_by (service_tier|payment_method)
+    """
+    params = request.query_params
+    period = params.get('period', 'month')
+    if period not in ('day', 'month'):
+        return Response({
+            'error': 'period must be day or month'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    group_by = params.get('group_by') or None
+    if group_by not in (None, 'service_tier', 'payment_method'):
+        return Response({
+            'error': 'group_by must be service_tier or payment_method'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    dates = {}
+    for param in ('date_from', 'date_to'):
+        if params.get(param):
+            try:
+                dates[param] = parse_date(params[param])
+            except ValueError:
+                dates[param] = None
+            if dates[param] is None:
+                return Response({
+                    'error': f'{param} must be a date (YYYY-MM-DD)'
+                }, status=status.HTTP_400_BAD_REQUEST)
+    date_to = dates.get('date_to') or timezone.localdate()
+    date_from = dates.get('date_from') or (
+        (date_to - timedelta(days=365)).replace(day=1) if period == 'month' else date_to - timedelta(days=30)
+    )
+
+    rows, totals = rollups.summarize(date_from, date_to, period, group_by)
+    return Response({
+        'success': True,
+        'currency': 'TSH',
+        'period': period,
+        'date_from': date_from,
+        'date_to': date_to,
+        'totals': totals,
+        'data': rows
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def aging_report(request):
+    """
+    Outstanding credit per customer by invoice age (0-30, 31-60, 61-90, 90+ days)
+    Query params: as_of (YYYY-MM-DD, default today), min_total,
+    export (csv|xlsx: download every customer), limit (JSON only, default 100, max 1000)
+    """
+    params = request.query_params
+    as_of = timezone.localdate()
+    if params.get('as_of'):
+        try:
+            as_of = parse_date(params['as_of'])
+        except ValueError:
+            as_of = None
+        if as_of is None:
+            return Response({
+                'error': 'as_of must be a date (YYYY-MM-DD)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    min_total = None
+    if params.get('min_total'):
+        try:
+            min_total = Decimal(params['min_total'])
+        except InvalidOperation:
+            min_total = None
+        if min_total is None or not min_total.is_finite():
+            return Response({
+                'error': 'min_total must be a number'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = aging.aging_rows(as_of, min_total)
+    export = params.get('export')
+    if export in ('csv', 'xlsx'):
+        header = [label for _, label in aging.COLUMNS]
+        values = aging.export_rows(rows.iterator(chunk_size=2000))
+        filename = f'aging_{as_of.isoformat()}.{export}'
+        if export == 'csv':
+            return exports.csv_response(filename, header, values)
+        return exports.xlsx_response(filename, header, values, title=f'Aging {as_of.isoformat()}')
+    if export:
+        return Response({
+            'error': 'export must be csv or xlsx'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = max(0, min(int(params.get('limit', 100)), 1000))
+    except ValueError:
+        limit = 100
+
+    data = list(rows[:limit])
+    for row in data:
+        row['customer_phone'] = str(row['customer_phone']) if row['customer_phone'] else None
+    return Response({
+        'success': True,
+        'currency': 'TSH',
+        'as_of': as_of,
+        'buckets': [{'key': key, 'label': label} for key, label, _, _ in aging.BUCKETS],
+        'totals': aging.aging_totals(as_of),
+        'data': data
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def transit_analytics(request):
+    """Dwell time per route stage (median, mean, p90 in hours), refreshed by refresh_transit_stats"""
+    stats = TransitLegStat.objects.values(
+        'milestone', 'next_milestone', 'sample_count', 'median_hours', 'mean_hours', 'p90_hours', 'computed_at'
+    )
+    stage_order = [stage for stage, _ in Shipment.ROUTE_STAGES]
+    return Response({
+        'success': True,
+        'data': sorted(stats, key=lambda row: stage_order.index(row['milestone']))
+    })
+
+
 # ============ Shipment Views ============
 class ShipmentListCreateView(generics.ListCreateAPIView):
     """List all shipments for the authenticated user, or create a new shipment"""
@@ -81,12 +289,13 @@ class ShipmentListCreateView(generics.ListCreateAPIView):
         return ShipmentSerializer
 
     def perform_create(self, serializer):
-        if self.request.user.is_staff:
-            # Admin can create shipment for any customer
-            serializer.save()
-        else:
-            # Regular user creates shipment for themselves
-            serializer.save(customer=self.request.user)
+        with acting_as(self.request.user):
+            if self.request.user.is_staff:
+                # Admin can create shipment for any customer
+                serializer.save()
+            else:
+                # Regular user creates shipment for themselves
+                serializer.save(customer=self.request.user)
 
 
 class ShipmentDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -100,6 +309,180 @@ class ShipmentDetailView(generics.RetrieveUpdateDestroyAPIView):
             return Shipment.objects.all()
         return Shipment.objects.filter(customer=self.request.user)
 
+    def perform_update(self, serializer):
+        with acting_as(self.request.user):
+            serializer.save()
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_shipments(request):
+    """
+    Create shipments from a CSV/XLSX manifest (multipart/form-data)
+    - file: .csv or .xlsx with a header row (tracking_code, origin, destination, weight required;
+      customer_name, customer_email, customer_phone, description, estimated_delivery, admin_notes optional)
+    - on_conflict: skip (default) or update existing tracking codes
+    - dry_run: validate and report without saving
+    Customers are linked by verified email only. Returns counts and row-level errors.
+    """
+    serializer = ShipmentImportSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    upload = serializer.validated_data['file']
+
+    try:
+        with acting_as(request.user):
+            report = imports.import_shipments(
+                upload,
+                upload.name,
+                on_conflict=serializer.validated_data['on_conflict'],
+                dry_run=serializer.validated_data['dry_run'],
+            )
+    except imports.ManifestError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    verb = 'would be created' if report['dry_run'] else 'created'
+    return Response({
+        'success': True,
+        'message': f"{report['created']} shipment(s) {verb}, {report['failed']} row(s) failed",
+        'data': report
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def scan_shipments(request):
+    """
+    Batch of warehouse scans: up to 500 tracking_codes moved to route_stage and/or status at once.
+    Safe to retry. Each code gets a result: updated, unchanged (already there), ahead (further along,
+    not moved back) or not_found.
+    """
+    serializer = ScanBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    results = apply_scans(actor=request.user, **serializer.validated_data)
+
+    updated = sum(1 for result in results if result['result'] == 'updated')
+    return Response({
+        'success': True,
+        'message': f'{updated} of {len(results)} shipment(s) updated',
+        'data': {
+            'updated': updated,
+            'results': results
+        }
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def search(request):
+    """
+    Shipments and customers matching q: every word (3+ characters) must appear in the tracking code,
+    a name, an email or a phone. A phone number matches however it is written.
+    Query params: q, limit (per kind, default 20, max 50)
+    """
+    query = request.query_params.get('q', '')
+    if not terms(query):
+        return Response({
+            'error': f'q must contain a word of at least {MIN_TERM_LENGTH} characters'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), 50))
+    except ValueError:
+        limit = 20
+
+    shipments = search_shipments(Shipment.objects.all(), query).values(
+        'id', 'tracking_code', 'status', 'current_route_stage', 'customer', 'customer_name',
+        'customer_email', 'customer_phone', 'registered_date'
+    )[:limit]
+    customers = search_users(get_user_model().objects.all(), query).values(
+        'id', 'full_name', 'email', 'phone_number', 'country', 'city'
+    )[:limit]
+    customers = list(customers)
+    for customer in customers:
+        customer['phone_number'] = str(customer['phone_number']) if customer['phone_number'] else None
+
+    return Response({
+        'success': True,
+        'data': {
+            'shipments': list(shipments),
+            'customers': customers
+        }
+    })
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAdminUser])
+def resolve_customer(request):
+    """
+    Who is this phone number / email? Index lookups on the normalized phone and email.
+    GET ?phone=...&email=...: the matching customers and how many orphan shipments (no customer)
+    carry that phone or email.
+    POST {"phone": ..., "email": ...}: link those orphan shipments, and any others with the customer's
+    own verified email, to the one matching customer.
+    """
+    serializer = CustomerResolveSerializer(data=request.query_params if request.method == 'GET' else request.data)
+    serializer.is_valid(raise_exception=True)
+    phone = serializer.validated_data.get('phone')
+    email = serializer.validated_data.get('email')
+
+    customers = list(
+        linking.resolve_customers(phone, email).values('id', 'full_name', 'email', 'phone_e164')[:20]
+    )
+
+    if request.method == 'GET':
+        return Response({
+            'success': True,
+            'data': {
+                'phone': phone,
+                'email': email,
+                'customers': customers,
+                'orphan_shipments': linking.orphans(phone, email).count()
+            }
+        })
+
+    if len(customers) != 1:
+        return Response({
+            'error': 'No customer matches' if not customers else 'Several customers match; resolve by email',
+            'customers': customers
+        }, status=status.HTTP_400_BAD_REQUEST)
+    customer = get_user_model().objects.get(pk=customers[0]['id'])
+    linked = linking.orphans(phone, email).update(customer=customer, last_updated=timezone.now())
+    linked += linking.link_orphans(customer)
+    return Response({
+        'success': True,
+        'message': f'{linked} shipment(s) linked to {customer.full_name}',
+        'data': {
+            'customer': customers[0],
+            'linked': linked
+        }
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_shipment_timeline(request, pk):
+    """
+    Stage and status history of a shipment, oldest first, with the time
+    spent at each stage, from the ShipmentEvent log
+    """
+    shipments = Shipment.objects.all() if request.user.is_staff else Shipment.objects.filter(customer=request.user)
+    shipment = get_object_or_404(shipments.only('id', 'tracking_code', 'status', 'current_route_stage'), pk=pk)
+
+    events = shipment.events.select_related('actor') if request.user.is_staff else shipment.events.all()
+    return Response({
+        'success': True,
+        'data': {
+            'tracking_code': shipment.tracking_code,
+            'status': shipment.status,
+            'current_route_stage': shipment.current_route_stage,
+            'events': ShipmentEventSerializer(
+                events, many=True, context={'include_actor': request.user.is_staff}
+            ).data,
+            'legs': shipment_legs(shipment),
+        }
+    })
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -164,6 +547,12 @@ class PackingListViewSet(viewsets.ModelViewSet):
     GET /api/shipping/packing-lists/{id}/ - Get specific packing list
     DELETE /api/shipping/packing-lists/{id}/ - Delete packing list (staff only)
     GET /api/shipping/packing-lists/{id}/download/ - Download PDF
+    GET /api/shipping/packing-lists/cartons/ - Search carton lines across lists (staff only)
+
+    Chunked, resumable upload (see shipping/uploads.py):
+    POST /api/shipping/packing-lists/uploads/ - Start an upload
+    GET/POST /api/shipping/packing-lists/uploads/{upload_id}/ - Upload progress / append a chunk
+    POST /api/shipping/packing-lists/uploads/{upload_id}/finalize/ - Verify and create the packing list
     """
     
     queryset = PackingList.objects.all()
@@ -192,10 +581,15 @@ class PackingListViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         }, status=status.HTTP_201_CREATED, headers=headers)
     
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get', 'head'])
     def download(self, request, pk=None):
         """
         Download PDF file
+
+        Supports Range / If-Range for resumable downloads and answers
+        If-None-Match / If-Modified-Since with 304, keyed on updated_at.
+        The bytes are sent according to MEDIA_DELIVERY (sendfile or web
+        server offload).
         """
         packing_list = self.get_object()
         
@@ -205,28 +599,233 @@ class PackingListViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            return FileResponse(
-                packing_list.pdf_file.open('rb'),
+            return serve_file(
+                request,
+                packing_list.pdf_file.name,
+                packing_list.pdf_file.storage,
                 as_attachment=True,
                 filename=f'packing_list_{packing_list.unique_id}.pdf',
-                content_type='application/pdf'
+                content_type='application/pdf',
+                cache_control='private, no-cache',
+                etag=packing_list.pdf_etag,
+                last_modified=packing_list.updated_at
             )
-        except Exception as e:
+        except Http404:
             return Response({
-                'error': f'Failed to download PDF: {str(e)}'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'error': 'PDF file not found'
+            }, status=status.HTTP_404_NOT_FOUND)
     
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def cartons(self, request):
+        """
+        Carton lines extracted from the PDFs, across all packing lists
+        Query params: code, q (client/description), contact, packing_list,
+        date_from, date_to (YYYY-MM-DD), limit (default 200, max 1000)
+        """
+        lines = PackingListLine.objects.select_related('packing_list').order_by(
+            '-packing_list__date', 'packing_list', 'position'
+        )
+
+        params = request.query_params
+        if params.get('code'):
+            lines = lines.filter(carton_code__iexact=params['code'])
+        if params.get('q'):
+            lines = lines.filter(details__icontains=params['q'])
+        if params.get('contact'):
+            lines = lines.filter(contact__contains=params['contact'])
+        if params.get('packing_list'):
+            try:
+                packing_list = int(params['packing_list'])
+            except ValueError:
+                return Response({
+                    'error': 'packing_list must be a packing list id'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            lines = lines.filter(packing_list=packing_list)
+        for param, lookup in (('date_from', 'gte'), ('date_to', 'lte')):
+            if params.get(param):
+                try:
+                    value = parse_date(params[param])
+                except ValueError:
+                    value = None
+                if value is None:
+                    return Response({
+                        'error': f'{param} must be a date (YYYY-MM-DD)'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                lines = lines.filter(**{f'packing_list__date__{lookup}': value})
+
+        try:
+            limit = max(0, min(int(params.get('limit', 200)), 1000))
+        except ValueError:
+            limit = 200
+
+        serializer = PackingListLineSerializer(lines[:limit], many=True)
+        return Response({
+            'success': True,
+            'count': len(serializer.data),
+            'data': serializer.data
+        })
+
+    def get_upload(self, request, upload_id):
+        return get_object_or_404(PackingListUpload, pk=upload_id, created_by=request.user)
+
+    @action(detail=False, methods=['post'], url_path='uploads')
+    def start_upload(self, request):
+        """
+        Start a chunked upload
+        Expects JSON with filename, total_size, checksum (SHA-256 hex),
+        date, total_cartons and total_weight
+        """
+        serializer = PackingListUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = uploads.start_upload(request.user, **serializer.validated_data)
+
+        return Response({
+            'success': True,
+            'message': 'Upload started',
+            'data': PackingListUploadSerializer(upload).data,
+            'max_chunk_size': settings.PACKING_LIST_UPLOAD_MAX_CHUNK_SIZE
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get', 'post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})')
+    def upload_chunk(self, request, upload_id=None):
+        """
+        GET: upload progress, to find the offset to resume from
+        POST: append the raw request body at the Upload-Offset header
+        """
+        upload = self.get_upload(request, upload_id)
+        if request.method == 'GET':
+            return Response({'success': True, 'data': PackingListUploadSerializer(upload).data})
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response({
+                'error': 'Upload-Offset and Content-Length headers are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if length > settings.PACKING_LIST_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({
+                'error': f'Chunks are limited to {settings.PACKING_LIST_UPLOAD_MAX_CHUNK_SIZE} bytes',
+                'offset': upload.received_bytes
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            # Read straight from the request stream; request.data would buffer the body
+            new_offset = uploads.append_chunk(upload, request.stream, offset, length)
+        except uploads.UploadError as e:
+            return Response({
+                'error': str(e),
+                'offset': upload.received_bytes
+            }, status=status.HTTP_409_CONFLICT)
+        except UnreadablePostError:
+            return Response({
+                'error': 'Connection dropped during the chunk',
+                'offset': upload.received_bytes
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'offset': new_offset,
+            'complete': upload.is_complete
+        })
+
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})/finalize')
+    def finalize_upload(self, request, upload_id=None):
+        """Verify size and checksum of a finished upload and create the packing list"""
+        upload = self.get_upload(request, upload_id)
+
+        try:
+            packing_list = uploads.finalize_upload(upload)
+        except uploads.UploadError as e:
+            return Response({
+                'error': str(e),
+                'offset': upload.received_bytes
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(packing_list)
+        return Response({
+            'success': True,
+            'message': 'Packing list created successfully',
+            'data': serializer.data
+        }, status=status.HTTP_201_CREATED)
+
     def destroy(self, request, *args, **kwargs):
         """Delete packing list"""
         instance = self.get_object()
         
-        # Delete the PDF file from storage
-        if instance.pdf_file:
-            instance.pdf_file.delete(save=False)
-        
+        # The PDF blob may be shared with other packing lists; it is removed
+        # by gc_packing_list_blobs once nothing references it
         self.perform_destroy(instance)
         
         return Response({
             'success': True,
             'message': 'Packing list deleted successfully'
         }, status=status.HTTP_200_OK)
+
+
+# ============ Consolidation Views ============
+class ConsolidationViewSet(viewsets.ModelViewSet):
+    """
+    Manifests of shipments travelling together (staff only)
+
+    GET/POST /api/shipping/consolidations/ - List / create
+    GET/PATCH/DELETE /api/shipping/consolidations/{id}/
+    POST /api/shipping/consolidations/{id}/shipments/ - Add shipments by tracking code
+    POST /api/shipping/consolidations/{id}/shipments/remove/ - Remove shipments by tracking code
+    POST /api/shipping/consolidations/{id}/transition/ - Move the manifest and all its
+         shipments to a route_stage and/or status
+    """
+    serializer_class = ConsolidationSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        return Consolidation.objects.annotate(shipment_count=Count('shipments'))
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    def tracking_codes(self, request):
+        serializer = TrackingCodesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        codes = set(serializer.validated_data['tracking_codes'])
+        found = set(Shipment.objects.filter(tracking_code__in=codes).values_list('tracking_code', flat=True))
+        return found, sorted(codes - found)
+
+    @action(detail=True, methods=['post'], url_path='shipments')
+    def add_shipments(self, request, pk=None):
+        consolidation = self.get_object()
+        found, missing = self.tracking_codes(request)
+        updated = Shipment.objects.filter(tracking_code__in=found).update(consolidation=consolidation)
+        return Response({
+            'success': True,
+            'message': f'{updated} shipment(s) added to {consolidation.reference}',
+            'data': {'added': updated, 'not_found': missing}
+        })
+
+    @action(detail=True, methods=['post'], url_path='shipments/remove')
+    def remove_shipments(self, request, pk=None):
+        consolidation = self.get_object()
+        found, missing = self.tracking_codes(request)
+        updated = consolidation.shipments.filter(tracking_code__in=found).update(consolidation=None)
+        return Response({
+            'success': True,
+            'message': f'{updated} shipment(s) removed from {consolidation.reference}',
+            'data': {'removed': updated, 'not_found': missing}
+        })
+
+    @action(detail=True, methods=['post'])
+    def transition(self, request, pk=None):
+        consolidation = self.get_object()
+        serializer = ConsolidationTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = consolidation.apply_transition(actor=request.user, **serializer.validated_data)
+        return Response({
+            'success': True,
+            'message': f'{updated} shipment(s) updated',
+            'data': {
+                'updated': updated,
+                'status': consolidation.status,
+                'current_route_stage': consolidation.current_route_stage
+            }
+        })
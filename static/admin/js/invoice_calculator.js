@@ -34,6 +34,21 @@
             payingBillField.addEventListener('input', calculateTotals);
         }
 
+        // Prices per "tier:handling" pair, so typing a weight doesn't refetch them
+        const priceCache = new Map();
+
+        function getPrices(serviceTierId, weightHandlingId) {
+            const key = `${serviceTierId}:${weightHandlingId}`;
+            if (!priceCache.has(key)) {
+                const url = `/admin/shipping/invoice/get-prices/?service_tier_id=${serviceTierId}&weight_handling_id=${weightHandlingId}`;
+                const request = fetch(url).then(response => response.json());
+                // Forget failed lookups so the next change retries
+                request.catch(() => priceCache.delete(key));
+                priceCache.set(key, request);
+            }
+            return priceCache.get(key);
+        }
+
         // Initial calculation on page load
         calculateTotals();
 
@@ -54,11 +69,8 @@
                 return;
             }
 
-            // Fetch the prices using the custom admin endpoint
-            const url = `/admin/shipping/invoice/get-prices/?service_tier_id=${serviceTierId}&weight_handling_id=${weightHandlingId}`;
-
-            fetch(url)
-                .then(response => response.json())
+            // Fetch the prices using the custom admin endpoint (once per pair)
+            getPrices(serviceTierId, weightHandlingId)
                 .then(data => {
                     const servicePrice = data.service_price || 0;
                     const handlingRate = data.handling_rate || 0;